@@ -2,7 +2,6 @@ import os
 import json
 import numpy as np
 import pandas as pd
-import yfinance as yf
 import backtrader as bt
 import matplotlib.pyplot as plt
 from datetime import datetime
@@ -10,6 +9,10 @@ from datetime import datetime
 from src.strategies import MomentumStrategy
 from src.data import SPYHistoricalData, ETFHistoricalData
 from src.plotting import plot_momentum_portfolio_strategy
+from src.panel import PricePanel
+from src.engine import run_momentum_backtest
+from src.benchmark_store import BenchmarkStore
+from src.price_store import PriceStore, PriceStoreData
 
 if __name__ == "__main__": 
     start = datetime(2000, 1, 1)
@@ -41,35 +44,59 @@ if __name__ == "__main__":
     num_stocks = 16
     
     initial_cash = 1000000
-    cerebro = bt.Cerebro()
-    cerebro.broker.setcash(initial_cash)
-    cerebro.broker.set_coc(True)  # Cheat on close (coc) allows trades to be placed on closing bars
+    engine = "backtrader"  # "numpy" runs the same rules on the NumPy panel engine
+    profile = False  # per-phase timing report of the backtrader run, saved to logs/profile.json
     
-    spy_filepath = "data/benchmark/SPY.csv"
-    spy_df = yf.download("SPY", start=start, end=end, period=f"1{resolution}")
-    spy_df.to_csv(spy_filepath)
-    spy_feed = bt.feeds.YahooFinanceCSVData(dataname=spy_filepath)
-    cerebro.adddata(spy_feed, name="SPY")
+    # Benchmark series are downloaded once and extended incrementally
+    benchmarks = BenchmarkStore("data/benchmark")
+    spy_filepath = benchmarks.to_csv("SPY", start, end, "data/benchmark/SPY.csv")
 
+    filepaths = {"SPY": spy_filepath}
     for ticker in tickers_list: 
         ticker_filepath = os.path.join(csv_data_dir, f"{ticker}.csv")
         if os.path.exists(ticker_filepath):
             print(f"adding: {ticker}")
-            data_feed = bt.feeds.YahooFinanceCSVData(dataname=ticker_filepath)
+            filepaths[ticker] = ticker_filepath
+
+    # Columnar copy of the CSV files, rebuilt only when they change
+    store = PriceStore.load_or_build(os.path.join(csv_data_dir, "price_store"), filepaths)
+
+    print(f"Starting portfolio value: {initial_cash:,.2f}")
+    if engine == "numpy":
+        panel = PricePanel.from_store(store)
+        results = [run_momentum_backtest(
+            panel,
+            momentum_window=momentum_window,
+            total_window=total_window,
+            long_percentile=long_percentile,
+            num_stocks=num_stocks,
+            initial_cash=initial_cash
+        )]
+        final_value = results[0].portfolio_values[-1]
+    else:
+        cerebro = bt.Cerebro()
+        cerebro.broker.setcash(initial_cash)
+        cerebro.broker.set_coc(True)  # Cheat on close (coc) allows trades to be placed on closing bars
+
+        for ticker in store.tickers:
+            data_feed = PriceStoreData(store=store, ticker=ticker)
             cerebro.adddata(data_feed, name=ticker)
 
-    cerebro.addstrategy(
-        MomentumStrategy, 
-        momentum_window=momentum_window,
-        total_window=total_window,
-        long_percentile=long_percentile,
-        num_stocks=num_stocks
-    )
+        cerebro.addstrategy(
+            MomentumStrategy, 
+            momentum_window=momentum_window,
+            total_window=total_window,
+            long_percentile=long_percentile,
+            num_stocks=num_stocks,
+            ledger=True,
+            profile=profile
+        )
+
+        results = cerebro.run()
+        final_value = cerebro.broker.getvalue()
+        print(f"Saved ledger to {results[0].ledger.filepath}")
 
     # Print results
-    print(f"Starting portfolio value: {cerebro.broker.getvalue():,.2f}")
-    results = cerebro.run()
-    momentum_strategy = results[0]
-    print(f"Final Momentum portfolio value: {cerebro.broker.getvalue():,.2f}")
+    print(f"Final Momentum portfolio value: {final_value:,.2f}")
 
-    plot_momentum_portfolio_strategy(results, initial_cash)
+    plot_momentum_portfolio_strategy(results, initial_cash, benchmarks)
@@ -1,13 +1,15 @@
 import os
 import numpy as np 
 import pandas as pd 
-import yfinance as yf 
-import backtrader as bt
 import matplotlib.pyplot as plt
 from datetime import datetime
 
-from src.strategies import MomentumStrategy
 from src.data import ETFHistoricalData
+from src.panel import PricePanel
+from src.sweep import run_sweep
+from src.benchmark_store import BenchmarkStore
+from src.price_store import PriceStore
+from src.results_store import ResultsStore
 
 
 def calculate_drawdown(series):
@@ -43,75 +45,84 @@ if __name__ == "__main__":
     total_window = 252
     num_stocks = 16
     initial_cash = 1000000
+    workers = os.cpu_count()  # number of parallel sweep processes
+    feature_cache_dir = "data/feature_cache"  # on-disk tier of the sweep feature cache
+    results_filepath = "results/sweep_results.sqlite"  # finished cells, kept across runs
 
     smallest_max_drawdown = -float('inf')
 
+    # Benchmark series are downloaded once and extended incrementally
+    benchmarks = BenchmarkStore("data/benchmark")
+
     # Calculate the benchmark strategy (buy and hold SPY)
-    benchmark_data = yf.download('PTNQ', start=start, end=end, progress=False)
+    benchmark_data = benchmarks.get('PTNQ', start, end)
     initial_benchmark_price = benchmark_data['Adj Close'].iloc[0]
     benchmark_shares = initial_cash / initial_benchmark_price
     benchmark_values = benchmark_data['Adj Close'] * benchmark_shares
         
     benchmark_drawdown = calculate_drawdown(benchmark_values)
 
-    for i in range(1, 17):
-        long_percentile = i / 16
-
-        for j in range(1, 21):
-            momentum_window = j
-
-            cerebro = bt.Cerebro()
-            cerebro.broker.setcash(initial_cash)
-            cerebro.broker.set_coc(True)  # Cheat on close (coc) allows trades to be placed on closing bars
-            
-            spy_filepath = "data/benchmark/SPY.csv"
-            spy_df = yf.download("SPY", start=start, end=end, period=f"1{resolution}")
-            spy_df.to_csv(spy_filepath)
-            spy_feed = bt.feeds.YahooFinanceCSVData(dataname=spy_filepath)
-            cerebro.adddata(spy_feed, name="SPY")
-
-            for ticker in tickers_list: 
-                ticker_filepath = os.path.join(csv_data_dir, f"{ticker}.csv")
-                if os.path.exists(ticker_filepath):
-                    print(f"adding: {ticker}")
-                    data_feed = bt.feeds.YahooFinanceCSVData(dataname=ticker_filepath)
-                    cerebro.adddata(data_feed, name=ticker)
-
-            cerebro.addstrategy(
-                MomentumStrategy, 
-                momentum_window=momentum_window,
-                total_window=total_window,
-                long_percentile=long_percentile,
-                num_stocks=num_stocks
-            )
-
-            # Run the backtest
-            results = cerebro.run()
-            momentum_strategy = results[0]
-            portfolio_values = momentum_strategy.portfolio_values[:len(momentum_strategy.dates)]
-            dates = momentum_strategy.dates
-
-            # Calculate drawdown
-            portfolio_series = pd.Series(portfolio_values, index=dates)
-            drawdown_series = calculate_drawdown(portfolio_series)
-            max_drawdown = drawdown_series.min()  # Get the max drawdown (most negative value)
-
-            hursts = momentum_strategy.hursts
-            pvalues = momentum_strategy.pvalues
-
-            # Track the lowest drawdown
-            if max_drawdown > smallest_max_drawdown:
-                smallest_max_drawdown = max_drawdown
-                best_percentile = long_percentile
-                best_rebalance_window = momentum_window
-                best_portfolio_value = portfolio_values
-                best_drawdown_curve = drawdown_series
-                best_dates = dates
-                best_hursts = hursts
-                best_pvalues = pvalues
-
-            # Plot each iteration
-            ax1.plot(dates, portfolio_values)
+    spy_filepath = benchmarks.to_csv("SPY", start, end, "data/benchmark/SPY.csv")
+
+    # Load the price panel once; worker processes memory-map it
+    filepaths = {"SPY": spy_filepath}
+    for ticker in tickers_list: 
+        ticker_filepath = os.path.join(csv_data_dir, f"{ticker}.csv")
+        if os.path.exists(ticker_filepath):
+            print(f"adding: {ticker}")
+            filepaths[ticker] = ticker_filepath
+    price_store = PriceStore.load_or_build(os.path.join(csv_data_dir, "price_store"), filepaths)
+    panel = PricePanel.from_store(price_store)
+
+    grid = [
+        dict(long_percentile=i / 16, momentum_window=j)
+        for i in range(1, 17)
+        for j in range(1, 21)
+    ]
+    fixed_params = dict(total_window=total_window, num_stocks=num_stocks, initial_cash=initial_cash)
+
+    # Every finished cell is saved as it arrives; a rerun only runs the
+    # cells that are missing for this data
+    os.makedirs(os.path.dirname(results_filepath), exist_ok=True)
+    results_store = ResultsStore(results_filepath, panel.fingerprint())
+    for cell in run_sweep(panel, grid, fixed_params, workers=workers, cache_dir=feature_cache_dir, store=results_store):
+        long_percentile = cell["params"]["long_percentile"]
+        momentum_window = cell["params"]["momentum_window"]
+        print(f"long_percentile={long_percentile:.4f}, momentum_window={momentum_window}: max drawdown {cell['max_drawdown']:.2%}")
+
+    print("Lowest max drawdowns:")
+    print(results_store.top(5, by="max_drawdown")[["long_percentile", "momentum_window", "max_drawdown", "sharpe", "final_value"]])
+
+    best_index = None
+    for index, params in enumerate(grid):
+        cell = results_store.load(dict(fixed_params, **params))
+        long_percentile = cell["params"]["long_percentile"]
+        momentum_window = cell["params"]["momentum_window"]
+        portfolio_values = cell["portfolio_values"]
+        dates = cell["dates"]
+
+        # Calculate drawdown
+        portfolio_series = pd.Series(portfolio_values, index=dates)
+        drawdown_series = calculate_drawdown(portfolio_series)
+        max_drawdown = drawdown_series.min()  # Get the max drawdown (most negative value)
+
+        hursts = cell["hursts"]
+        pvalues = cell["pvalues"]
+
+        # Track the lowest drawdown (ties go to the earliest grid cell)
+        if max_drawdown > smallest_max_drawdown or (max_drawdown == smallest_max_drawdown and index < best_index):
+            smallest_max_drawdown = max_drawdown
+            best_index = index
+            best_percentile = long_percentile
+            best_rebalance_window = momentum_window
+            best_portfolio_value = portfolio_values
+            best_drawdown_curve = drawdown_series
+            best_dates = dates
+            best_hursts = hursts
+            best_pvalues = pvalues
+
+        # Plot each iteration
+        ax1.plot(dates, portfolio_values)
     
 
 
@@ -137,5 +148,6 @@ if __name__ == "__main__":
     ax3.set_title(f'Drawdown Curve (Best Percentile: {best_percentile:.2f})')
     ax3.grid()
 
+    results_store.close()
     plt.savefig('monte_carlo_results.png')
     plt.show()
\ No newline at end of file
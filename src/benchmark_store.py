@@ -0,0 +1,155 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import date
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+class BenchmarkStore:
+    """
+    Local store of daily benchmark series (SPY, PTNQ, ...). Each symbol is
+    kept as one compressed columnar .npz file together with the date range it
+    covers. A request only downloads the part of the range that is not
+    covered yet, so moving the end date forward fetches just the new tail.
+
+    Adj Close (and, from yfinance, the split adjusted prices) of past bars
+    changes after every split or dividend. Each fetch therefore also takes
+    in the stored bar next to the missing segment; when that bar's prices
+    differ from the stored ones the whole covered range is fetched again,
+    so the stored history keeps a single adjustment basis.
+
+    fetch(symbol, start, end) returns a DataFrame indexed by date with the
+    COLUMNS columns (end exclusive, like yfinance). With offline=True the
+    store never fetches and raises if a request is not covered, which lets
+    tests run against a fixture directory.
+    """
+    def __init__(self, directory="data/benchmark", fetch=None, offline=False):
+        self.directory = directory
+        self.fetch = fetch or _yfinance_fetch
+        self.offline = offline
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, symbol, start, end):
+        """
+        Returns the symbol's bars in [start, end) as a DataFrame indexed by
+        Date, fetching any uncovered part of the range first.
+        """
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        data, covered_start, covered_end = self._load(symbol)
+        missing = self._missing(start, end, covered_start, covered_end)
+
+        if missing:
+            if self.offline:
+                raise LookupError(f"{symbol} is not stored for {start.date()} to {end.date()}")
+            for a, b in missing:
+                a, b = self._overlapping(data, a, b)
+                data, covered_start, covered_end = self._extend(
+                    symbol, data, covered_start, covered_end, self.fetch(symbol, a, b), a, b,
+                )
+
+        return data[(data.index >= start) & (data.index < end)]
+
+    def to_csv(self, symbol, start, end, filepath):
+        """
+        Writes the symbol's bars in [start, end) as a Yahoo style CSV (the
+        format backtrader's YahooFinanceCSVData reads) and returns filepath.
+        """
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        text = self.get(symbol, start, end).to_csv()
+        # Leave an unchanged file untouched so stores built from it stay fresh
+        if os.path.exists(filepath):
+            with open(filepath) as f:
+                if f.read() == text:
+                    return filepath
+        with open(filepath, "w") as f:
+            f.write(text)
+        return filepath
+
+    def _missing(self, start, end, covered_start, covered_end):
+        # Never mark days that may not have a final bar yet as covered
+        fetch_end = min(end, pd.Timestamp(date.today()))
+        if covered_start is None:
+            missing = [(start, fetch_end)]
+        else:
+            missing = [(start, covered_start), (covered_end, fetch_end)]
+        return [(a, b) for a, b in missing if a < b]
+
+    def _overlapping(self, data, start, end):
+        # Widens a missing segment to the stored bar next to it, which
+        # _extend compares with the fetched one
+        if len(data) and start >= data.index[-1]:
+            start = data.index[-1]
+        elif len(data) and end <= data.index[0]:
+            end = data.index[0] + pd.Timedelta(days=1)
+        return start, end
+
+    def _extend(self, symbol, data, covered_start, covered_end, fetched, start, end):
+        # Merges the bars fetched for [start, end), which must touch the covered range
+        fetched = _normalize(fetched)
+        if _rebased(data, fetched):
+            # A split or dividend since the stored bars were fetched
+            start, end = min(start, covered_start), max(end, covered_end)
+            data, fetched = data.iloc[:0], _normalize(self.fetch(symbol, start, end))
+        data = pd.concat([data, fetched])
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        covered_start = start if covered_start is None else min(start, covered_start)
+        covered_end = end if covered_end is None else max(end, covered_end)
+        self._save(symbol, data, covered_start, covered_end)
+        return data, covered_start, covered_end
+
+    def _path(self, symbol):
+        return os.path.join(self.directory, f"{symbol}.npz")
+
+    def _load(self, symbol):
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return _normalize(pd.DataFrame(columns=COLUMNS)), None, None
+        with np.load(path) as stored:
+            data = pd.DataFrame(
+                {column: stored[column] for column in COLUMNS},
+                index=pd.DatetimeIndex(stored['Date'], name='Date'),
+            )
+            covered = stored['covered']
+        return data, pd.Timestamp(covered[0]), pd.Timestamp(covered[1])
+
+    def _save(self, symbol, data, covered_start, covered_end):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    Date=data.index.values.astype('datetime64[D]'),
+                    covered=np.array([covered_start, covered_end], dtype='datetime64[D]'),
+                    **{column: data[column].to_numpy(dtype=float) for column in COLUMNS},
+                )
+            os.replace(tmp_path, self._path(symbol))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def _normalize(df):
+    # Single level OHLCV columns indexed by a tz-naive Date index
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.droplevel(1, axis=1)
+    df = df.reindex(columns=COLUMNS).astype(float)
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index.normalize().rename('Date')
+    return df
+
+
+def _rebased(data, fetched):
+    # Whether the bars both frames hold disagree on their adjusted prices
+    overlap = data.index.intersection(fetched.index)
+    prices = ['Close', 'Adj Close']
+    stored, fresh = data.loc[overlap, prices].to_numpy(), fetched.loc[overlap, prices].to_numpy()
+    return not np.isclose(stored, fresh, rtol=1e-7, atol=0, equal_nan=True).all()
+
+
+def _yfinance_fetch(symbol, start, end):
+    import yfinance as yf
+    return yf.download(symbol, start=start, end=end, progress=False, auto_adjust=False)
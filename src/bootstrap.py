@@ -0,0 +1,221 @@
+import math
+import numpy as np
+import pandas as pd
+
+from src.regime import get_regime_estimator
+from src.factors import FACTORS
+
+BOOTSTRAP_METHODS = ['stationary', 'circular']
+
+# Number of (path, ticker) series whose factors are computed at once
+FACTOR_BLOCK = 256
+
+
+def block_bootstrap_indices(num_source, num_paths, length, block_size, method="stationary", rng=None):
+    """
+    (length x num_paths) indices into num_source source rows, drawn in blocks
+    of consecutive rows that wrap around the end of the source. A circular
+    block bootstrap uses blocks of exactly block_size rows; the stationary
+    bootstrap (Politis and Romano) starts a new block at each row with
+    probability 1 / block_size, so block lengths are geometric with mean
+    block_size.
+    """
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"Unknown bootstrap method {method}; expected one of {BOOTSTRAP_METHODS}")
+    rng = rng or np.random.default_rng()
+    rows = np.arange(length)[:, None]
+    if method == "stationary":
+        new_block = rng.random((length, num_paths)) < 1.0 / block_size
+    else:
+        new_block = np.broadcast_to(rows % block_size == 0, (length, num_paths)).copy()
+    new_block[0] = True
+    block_row = np.maximum.accumulate(np.where(new_block, rows, 0), axis=0)
+    block_start = rng.integers(num_source, size=(length, num_paths))
+    return (np.take_along_axis(block_start, block_row, axis=0) + rows - block_row) % num_source
+
+
+def bootstrap_panel(panel, indices):
+    """
+    Synthetic (dates x paths x tickers) close and volume arrays built from
+    the panel's dates on which every ticker has a bar. Whole dates are
+    resampled, so each path keeps the cross-sectional correlation of the
+    tickers' returns: the close follows the resampled log returns from the
+    first common close and the volume is the resampled date's volume.
+    """
+    common = ~np.isnan(panel.close).any(axis=1)
+    close, volume = panel.close[common], panel.volume[common]
+    log_returns = np.diff(np.log(close), axis=0)
+    # Returns of row i lead into source row i + 1
+    path_close = log_returns[indices]
+    path_close[0] = 0
+    np.cumsum(path_close, axis=0, out=path_close)
+    np.exp(path_close, out=path_close)
+    path_close *= close[0]
+    return path_close, volume[1:][indices]
+
+
+def simulate_strategy(close, volume, momentum_window, total_window, long_percentile, num_stocks,
+                      initial_cash=1000000, momentum_factor="rsi", hurst_power=8, regime_estimator="rs",
+                      hurst_threshold=0.5, pvalue_threshold=0.05):
+    """
+    Runs the MomentumStrategy rules on every path of (dates x paths x
+    tickers) close and volume arrays at once, the first ticker being the
+    regime series. Every ticker has a bar on every date.
+
+    The rules are those of run_momentum_backtest, vectorized across paths:
+    on each rebalance date the regime filter, the dollar volume universe,
+    the factor ranking and the target weights are computed for all paths
+    with array operations (the regime filter with hurst_threshold and
+    pvalue_threshold as in run_momentum_backtest). Unlike the exact engine,
+    positions are fractional and orders are not margin checked, so a path's
+    curve is close to, not equal to, the single-path backtest.
+
+    Returns the (recorded dates x paths) portfolio values, recorded on the
+    same dates as MomentumStrategy.portfolio_values.
+    """
+    num_dates, num_paths, num_feeds = close.shape
+    num_values = 2**hurst_power + 1
+    rows = np.arange(num_dates)
+    recorded = rows > num_values
+    rebalance_rows = np.flatnonzero(recorded & (rows % momentum_window == 0) & (rows >= total_window))
+
+    # Per-path features, computed over the whole path at once. The regime is
+    # only estimated for the windows the rebalance dates read
+    regime_windows = rebalance_rows - 1 - 2**hurst_power
+    estimate_regime = get_regime_estimator(regime_estimator, hurst_power)
+    regime_hurst, _, regime_pvalue = estimate_regime(close[:, :, 0], hurst_power, np.maximum(regime_windows, 0))
+    # Factors in blocks of series, keeping only the rebalance dates
+    series = close.reshape(num_dates, -1)
+    factor = np.empty((len(rebalance_rows), series.shape[1]))
+    for first in range(0, series.shape[1], FACTOR_BLOCK):
+        block = FACTORS[momentum_factor](series[:, first:first + FACTOR_BLOCK], momentum_window, total_window)
+        factor[:, first:first + FACTOR_BLOCK] = block[rebalance_rows]
+    factor = factor.reshape(len(rebalance_rows), num_paths, num_feeds)
+    # Rolling sums over the total_window bars up to each rebalance date, from
+    # running sums; rebalance dates are never before total_window
+    window_start = np.maximum(rebalance_rows - total_window, 0)
+    dollar_volume = volume * close
+    np.cumsum(dollar_volume, axis=0, out=dollar_volume)
+    dollar_volume = dollar_volume[rebalance_rows] - np.where(
+        (rebalance_rows >= total_window)[:, None, None], dollar_volume[window_start], 0
+    )
+    bad_bars = np.cumsum((volume <= 0) | (close <= 0), axis=0, dtype=np.int32)
+    bad_bars = bad_bars[rebalance_rows] - np.where(
+        (rebalance_rows >= total_window)[:, None, None], bad_bars[window_start], 0
+    )
+
+    cash = np.full(num_paths, float(initial_cash))
+    shares = np.zeros((num_paths, num_feeds))
+    values = np.empty((num_dates, num_paths))
+    num_to_long = int(math.ceil(num_stocks * long_percentile))
+    path_index = np.arange(num_paths)[:, None]
+    previous = 0
+    for i, row in enumerate(rebalance_rows):
+        values[previous:row] = cash + np.einsum('tpk,pk->tp', close[previous:row], shares)
+        previous = row
+        prices = close[row]
+        value = cash + (shares * prices).sum(axis=1)
+
+        if regime_windows[i] >= 0:
+            momentum_driven = (regime_hurst[i] > hurst_threshold) & (regime_pvalue[i] < pvalue_threshold)
+        else:
+            momentum_driven = np.zeros(num_paths, dtype=bool)
+
+        # Universe: top num_stocks eligible feeds by rolling dollar volume
+        eligible = bad_bars[i] == 0
+        ranked = np.argsort(np.where(eligible, -dollar_volume[i], np.inf), axis=1, kind='stable')[:, :num_stocks]
+        universe = np.zeros((num_paths, num_feeds), dtype=bool)
+        universe[path_index, ranked] = np.take_along_axis(eligible, ranked, axis=1)
+
+        # Longs: the top num_to_long universe feeds by factor, if positive
+        scores = np.where(universe, factor[i], -np.inf)
+        ranked = np.argsort(-scores, axis=1, kind='stable')[:, :num_to_long]
+        longs = np.zeros((num_paths, num_feeds), dtype=bool)
+        longs[path_index, ranked] = np.take_along_axis(scores, ranked, axis=1) > 0
+        longs &= momentum_driven[:, None]
+
+        weights = np.where(longs, factor[i], 0.0)
+        total = weights.sum(axis=1, keepdims=True)
+        weights = np.divide(weights, total, out=np.zeros_like(weights), where=total > 0) * 0.9
+        target = weights * value[:, None] / prices
+        # Longs without volume on this bar keep their current position
+        frozen = longs & (volume[row] <= 0)
+        shares = np.where(frozen, shares, target)
+        cash = value - (shares * prices).sum(axis=1)
+
+    values[previous:] = cash + np.einsum('tpk,pk->tp', close[previous:], shares)
+    return values[recorded]
+
+
+def path_statistics(values, periods_per_year=252):
+    """
+    Final value, max drawdown and Sharpe ratio (zero risk-free rate) of every
+    path of a (dates x paths) array of portfolio values.
+    """
+    peak = np.maximum.accumulate(values, axis=0)
+    returns = values[1:] / values[:-1] - 1
+    std = returns.std(axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, returns.mean(axis=0) / std * np.sqrt(periods_per_year), np.nan)
+    return values[-1], ((values - peak) / peak).min(axis=0), sharpe
+
+
+class MonteCarloResult:
+    """
+    Per-path final value, max drawdown and Sharpe ratio of a bootstrap run,
+    and the equity curves of the first few paths.
+    """
+    def __init__(self, final_value, max_drawdown, sharpe, curves):
+        self.final_value = final_value
+        self.max_drawdown = max_drawdown
+        self.sharpe = sharpe
+        self.curves = curves
+
+    def frame(self):
+        return pd.DataFrame({"final_value": self.final_value, "max_drawdown": self.max_drawdown, "sharpe": self.sharpe})
+
+    def summary(self, percentiles=(1, 5, 25, 50, 75, 95, 99)):
+        """
+        Mean and percentiles of each statistic across paths.
+        """
+        frame = self.frame()
+        rows = {"mean": frame.mean()}
+        for p in percentiles:
+            rows[f"p{p}"] = frame.quantile(p / 100)
+        return pd.DataFrame(rows).T
+
+
+def run_monte_carlo(panel, num_paths, momentum_window, total_window, long_percentile, num_stocks,
+                    years=25, block_size=20, method="stationary", chunk_size=100, seed=0,
+                    num_curves=20, **strategy_params):
+    """
+    Block-bootstrap Monte Carlo of the strategy: num_paths synthetic panels
+    of years * 252 dates resampled from the panel (see bootstrap_panel) are
+    simulated chunk_size paths at a time, so only one chunk of paths is in
+    memory at once. Results are reproducible for a given seed and do not
+    depend on chunk_size.
+    """
+    common = int((~np.isnan(panel.close).any(axis=1)).sum())
+    if common < 2:
+        raise ValueError("The panel has no dates on which every ticker has a bar")
+    length = int(years * 252)
+    final_value, max_drawdown, sharpe, curves = [], [], [], []
+    for first in range(0, num_paths, chunk_size):
+        size = min(chunk_size, num_paths - first)
+        # One generator per path keeps paths independent of the chunking
+        rngs = [np.random.default_rng([seed, path]) for path in range(first, first + size)]
+        indices = np.column_stack([
+            block_bootstrap_indices(common - 1, 1, length, block_size, method, rng)[:, 0] for rng in rngs
+        ])
+        close, volume = bootstrap_panel(panel, indices)
+        values = simulate_strategy(close, volume, momentum_window, total_window, long_percentile, num_stocks,
+                                   **strategy_params)
+        final, drawdown, ratio = path_statistics(values)
+        final_value.append(final)
+        max_drawdown.append(drawdown)
+        sharpe.append(ratio)
+        if len(curves) < num_curves:
+            curves.extend(values[:, :num_curves - len(curves)].T)
+    return MonteCarloResult(
+        np.concatenate(final_value), np.concatenate(max_drawdown), np.concatenate(sharpe), np.array(curves)
+    )
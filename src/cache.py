@@ -0,0 +1,85 @@
+import os
+import hashlib
+import tempfile
+import numpy as np
+from collections import OrderedDict
+
+
+class FeatureCache:
+    """
+    Cache of per-ticker feature arrays keyed by (feature, ticker, parameters,
+    data fingerprint), with an in-memory LRU tier and an optional on-disk tier
+    of .npz files so repeated sweeps over the same data start warm.
+
+    Values are tuples of arrays. Disk writes are atomic, so several processes
+    can share one directory.
+    """
+    def __init__(self, directory=None, max_items=1024):
+        self.directory = directory
+        self.max_items = max_items
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, feature, ticker, params, fingerprint, compute):
+        """
+        Returns the cached value for the key, calling compute() and storing
+        its result on a miss. compute must return an array or a tuple of
+        arrays; the cached value is always a tuple.
+        """
+        key = (feature, ticker, tuple(sorted(params.items())), fingerprint)
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return value
+
+        path = self._path(key)
+        if path is not None and os.path.exists(path):
+            with np.load(path) as stored:
+                value = tuple(stored[f"arr_{i}"] for i in range(len(stored.files)))
+            self.disk_hits += 1
+        else:
+            value = compute()
+            value = value if isinstance(value, tuple) else (value,)
+            self.misses += 1
+            if path is not None:
+                self._write(path, value)
+
+        self._memory[key] = value
+        if len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+        return value
+
+    def _path(self, key):
+        if self.directory is None:
+            return None
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"{key[0]}-{digest}.npz")
+
+    def _write(self, path, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, *value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def fingerprint(*arrays):
+    """
+    Content hash of a set of arrays, used to key cached features to the data
+    they were computed from.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str(array.dtype).encode())
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
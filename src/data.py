@@ -1,16 +1,31 @@
 import os
 import warnings
+import numpy as np
 import pandas as pd
-from eodhd import APIClient
+from datetime import timedelta
 from dotenv import load_dotenv
 
+from src.downloader import EODDownloader, EODHD_BASE_URL
+from src.history_store import HistoryStore
+from src.membership import MembershipIndex
+from src.quality import repair_frames, write_quality_report
+
 # Suppress FutureWarnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 load_dotenv()
 
+
+def default_downloader():
+    """
+    EOD downloader configured from the environment (EOD_API_KEY and optionally
+    EOD_BASE_URL).
+    """
+    return EODDownloader(os.getenv('EOD_API_KEY'), base_url=os.getenv('EOD_BASE_URL', EODHD_BASE_URL))
+
+
 class SPYHistoricalData: 
-    def __init__(self, start_date, end_date, resolution, tickers=None, redownload=True): 
+    def __init__(self, start_date, end_date, resolution, tickers=None, redownload=True, downloader=None): 
         self.start_date = start_date
         self.end_date = end_date
         self.resolution = resolution
@@ -23,122 +38,74 @@ class SPYHistoricalData:
         self.SP_500_snapshot_file = "data/ticker_snapshots/s+p_500_tickers_snapshot.csv"
         self.tickers_file = "data/tickers/SP_500_tickers.json"
 
-        
-        # Generate list of tickers included in S&P500 from start date to end date
-        df = pd.read_csv(self.SP_500_snapshot_file, index_col = 'date', parse_dates=True)
-        filtered_df = df.loc[self.start_date:self.end_date]
-        unique_tickers = set()
-        ticker_addition_dates = {}
+        # Point-in-time S&P 500 membership, rebuilt only when the snapshot file changes
+        self.membership = MembershipIndex.load_or_build(self.SP_500_snapshot_file)
 
+        # Generate list of tickers included in S&P500 from start date to end date
+        ticker_addition_dates = self.membership.first_member_dates(self.start_date, self.end_date)
         if tickers is None:
-            for date, tickers_string in filtered_df['tickers'].items(): 
-                tickers = [ticker.strip() for ticker in tickers_string.split(",")]
-                for ticker in tickers:
-                    if ticker not in unique_tickers:
-                        unique_tickers.add(ticker)
-                        ticker_addition_dates[ticker] = date
-
-            self.unique_tickers_list = sorted(unique_tickers)
+            self.unique_tickers_list = sorted(ticker_addition_dates)
         else:
             self.unique_tickers_list = tickers
         
         if redownload:
-            # Download tickers data to the appropriate directory: 
-            eod_api_key = os.getenv('EOD_API_KEY')
-            client = APIClient(eod_api_key)
-            for ticker in self.unique_tickers_list: 
-                ticker_filename = f"{ticker}.csv"
-                if not os.path.exists(os.path.join(self.output_dir, ticker_filename)): 
-                    stock_data_json = client.get_eod_historical_stock_market_data(
-                        symbol=ticker, 
-                        from_date=self.start_date.strftime('%Y-%m-%d'),
-                        to_date=self.end_date.strftime('%Y-%m-%d'),
-                        period=self.resolution
-                    )
-                    data = pd.DataFrame(stock_data_json)
-                    if not data.empty: 
-                        # Rename columns to match Backtrader's expected format
-                        data = data.rename(columns={
-                            'date': 'Date',
-                            'open': 'Open',
-                            'high': 'High',
-                            'low': 'Low',
-                            'close': 'Close',
-                            'adjusted_close': 'Adj Close',
-                            'volume': 'Volume'
-                        })
-                        data['Date'] = pd.to_datetime(data['Date'])
-                        data.set_index('Date', inplace=True)
-                        data.index.name = 'Date'
-                        
-                        # Check for zero or negative values and replace them
-                        columns_to_check = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
-                        should_save = True
-                        for column in columns_to_check:
-                            if (data[column] <= 0).any():
-                                zero_or_negative_values = data[data[column] <= 0][column]
-                                print(f"{ticker} has zero or negative values in column '{column}':")
-                                print(zero_or_negative_values)
-
-                                # Check for more than 14 consecutive zero values
-                                zero_series = (data[column] == 0).astype(int)
-                                consecutive_zeroes = (zero_series != zero_series.shift()).cumsum()
-                                max_consecutive_zeroes = zero_series.groupby(consecutive_zeroes).transform('sum').max()
-                                
-                                if max_consecutive_zeroes > 14:
-                                    print(f"{ticker} has more than 14 consecutive zero values in column '{column}', skipping file.")
-                                    should_save = False
-                                
-                                # Replace zero or negative values with previous row's value
-                                data[column] = data[column].astype(float).replace(0, pd.NA).ffill().infer_objects()
-                        
-                        if should_save:
-                            # Save the data to a CSV file
-                            ticker_filepath = os.path.join(self.output_dir, ticker_filename)
-                            data.to_csv(ticker_filepath)
-
-            valid_dates = set()
-            for ticker in self.unique_tickers_list: 
-                ticker_filename = f"{ticker}.csv"
-                ticker_filepath = os.path.join(self.output_dir, ticker_filename)
-                if os.path.exists(ticker_filepath):
-                    data = pd.read_csv(ticker_filepath, parse_dates=['Date'], index_col='Date')
-                    
-                    # add all dates present in the csv file to the valid_dates set
-                    valid_dates.update(data.index.strftime('%Y-%m-%d'))
-                    
-                    # Set values to -1 for dates before the ticker was added to the S&P 500
-                    addition_date = ticker_addition_dates[ticker]
-                    data.loc[data.index < addition_date, ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']] = -1
-                    data.index.name = 'Date'
-                    data.to_csv(ticker_filepath)
-                    
-            # Ensure all tickers have data for all valid dates
-            for ticker in self.unique_tickers_list:
-                ticker_filename = f"{ticker}.csv"
-                ticker_filepath = os.path.join(self.output_dir, ticker_filename)
-                if os.path.exists(ticker_filepath):
-                    data = pd.read_csv(ticker_filepath, parse_dates=['Date'], index_col='Date')
-                    
-                    # Find missing dates
-                    missing_dates = sorted(set(valid_dates) - set(data.index.strftime('%Y-%m-%d')))
-                    
-                    # Create a DataFrame with missing dates filled with -2
-                    missing_data = pd.DataFrame(
-                        index=pd.to_datetime(missing_dates),
-                        columns=['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume'],
-                        data=-2
-                    )
-                    
-                    # Concatenate the existing data with the missing data
-                    data = pd.concat([data, missing_data]).sort_index()
-                    data.index.name = 'Date'
-                    
-                    data.to_csv(ticker_filepath)
+            # Tickers are sliced out of the shared history store, which only downloads the
+            # parts of the range it does not hold yet
+            history = HistoryStore(downloader or default_downloader(), period=self.resolution)
+            history_end = self.end_date + timedelta(days=1)
+            pending = [ticker for ticker in self.unique_tickers_list if not os.path.exists(os.path.join(self.output_dir, f"{ticker}.csv"))]
+            history.refresh(pending, self.start_date, history_end)
+            frames = {
+                ticker: history.get(ticker, self.start_date, history_end)
+                for ticker in pending if ticker not in history.downloader.failed
+            }
+
+            # Replace zero values with the previous bar's value. Tickers with more than
+            # 14 consecutive zeros in a column are skipped
+            frames, report = repair_frames(frames, max_zero_run=14, skip_long_runs=True)
+            write_quality_report(report, os.path.join(self.output_dir, "quality_report.json"))
+
+            # Save the data to CSV files
+            self.align_tickers(ticker_addition_dates, frames)
+
+    def align_tickers(self, ticker_addition_dates, frames=None):
+        """
+        Aligns every ticker onto the union of all their dates in a single
+        pass and writes each one's CSV file once: bars before the ticker
+        joined the S&P 500 are set to -1 and dates on which it has no bar are
+        added with -2. frames holds freshly downloaded tickers in memory;
+        only the other tickers are read from their existing files.
+        """
+        columns = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+        frames = dict(frames or {})
+        for ticker in self.unique_tickers_list:
+            ticker_filepath = os.path.join(self.output_dir, f"{ticker}.csv")
+            if ticker not in frames and os.path.exists(ticker_filepath):
+                frames[ticker] = pd.read_csv(ticker_filepath, parse_dates=['Date'], index_col='Date')
+        if not frames:
+            return
+
+        valid_dates = pd.DatetimeIndex(np.unique(np.concatenate([data.index.values for data in frames.values()])))
+        for ticker, data in frames.items():
+            dtypes = data.dtypes
+            missing = np.ones(len(valid_dates), dtype=bool)
+            missing[valid_dates.get_indexer(data.index)] = False
+
+            # Set values to -1 for dates before the ticker was added to the S&P 500
+            data = data.reindex(valid_dates)
+            addition_date = ticker_addition_dates.get(ticker)
+            if addition_date is not None:
+                data.loc[~missing & (valid_dates < addition_date), columns] = -1
+
+            # Fill dates on which the ticker has no bar with -2
+            data.loc[missing, columns] = -2
+            data = data.astype(dtypes)
+            data.index.name = 'Date'
+            data.to_csv(os.path.join(self.output_dir, f"{ticker}.csv"))
 
 
 class ETFHistoricalData:
-    def __init__(self, start_date, end_date, resolution, etf_tickers=None):
+    def __init__(self, start_date, end_date, resolution, etf_tickers=None, downloader=None):
         self.etf_tickers = etf_tickers
         self.start_date = start_date
         self.end_date = end_date
@@ -149,56 +116,21 @@ class ETFHistoricalData:
         if not os.path.exists(self.output_dir): 
             os.makedirs(self.output_dir)
 
-        # Download tickers data to the appropriate directory: 
-        eod_api_key = os.getenv('EOD_API_KEY')
-        client = APIClient(eod_api_key)
-        for ticker in etf_tickers: 
-            ticker_filename = f"{ticker}.csv"
-            if not os.path.exists(os.path.join(self.output_dir, ticker_filename)): 
-                stock_data_json = client.get_eod_historical_stock_market_data(
-                    symbol=ticker, 
-                    from_date=self.start_date.strftime('%Y-%m-%d'),
-                    to_date=self.end_date.strftime('%Y-%m-%d'),
-                    period=self.resolution
-                )
-                data = pd.DataFrame(stock_data_json)
-                if not data.empty: 
-                    # Rename columns to match Backtrader's expected format
-                    data = data.rename(columns={
-                        'date': 'Date',
-                        'open': 'Open',
-                        'high': 'High',
-                        'low': 'Low',
-                        'close': 'Close',
-                        'adjusted_close': 'Adj Close',
-                        'volume': 'Volume'
-                    })
-                    data['Date'] = pd.to_datetime(data['Date'])
-                    data.set_index('Date', inplace=True)
-                    data.index.name = 'Date'
-                    
-                    # Check for zero or negative values and replace them
-                    columns_to_check = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
-                    should_save = True
-                    for column in columns_to_check:
-                        if (data[column] <= 0).any():
-                            zero_or_negative_values = data[data[column] <= 0][column]
-                            #print(f"{ticker} has zero or negative values in column '{column}':")
-                            #print(zero_or_negative_values)
-
-                            # Check for more than 14 consecutive zero values
-                            zero_series = (data[column] == 0).astype(int)
-                            consecutive_zeroes = (zero_series != zero_series.shift()).cumsum()
-                            max_consecutive_zeroes = zero_series.groupby(consecutive_zeroes).transform('sum').max()
-                            
-                            if max_consecutive_zeroes > 21:
-                                print(f"{ticker} has more than 14 consecutive zero values in column '{column}', skipping file.")
-                                #should_save = False
-                            
-                            # Replace zero or negative values with previous row's value
-                            data[column] = data[column].astype(float).replace(0, pd.NA).ffill().infer_objects()
-                    
-                    if should_save:
-                        # Save the data to a CSV file
-                        ticker_filepath = os.path.join(self.output_dir, ticker_filename)
-                        data.to_csv(ticker_filepath)
\ No newline at end of file
+        # Tickers are sliced out of the shared history store, which only downloads the
+        # parts of the range it does not hold yet
+        history = HistoryStore(downloader or default_downloader(), period=self.resolution)
+        history_end = self.end_date + timedelta(days=1)
+        pending = [ticker for ticker in etf_tickers if not os.path.exists(os.path.join(self.output_dir, f"{ticker}.csv"))]
+        history.refresh(pending, self.start_date, history_end)
+        frames = {
+            ticker: history.get(ticker, self.start_date, history_end)
+            for ticker in pending if ticker not in history.downloader.failed
+        }
+
+        # Replace zero values with the previous bar's value. Tickers with more than
+        # 21 consecutive zeros in a column are only flagged in the report
+        frames, report = repair_frames(frames, max_zero_run=21, skip_long_runs=False)
+        write_quality_report(report, os.path.join(self.output_dir, "quality_report.json"))
+        for ticker, data in frames.items():
+            # Save the data to a CSV file
+            data.to_csv(os.path.join(self.output_dir, f"{ticker}.csv"))
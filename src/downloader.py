@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import random
+import logging
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+EODHD_BASE_URL = "https://eodhd.com/api"
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: acquire() blocks until a token is available.
+    Tokens refill at rate per second up to capacity, which allows short bursts
+    while holding the long-run request rate to the quota.
+    """
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+
+class DownloadError(Exception):
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class EODDownloader:
+    """
+    Downloads end of day bars for many tickers from the EODHD API across a
+    pool of threads. Requests go through a token bucket sized to the API
+    quota (requests_per_minute) and failed requests are retried with
+    exponential backoff; 429 and 5xx responses are retried, other client
+    errors are not.
+
+    With manifest_path, tickers whose results were processed are recorded in
+    a JSON manifest and skipped by later runs, so an interrupted download
+    resumes where it stopped. base_url points the downloader at another
+    server, such as src/scripts/stub_eod_server.py.
+    """
+    def __init__(self, api_key, base_url=EODHD_BASE_URL, max_workers=8, requests_per_minute=1000,
+                 burst=10, retries=5, backoff=1.0, timeout=30, manifest_path=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(requests_per_minute / 60, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.manifest_path = manifest_path
+        self.completed = self._load_manifest()
+        self.failed = {}
+
+    def download(self, tickers, from_date, to_date, period='d'):
+        """
+        Yields (ticker, bars) as downloads finish, bars being the list of
+        dicts the API returns. A ticker is recorded in the manifest once the
+        caller asks for the next result, i.e. after it has been processed.
+        Tickers that still fail after all retries are collected in
+        self.failed (ticker -> error message) instead of stopping the run.
+        """
+        pending = [ticker for ticker in dict.fromkeys(tickers) if ticker not in self.completed]
+        if not pending:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.fetch_with_retries, ticker, from_date, to_date, period): ticker
+                for ticker in pending
+            }
+            try:
+                for future in as_completed(futures):
+                    ticker = futures[future]
+                    try:
+                        bars = future.result()
+                    except DownloadError as e:
+                        logger.error(f"Failed to download {ticker}: {e}")
+                        self.failed[ticker] = str(e)
+                        continue
+                    yield ticker, bars
+                    if self.manifest_path is not None:
+                        self.completed.add(ticker)
+                        self._save_manifest()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def fetch(self, ticker, from_date, to_date, period='d'):
+        """
+        One request to the EOD endpoint. Raises DownloadError on failure.
+        """
+        query = urllib.parse.urlencode({
+            'from': from_date, 'to': to_date, 'period': period, 'api_token': self.api_key, 'fmt': 'json',
+        })
+        url = f"{self.base_url}/eod/{urllib.parse.quote(ticker)}?{query}"
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            retryable = e.code == 429 or e.code >= 500
+            retry_after = e.headers.get('Retry-After') if e.headers else None
+            retry_after = float(retry_after) if retry_after is not None and retry_after.isdigit() else None
+            raise DownloadError(f"HTTP {e.code}", retryable, retry_after) from e
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise DownloadError(str(e)) from e
+
+    def fetch_with_retries(self, ticker, from_date, to_date, period='d'):
+        """
+        Calls fetch with the rate limiter and retry policy applied.
+        """
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                return self.fetch(ticker, from_date, to_date, period)
+            except DownloadError as e:
+                if not e.retryable or attempt == self.retries:
+                    raise
+                if e.retry_after is not None:
+                    delay = e.retry_after
+                else:
+                    delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                logger.warning(f"{ticker}: {e}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _load_manifest(self):
+        if self.manifest_path is None or not os.path.exists(self.manifest_path):
+            return set()
+        with open(self.manifest_path) as f:
+            return set(json.load(f)['completed'])
+
+    def _save_manifest(self):
+        directory = os.path.dirname(self.manifest_path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({'completed': sorted(self.completed)}, f)
+            os.replace(tmp_path, self.manifest_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
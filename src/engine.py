@@ -0,0 +1,282 @@
+import math
+import numpy as np
+
+from src.regime import get_regime_estimator
+from src.factors import factor_panel, select_longs
+
+
+class BacktestResult:
+    """
+    Outputs of a panel backtest, with the same attributes the plotting and
+    sweep code read from a MomentumStrategy instance.
+    """
+    def __init__(self, portfolio_values, dates, hursts, pvalues, terminated=False):
+        self.portfolio_values = portfolio_values
+        self.dates = dates
+        self.hursts = hursts
+        self.pvalues = pvalues
+        self.terminated = terminated
+
+
+class PanelFeatures:
+    """
+    Inputs of the rebalance decisions of a panel backtest, which do not
+    depend on the long_percentile, the regime thresholds or the trades: the
+    rebalance rows, the regime estimate, factors, rolling dollar volumes
+    and membership of every feed on each of them, and the close and volume
+    of every feed's most recent bar on every date (data.close[0]).
+    """
+    def __init__(self, panel, momentum_window, total_window, momentum_factor="rsi", hurst_power=8, cache=None,
+                 membership=None, regime_estimator="rs"):
+        close, volume = panel.close, panel.volume
+        num_dates, num_feeds = close.shape
+        lengths = panel.bar_counts()
+        self.total_window = total_window
+
+        # Values of each feed's most recent bar on every date (data.close[0])
+        has_bar = ~np.isnan(close)
+        last_row = np.maximum.accumulate(np.where(has_bar, np.arange(num_dates)[:, None], -1), axis=0)
+        cols = np.arange(num_feeds)
+        self.last_row = last_row
+        self.close_now = np.where(last_row >= 0, close[np.maximum(last_row, 0), cols], np.nan)
+        self.volume_now = np.where(last_row >= 0, volume[np.maximum(last_row, 0), cols], np.nan)
+
+        # Per-feed features computed over each feed's own bars
+        feed_closes = [close[has_bar[:, k], k] for k in range(num_feeds)]
+        feed_volumes = [volume[has_bar[:, k], k] for k in range(num_feeds)]
+        fingerprints = panel.fingerprints()
+        estimate_regime = get_regime_estimator(regime_estimator, hurst_power)
+        self.regime_hurst, _, self.regime_pvalue = _cached(
+            cache, "regime", panel.tickers[0], dict(power=hurst_power, estimator=regime_estimator), fingerprints[0],
+            lambda: estimate_regime(feed_closes[0], hurst_power)
+        )
+        self.regime_offset = 2**hurst_power
+
+        # Strategy next() runs once every feed has delivered a bar
+        is_next = lengths.min(axis=1) >= 1
+        self.counters = np.cumsum(is_next) - 1
+        num_values = 2**hurst_power + 1
+        self.recorded = is_next & (self.counters > num_values)
+        rebalance = self.recorded & (self.counters % momentum_window == 0) & (self.counters >= total_window)
+
+        # Features of each feed's current bar on the rebalance dates. The factors
+        # of all tickers come from one cross-sectional computation, cached for
+        # the rebalance dates (set by the windows and the Hurst power)
+        rebalance_rows = self.rebalance_rows = np.flatnonzero(rebalance)
+        if membership is not None:
+            self.members = membership.member_mask(panel.dates[rebalance_rows], panel.tickers)
+        else:
+            self.members = np.ones((len(rebalance_rows), num_feeds), dtype=bool)
+        self.factors, = _cached(
+            cache, f"factor_{momentum_factor}", "panel",
+            dict(momentum_window=momentum_window, total_window=total_window, power=hurst_power), panel.fingerprint(),
+            lambda: factor_panel(close, momentum_factor, momentum_window, total_window, rebalance_rows)
+        )
+        bars = self.bars = lengths[rebalance_rows] - 1
+        self.dollar_volumes = np.zeros(bars.shape)
+        self.good_bars = np.zeros(bars.shape, dtype=np.int64)
+        for k in range(num_feeds):
+            started = bars[:, k] >= 0
+            feed_bars = bars[started, k]
+            dv, good = _cached(
+                cache, "dollar_volume", panel.tickers[k], dict(total_window=total_window), fingerprints[k],
+                lambda: _rolling_dollar_volume(feed_closes[k], feed_volumes[k], total_window)
+            )
+            self.dollar_volumes[started, k] = dv[feed_bars]
+            self.good_bars[started, k] = good[feed_bars]
+
+    def regime(self, i):
+        """
+        Hurst exponent and p-value of the regime series over the closes
+        before rebalance i, NaN before the first full window.
+        """
+        spy_bar = self.bars[i, 0] - 1 - self.regime_offset
+        if spy_bar < 0:
+            return np.nan, np.nan
+        return self.regime_hurst[spy_bar], self.regime_pvalue[spy_bar]
+
+    def universe(self, i, num_stocks):
+        """
+        Feed indices of the top num_stocks tradeable feeds by rolling dollar
+        volume on rebalance i, in dollar volume order.
+        """
+        eligible = np.flatnonzero((self.good_bars[i] >= self.total_window) & self.members[i])
+        return eligible[np.lexsort((eligible, -self.dollar_volumes[i, eligible]))][:num_stocks]
+
+
+def run_momentum_backtest(panel, momentum_window, total_window, long_percentile, num_stocks,
+                          initial_cash=1000000, momentum_factor="rsi", hurst_power=8, cache=None,
+                          membership=None, stop_drawdown=None, hurst_threshold=0.5, pvalue_threshold=0.05,
+                          regime_estimator="rs"):
+    """
+    Runs the MomentumStrategy rules on a PricePanel with NumPy arrays instead
+    of backtrader feeds. The first panel ticker is the regime filter series
+    (SPY), as the first data feed is in the backtrader run.
+
+    Reproduces the backtrader run with cheat-on-close fills: orders created
+    on a bar are margin checked in submission order on the next bar and
+    filled at the close of the bar they were created on.
+
+    The regime is momentum driven when the Hurst exponent of the regime
+    series, estimated with regime_estimator (see src/regime.py), is above
+    hurst_threshold and its p-value below pvalue_threshold.
+
+    Parameter-independent features (the regime series, rolling dollar
+    volumes and factor series) are read through cache, a FeatureCache, when
+    one is given. With membership, a MembershipIndex, the universe is limited
+    to tickers that were index members on each rebalance date.
+
+    With stop_drawdown, the run stops at the first rebalance date on which
+    the drawdown of the portfolio value, sampled on rebalance dates, is below
+    stop_drawdown. The sampled drawdown is never deeper than the true one, so
+    the full run's max drawdown is below stop_drawdown too. The result then
+    covers the dates up to that rebalance and has terminated set.
+    """
+    features = PanelFeatures(panel, momentum_window, total_window, momentum_factor, hurst_power, cache, membership,
+                             regime_estimator)
+    close_now, volume_now, rebalance_rows = features.close_now, features.volume_now, features.rebalance_rows
+    num_dates, num_feeds = close_now.shape
+
+    cash = float(initial_cash)
+    position = np.zeros(num_feeds)
+    pending = []
+    fill_rows, fill_cash, fill_positions = [0], [cash], [position.copy()]
+    regime_hursts, regime_pvalues = [], []
+    num_to_long = int(math.ceil(num_stocks * long_percentile))
+    end = num_dates
+    peak = -np.inf
+
+    for i, row in enumerate(rebalance_rows):
+        # Orders submitted on the previous rebalance fill on the next bar
+        if pending:
+            cash, position = _fill_orders(pending, cash, position)
+            pending = []
+            fill_rows.append(rebalance_rows[i - 1] + 1)
+            fill_cash.append(cash)
+            fill_positions.append(position.copy())
+
+        prices = close_now[row]
+        value = cash + _position_value(position, prices)
+
+        hurst, pvalue = features.regime(i)
+        regime_hursts.append(hurst)
+        regime_pvalues.append(pvalue)
+
+        if stop_drawdown is not None:
+            peak = max(peak, value)
+            if (value - peak) / peak < stop_drawdown:
+                end = row + 1
+                pending = []
+                break
+
+        pending = _rebalance_orders(hurst, pvalue, position, value, prices, volume_now[row], features.factors[i],
+                                    features.universe(i, num_stocks), num_to_long, hurst_threshold, pvalue_threshold)
+
+    if pending and rebalance_rows[-1] + 1 < end:
+        cash, position = _fill_orders(pending, cash, position)
+        fill_rows.append(rebalance_rows[-1] + 1)
+        fill_cash.append(cash)
+        fill_positions.append(position.copy())
+
+    # Broker value on every date from the cash/positions in effect
+    fill_rows.append(end)
+    values = np.empty(end)
+    for i in range(len(fill_rows) - 1):
+        start, stop = fill_rows[i], fill_rows[i + 1]
+        held = fill_positions[i] != 0
+        values[start:stop] = fill_cash[i] + close_now[start:stop][:, held] @ fill_positions[i][held]
+
+    # Regime values held between rebalance decisions
+    rows = np.flatnonzero(features.recorded[:end])
+    decision = np.searchsorted(rebalance_rows, rows, side='right') - 1
+    regime_hursts = np.asarray(regime_hursts + [0.5])
+    regime_pvalues = np.asarray(regime_pvalues + [0.0])
+    dates = [d.item() for d in panel.dates[features.last_row[rows, 0]]]
+
+    return BacktestResult(
+        portfolio_values=values[rows],
+        dates=dates,
+        hursts=regime_hursts[decision],
+        pvalues=regime_pvalues[decision],
+        terminated=end < num_dates,
+    )
+
+
+def _cached(cache, feature, ticker, params, fingerprint, compute):
+    if cache is None:
+        value = compute()
+        return value if isinstance(value, tuple) else (value,)
+    return cache.get(feature, ticker, params, fingerprint, compute)
+
+
+def _position_value(position, prices):
+    held = position != 0
+    return float(position[held] @ prices[held])
+
+
+def _target_size(target, size, price):
+    # order_target_value: whole shares towards the target value
+    value = size * price
+    if target > value:
+        return int((target - value) // price)
+    elif target < value:
+        return -int((value - target) // price)
+    return 0
+
+
+def _rebalance_orders(hurst, pvalue, position, value, prices, volumes, factors, universe, num_to_long,
+                      hurst_threshold=0.5, pvalue_threshold=0.05):
+    """
+    Orders of one rebalance decision in MomentumStrategy's submission order:
+    exits of every holding when the regime is not momentum driven (a Hurst
+    exponent above hurst_threshold with a p-value below pvalue_threshold),
+    otherwise
+    sales of holdings outside the longs, then target orders for the longs
+    already held and for the new ones. universe holds feed indices in
+    dollar volume order; longs without volume on this bar are skipped.
+    """
+    holdings = np.flatnonzero(position > 0)
+    if not (hurst > hurst_threshold and pvalue < pvalue_threshold):
+        return [(k, -position[k], prices[k]) for k in holdings]
+
+    longs, weights = select_longs(factors[universe], num_to_long)
+    longs = universe[longs].tolist()
+    holdings = holdings.tolist()
+    orders = [(k, -position[k], prices[k]) for k in holdings if k not in longs]
+    for rebalance_held in (True, False):
+        for k, weight in zip(longs, weights):
+            if volumes[k] > 0 and (k in holdings) == rebalance_held:
+                size = _target_size(weight * value, position[k], prices[k])
+                if size:
+                    orders.append((k, size, prices[k]))
+    return orders
+
+
+def _fill_orders(orders, cash, position):
+    """
+    Applies the orders of one bar like backtrader's broker: orders are checked
+    in submission order against the running cash (a rejected order's cost is
+    still deducted from the running check) and accepted orders fill at the
+    price they were created with.
+    """
+    position = position.copy()
+    check_cash = cash
+    for k, size, price in orders:
+        check_cash -= size * price
+        if check_cash >= 0.0:
+            cash -= size * price
+            position[k] += size
+    return cash, position
+
+
+def _rolling_dollar_volume(closes, volumes, window):
+    # Sum of the last `window` dollar volumes and number of consecutive bars
+    # with positive volume and close, at every bar of one feed
+    dollar_volume = np.cumsum(volumes * closes)
+    if window > 0:
+        dollar_volume[window:] = dollar_volume[window:] - dollar_volume[:-window]
+    bar = np.arange(len(closes))
+    bad = (volumes <= 0) | (closes <= 0)
+    last_bad = np.maximum.accumulate(np.where(bad, bar, -1))
+    return dollar_volume, bar - last_bad
+
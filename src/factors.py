@@ -0,0 +1,130 @@
+import numpy as np
+from scipy.signal import lfilter
+
+# Number of tickers whose factors are computed at once
+FACTOR_BLOCK = 16
+
+# Momentum factors by name. Each computes the factor of every bar of every
+# ticker at once from a (bars x tickers) array of closes (see register_factor)
+FACTORS = {}
+
+
+def register_factor(name):
+    """
+    Decorator registering compute(closes, momentum_window, total_window) as
+    the momentum factor `name`, selectable with the momentum_factor
+    parameter. closes is a (bars x tickers) array holding each ticker's
+    consecutive valid bars from row 0; rows past a ticker's last bar repeat
+    its last close. compute returns the factor of every bar as an array of
+    the same shape, using only the bars up to that one.
+    """
+    def register(compute):
+        FACTORS[name] = compute
+        return compute
+    return register
+
+
+def factor_panel(close, name, momentum_window, total_window, rows=None):
+    """
+    The factor `name` of every ticker of a dates x tickers close array, on
+    the dates in rows (every date by default), as a (rows x tickers) array.
+    Each ticker's factor is computed over its own valid bars only: dates
+    without a bar (NaN) and non-tradeable bars (the -1/-2 sentinel prices
+    SPYHistoricalData fills in) are skipped and carry the factor of the
+    ticker's last valid bar, or 0 before its first one.
+
+    The factor is computed for FACTOR_BLOCK tickers per call, small enough
+    for the block to stay in cache.
+    """
+    close = np.asarray(close, dtype=float)
+    rows = np.arange(len(close)) if rows is None else np.asarray(rows, dtype=np.int64)
+    factor = np.empty((close.shape[1], len(rows)))
+    for first in range(0, close.shape[1], FACTOR_BLOCK):
+        # One ticker per row, its valid bars moved to the front and the rest
+        # padded with its last valid close
+        block = np.ascontiguousarray(close[:, first:first + FACTOR_BLOCK].T)
+        with np.errstate(invalid='ignore'):
+            valid = block > 0
+        counts = valid.sum(axis=1)
+        compact = np.empty(block.shape)
+        for k, count in enumerate(counts):
+            compact[k, :count] = block[k, valid[k]]
+            compact[k, count:] = compact[k, count - 1] if count else 1.0
+
+        block_factor = FACTORS[name](compact.T, momentum_window, total_window).T
+        bars = np.cumsum(valid, axis=1)[:, rows] - 1
+        factor[first:first + FACTOR_BLOCK] = np.where(
+            bars >= 0, np.take_along_axis(block_factor, np.maximum(bars, 0), axis=1), 0
+        )
+    return factor.T
+
+
+def select_longs(factors, num_to_long, exposure=0.9):
+    """
+    Longs of one rebalance from the factors of the universe tickers, in
+    universe order: the num_to_long largest factors (ties in universe order)
+    that are positive. Returns their positions in factors and their target
+    weights, proportional to the factor and summing to exposure.
+    """
+    factors = np.asarray(factors, dtype=float)
+    longs = np.argsort(-factors, kind='stable')[:num_to_long]
+    longs = longs[factors[longs] > 0]
+    return longs, factors[longs] / factors[longs].sum() * exposure
+
+
+@register_factor("rsi")
+def rsi_factor(closes, momentum_window, total_window):
+    # 100 - RSI with pandas_ta's full-history smoothing (see StreamingRSI)
+    changes = np.diff(closes, axis=0, prepend=closes[:1])
+    decay = [1, -(1.0 - 1.0 / momentum_window)]
+    gain = lfilter([1], decay, np.maximum(changes, 0), axis=0)
+    loss = lfilter([1], decay, np.maximum(-changes, 0), axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 * gain / (gain + loss)
+    bar = np.arange(len(closes)).reshape((-1,) + (1,) * (closes.ndim - 1))
+    factor = 100 - rsi
+    return np.where((bar + 1 < total_window) | (bar < momentum_window), 0, factor)
+
+
+@register_factor("macd")
+def macd_factor(closes, momentum_window, total_window, fast=12, slow=26, signal=9):
+    # MACD histogram (see StreamingMACD). Every ticker's bars start at row 0,
+    # so the MACD line is defined from the same row for all of them
+    fast, slow = sorted((fast, slow))
+    macd = _seeded_ema(closes, fast) - _seeded_ema(closes, slow)
+    histo = np.full(closes.shape, np.nan)
+    histo[slow - 1:] = macd[slow - 1:] - _seeded_ema(macd[slow - 1:], signal, seed=1)
+    return np.where(np.isnan(histo), 0, histo)
+
+
+@register_factor("momentum")
+def momentum_factor(closes, momentum_window, total_window):
+    # Full-history momentum factor (see MomentumFactor)
+    if len(closes) == 0:
+        return closes
+    returns = closes[1:] / closes[:-1] - 1
+    count = np.arange(len(closes), dtype=float).reshape((-1,) + (1,) * (closes.ndim - 1))
+    zero = np.zeros((1,) + closes.shape[1:])
+    total = np.concatenate([zero, np.cumsum(returns, axis=0)])
+    total_sq = np.concatenate([zero, np.cumsum(returns * returns, axis=0)])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = (total_sq - total * total / count) / (count - 1)
+        std_dev = np.where(count > 1, np.sqrt(np.maximum(variance, 0)), np.nan)
+        factor = np.where(std_dev != 0, -(closes - closes[0]) / closes[0] / std_dev, 0)
+    factor[np.arange(len(closes)) + 1 < total_window] = 0
+    return factor
+
+
+def _seeded_ema(values, length, seed=None):
+    # EMA with smoothing 2 / (length + 1) down axis 0, seeded with the mean of
+    # the first `seed` values (see _SeededEMA)
+    seed = length if seed is None else seed
+    ema = np.full(values.shape, np.nan)
+    if len(values) < seed:
+        return ema
+    alpha = 2.0 / (length + 1)
+    start = np.mean(values[:seed], axis=0) if seed > 1 else values[0]
+    ema[seed - 1] = start
+    zi = ((1 - alpha) * np.asarray(start))[None]
+    ema[seed:] = lfilter([alpha], [1, -(1 - alpha)], values[seed:], axis=0, zi=zi)[0]
+    return ema
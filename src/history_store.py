@@ -0,0 +1,77 @@
+import pandas as pd
+from collections import defaultdict
+
+from src.benchmark_store import BenchmarkStore
+from src.downloader import DownloadError
+
+EOD_COLUMNS = {
+    'date': 'Date',
+    'open': 'Open',
+    'high': 'High',
+    'low': 'Low',
+    'close': 'Close',
+    'adjusted_close': 'Adj Close',
+    'volume': 'Volume',
+}
+
+
+class HistoryStore(BenchmarkStore):
+    """
+    Single per-ticker store of EOD price history shared by every date range.
+    Like BenchmarkStore it records the range covered by each ticker and only
+    downloads the missing head or tail; refresh does so for many tickers at
+    once through an EODDownloader, grouping tickers that miss the same
+    segment into one concurrent batch. Any sub-range is served as a slice.
+    As in BenchmarkStore, a ticker whose stored bar next to the segment has
+    been re-adjusted since is fetched again over its whole covered range.
+
+    Ranges are [start, end) like BenchmarkStore. The downloader should not
+    keep a manifest: the covered ranges already record what was fetched.
+    Raw API bars are stored and cleaning is left to the caller.
+    """
+    def __init__(self, downloader, directory=None, period='d', offline=False):
+        directory = directory or f"data/stock_data/history_{period}"
+        super().__init__(directory, fetch=self._fetch_one, offline=offline)
+        self.downloader = downloader
+        self.period = period
+
+    def refresh(self, tickers, start, end):
+        """
+        Downloads every ticker's missing segments of [start, end) and merges
+        them into the store. Tickers that fail to download are left as they
+        were and listed in self.downloader.failed.
+        """
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        segments = defaultdict(list)
+        for ticker in dict.fromkeys(tickers):
+            data, covered_start, covered_end = self._load(ticker)
+            for a, b in self._missing(start, end, covered_start, covered_end):
+                segments[self._overlapping(data, a, b)].append(ticker)
+        if segments and self.offline:
+            raise LookupError(f"{len(segments)} segments of {start.date()} to {end.date()} are not stored")
+
+        for (a, b), group in segments.items():
+            for ticker, bars in self.downloader.download(group, *_eod_range(a, b), self.period):
+                data, covered_start, covered_end = self._load(ticker)
+                try:
+                    self._extend(ticker, data, covered_start, covered_end, bars_frame(bars), a, b)
+                except DownloadError as e:
+                    # The full range refetch after a change of adjustment failed
+                    self.downloader.failed[ticker] = str(e)
+
+    def _fetch_one(self, ticker, start, end):
+        return bars_frame(self.downloader.fetch_with_retries(ticker, *_eod_range(start, end), self.period))
+
+
+def bars_frame(bars):
+    """
+    EOD API bars (a list of dicts) as a DataFrame indexed by Date with the
+    Yahoo style column names.
+    """
+    data = pd.DataFrame(bars, columns=list(EOD_COLUMNS)).rename(columns=EOD_COLUMNS)
+    return data.set_index(pd.DatetimeIndex(pd.to_datetime(data.pop('Date')), name='Date'))
+
+
+def _eod_range(start, end):
+    # The EOD API takes an inclusive end date
+    return start.strftime('%Y-%m-%d'), (end - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
@@ -0,0 +1,123 @@
+import numpy as np
+import scipy.stats as sps
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Upper bound on the number of floats materialized at once when
+# building the (block start, ticker, block length) sub-block arrays
+MAX_BLOCK_ELEMENTS = 2**22
+
+
+def rolling_hurst(prices, power=8, windows=None):
+    """
+    Computes the rescaled range (R/S) Hurst exponent, its t-statistic against
+    H = 0.5 and the two-sided p-value for every rolling window of 2**power + 1
+    prices at once.
+
+    prices may be a 1-d price series or a 2-d (dates x tickers) panel. The
+    outputs have len(prices) - 2**power rows; row t is the estimate for the
+    window prices[t:t + 2**power + 1]. With windows, an array of window
+    start rows, only those windows are estimated and the outputs have one
+    row per entry of windows.
+    """
+    prices = np.asarray(prices, dtype=float)
+    squeeze = prices.ndim == 1
+    if squeeze:
+        prices = prices[:, None]
+
+    n = 2**power
+    # Compute returns
+    returns = prices[1:] / prices[:-1] - 1
+    num_windows = len(returns) - n + 1
+    window_starts = np.arange(max(num_windows, 0)) if windows is None else np.asarray(windows, dtype=np.int64)
+    if num_windows <= 0 or len(window_starts) == 0:
+        empty = np.empty((0,) if squeeze else (0, prices.shape[1]))
+        return empty, empty.copy(), empty.copy()
+
+    # Log2 of the mean rescaled range for every window and every sub-block size
+    X = np.arange(2, power + 1)
+    means = _window_block_means(returns, power, X, _block_rescaled_range, None if windows is None else window_starts)
+    Y = np.log2(means)
+
+    hursts, tstats, pvalues = _ols_slope_test(X, Y, 0.5)
+    if squeeze:
+        return hursts[:, 0], tstats[:, 0], pvalues[:, 0]
+    return hursts, tstats, pvalues
+
+
+def _window_block_means(series, power, X, statistic, windows=None):
+    """
+    Mean of a block statistic over the 2**(power - p) adjacent,
+    non-overlapping blocks of 2**p values that tile each rolling window of
+    2**power values of series, for every p in X. statistic maps a (blocks,
+    tickers, m) array to the (blocks, tickers) statistic of each block.
+
+    Returns an array of shape (windows, tickers, len(X)); row t is the
+    window series[t:t + 2**power], or with windows, an array of window start
+    rows, one row per entry of windows.
+    """
+    n = 2**power
+    window_starts = np.arange(len(series) - n + 1) if windows is None else windows
+    means = np.empty((len(window_starts), series.shape[1], len(X)))
+    for k, p in enumerate(X):
+        m = 2**p
+        s = 2**(power - p)
+        # Window t averages the s adjacent, non-overlapping blocks starting at t
+        starts = window_starts[:, None] + np.arange(s) * m
+        if windows is None:
+            values = _block_statistics(series, m, statistic)
+        else:
+            # Only the blocks the requested windows use
+            block_starts, starts = np.unique(starts, return_inverse=True)
+            starts = starts.reshape(len(window_starts), s)
+            values = _block_statistics(series, m, statistic, block_starts)
+        means[:, :, k] = values[starts].mean(axis=1)
+    return means
+
+
+def _block_statistics(series, m, statistic, block_starts=None):
+    """
+    Computes statistic for every length-m block of series, indexed by block
+    start. Returns an array of shape (len(series) - m + 1, tickers), or one
+    row per entry of block_starts when only those blocks are needed.
+    """
+    num_blocks = len(series) - m + 1 if block_starts is None else len(block_starts)
+    values = np.empty((num_blocks, series.shape[1]))
+    chunk = max(1, MAX_BLOCK_ELEMENTS // (m * series.shape[1]))
+    for start in range(0, num_blocks, chunk):
+        stop = min(start + chunk, num_blocks)
+        if block_starts is None:
+            # (blocks, tickers, m) view of every sub-block in this chunk
+            blocks = sliding_window_view(series[start:stop + m - 1], m, axis=0)
+        else:
+            blocks = series[block_starts[start:stop, None] + np.arange(m)].transpose(0, 2, 1)
+        values[start:stop] = statistic(blocks)
+    return values
+
+
+def _block_rescaled_range(blocks):
+    # Rescaled range of each (block, ticker) row of a (blocks, tickers, m) array
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = blocks.mean(axis=2, keepdims=True)
+        deviate = np.cumsum(blocks - mean, axis=2)
+        difference = deviate.max(axis=2) - deviate.min(axis=2)
+        return difference / blocks.std(axis=2)
+
+
+def _ols_slope_test(X, Y, null_slope):
+    """
+    Closed form least squares fit of Y[..., k] = a + b * X[k] along the last
+    axis. Returns the slope, its t-statistic against null_slope and the
+    two-sided p-value.
+    """
+    X = np.asarray(X, dtype=float)
+    x_centered = X - X.mean()
+    sxx = np.dot(x_centered, x_centered)
+    slope = Y @ x_centered / sxx
+    intercept = Y.mean(axis=-1) - slope * X.mean()
+    residuals = Y - (intercept[..., None] + slope[..., None] * X)
+    df_resid = len(X) - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stderr = np.sqrt((residuals**2).sum(axis=-1) / df_resid / sxx)
+        tstat = (slope - null_slope) / stderr
+    pvalue = 2 * sps.t.sf(np.abs(tstat), df_resid)
+    return slope, tstat, pvalue
@@ -0,0 +1,236 @@
+import math
+import array
+import numpy as np
+import backtrader as bt
+
+from src.regime import get_regime_estimator
+from src.factors import factor_panel
+
+
+class HurstRegime(bt.Indicator):
+    """
+    Rolling Hurst exponent regime filter, with the estimator named by the
+    estimator parameter (R/S by default, see src/regime.py). The whole
+    series is computed in one batch the first time it is needed (the full
+    buffer is available when the feed is preloaded) and only new windows
+    are computed for live feeds.
+
+    hurst[0] is the estimate over the last 2**power + 1 closes, including the
+    current bar. The indicator keeps a minimum period of 1 and outputs NaN
+    until enough bars are available, so it does not delay the strategy.
+    """
+    lines = ('hurst', 'tstat', 'pvalue')
+    params = (
+        ('power', 8),
+        ('estimator', 'rs'),
+    )
+    plotinfo = dict(subplot=True)
+
+    def __init__(self):
+        self.estimate_regime = get_regime_estimator(self.p.estimator, self.p.power)
+        self._hurst = np.empty(0)
+        self._tstat = np.empty(0)
+        self._pvalue = np.empty(0)
+
+    def _extend(self, end):
+        # Compute the estimates for bars [len(self._hurst), end)
+        begin = len(self._hurst)
+        if end <= begin:
+            return
+        n = 2**self.p.power
+        first = max(begin, n)
+        hursts = np.full(end - begin, np.nan)
+        tstats = np.full(end - begin, np.nan)
+        pvalues = np.full(end - begin, np.nan)
+        if end > first:
+            prices = np.asarray(self.data.array[first - n:end], dtype=float)
+            h, t, p = self.estimate_regime(prices, self.p.power)
+            hursts[first - begin:] = h
+            tstats[first - begin:] = t
+            pvalues[first - begin:] = p
+        self._hurst = np.concatenate([self._hurst, hursts])
+        self._tstat = np.concatenate([self._tstat, tstats])
+        self._pvalue = np.concatenate([self._pvalue, pvalues])
+
+    def next(self):
+        i = len(self.data) - 1
+        if i >= len(self._hurst):
+            self._extend(len(self.data.array))
+        self.lines.hurst[0] = self._hurst[i]
+        self.lines.tstat[0] = self._tstat[i]
+        self.lines.pvalue[0] = self._pvalue[i]
+
+    def once(self, start, end):
+        self._extend(end)
+        self.lines.hurst.array[start:end] = array.array('d', self._hurst[start:end])
+        self.lines.tstat.array[start:end] = array.array('d', self._tstat[start:end])
+        self.lines.pvalue.array[start:end] = array.array('d', self._pvalue[start:end])
+
+
+class StreamingRSI(bt.Indicator):
+    """
+    RSI with pandas_ta's smoothing (an adjusted exponential average of gains
+    and losses over the whole history, alpha = 1 / period), updated in O(1)
+    per bar. The averages share the same normalization, so only the decayed
+    sums of gains and losses are kept. Outputs NaN until `period` price
+    changes are available. Bars with a close <= 0 (the -1/-2 sentinels of
+    SPYHistoricalData) are skipped and repeat the previous value.
+    """
+    lines = ('rsi',)
+    params = (
+        ('period', 14),
+    )
+
+    def __init__(self):
+        self._decay = 1.0 - 1.0 / self.p.period
+        self._gain = 0.0
+        self._loss = 0.0
+        self._previous = None
+        self._bars = 0
+        self._value = float('nan')
+
+    def next(self):
+        close = self.data[0]
+        if close > 0:
+            if self._previous is not None:
+                change = close - self._previous
+                self._gain = self._gain * self._decay + max(change, 0)
+                self._loss = self._loss * self._decay + max(-change, 0)
+            self._previous = close
+            self._bars += 1
+
+            total = self._gain + self._loss
+            if self._bars - 1 < self.p.period or total == 0:
+                self._value = float('nan')
+            else:
+                self._value = 100 * self._gain / total
+        self.lines.rsi[0] = self._value
+
+
+class StreamingMACD(bt.Indicator):
+    """
+    MACD, signal line and histogram as computed by compute_macd through
+    pandas_ta, updated in O(1) per bar. The fast and slow EMAs are seeded with
+    the simple average of their first `length` closes. The signal EMA is
+    seeded with the first MACD value, because compute_macd's history frame
+    has a constant index and pandas_ta's signal seed is then taken over the
+    leading NaNs. Outputs NaN until each line has a value. Bars with a close
+    <= 0 are skipped and repeat the previous values.
+    """
+    lines = ('macd', 'signal', 'histo')
+    params = (
+        ('fast', 12),
+        ('slow', 26),
+        ('signal', 9),
+    )
+
+    def __init__(self):
+        fast, slow = sorted((self.p.fast, self.p.slow))
+        self._fast = _SeededEMA(fast)
+        self._slow = _SeededEMA(slow)
+        self._signal = _SeededEMA(self.p.signal, seed=1)
+        self._values = (float('nan'),) * 3
+
+    def next(self):
+        close = self.data[0]
+        if close > 0:
+            fast = self._fast.update(close)
+            slow = self._slow.update(close)
+            macd = fast - slow
+            signal = self._signal.update(macd) if macd == macd else float('nan')
+            self._values = (macd, signal, macd - signal)
+        self.lines.macd[0], self.lines.signal[0], self.lines.histo[0] = self._values
+
+
+class _SeededEMA:
+    """
+    Exponential moving average with smoothing 2 / (length + 1), seeded with
+    the simple average of the first `seed` values (default `length`);
+    returns NaN until then.
+    """
+    def __init__(self, length, seed=None):
+        self.seed = length if seed is None else seed
+        self.alpha = 2.0 / (length + 1)
+        self.count = 0
+        self.value = 0.0
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.seed:
+            self.value += x
+            return float('nan')
+        if self.count == self.seed:
+            self.value = (self.value + x) / self.seed
+        else:
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class MomentumFactor(bt.Indicator):
+    """
+    Momentum factor of MomentumStrategy.compute_momentum, updated in O(1) per
+    bar: minus the price change since the first bar, scaled by the standard
+    deviation of daily returns over the same history (running Welford
+    mean/variance). Bars with a close <= 0 are skipped and repeat the
+    previous value.
+    """
+    lines = ('momentum',)
+
+    def __init__(self):
+        self._first = None
+        self._previous = None
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._value = 0
+
+    def next(self):
+        close = self.data[0]
+        if close > 0:
+            if self._first is None:
+                self._first = close
+            else:
+                ret = close / self._previous - 1
+                self._count += 1
+                delta = ret - self._mean
+                self._mean += delta / self._count
+                self._m2 += delta * (ret - self._mean)
+            self._previous = close
+
+            price_change = (close - self._first) / self._first
+            std_dev = math.sqrt(self._m2 / (self._count - 1)) if self._count > 1 else float('nan')
+            self._value = -price_change / std_dev if std_dev != 0 else 0
+        self.lines.momentum[0] = self._value
+
+
+class PanelFactor(bt.Indicator):
+    """
+    Any momentum factor registered in src/factors.py, for factors without a
+    streaming indicator. Like HurstRegime, the whole series is computed in
+    one batch when first needed and recomputed only when a live feed has
+    delivered new bars. factor[0] is the factor of the current bar.
+    """
+    lines = ('factor',)
+    params = (
+        ('factor', 'rsi'),
+        ('momentum_window', 14),
+        ('total_window', 252),
+    )
+
+    def __init__(self):
+        self._factor = np.empty(0)
+
+    def _extend(self, end):
+        if end > len(self._factor):
+            closes = np.asarray(self.data.array[:end], dtype=float)[:, None]
+            self._factor = factor_panel(closes, self.p.factor, self.p.momentum_window, self.p.total_window)[:, 0]
+
+    def next(self):
+        i = len(self.data) - 1
+        if i >= len(self._factor):
+            self._extend(len(self.data.array))
+        self.lines.factor[0] = self._factor[i]
+
+    def once(self, start, end):
+        self._extend(end)
+        self.lines.factor.array[start:end] = array.array('d', self._factor[start:end])
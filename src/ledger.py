@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+import numpy as np
+import pandas as pd
+
+
+def default_ledger_path(directory="logs/ledger"):
+    """
+    Per-run ledger file name, unique across concurrent runs.
+    """
+    name = f"ledger-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+    return os.path.join(directory, name)
+
+
+class TradeLedger:
+    """
+    Structured event log of a run (regime decisions, rebalances, target
+    weights, fills, closed trades), written as JSON lines.
+
+    record only appends the raw event fields to an in-memory buffer. Full
+    buffers are handed to a background thread, which formats and writes
+    them, so the strategy never waits on string formatting or file I/O.
+    close flushes the remaining events and waits for the writer.
+    """
+    def __init__(self, filepath=None, batch_size=4096):
+        self.filepath = filepath or default_ledger_path()
+        self.batch_size = batch_size
+        self._buffer = []
+        self._batches = queue.Queue()
+        self._error = None
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = threading.Thread(target=self._write_batches, daemon=True)
+        self._writer.start()
+
+    def record(self, event, **fields):
+        self._buffer.append((event, fields))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._batches.put(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        if self._writer.is_alive():
+            self.flush()
+            self._batches.put(None)
+            self._writer.join()
+        if self._error is not None:
+            raise self._error
+
+    def _write_batches(self):
+        try:
+            with open(self.filepath, "w") as f:
+                while True:
+                    batch = self._batches.get()
+                    if batch is None:
+                        return
+                    f.write("".join(
+                        json.dumps({"event": event, **fields}, default=_json_value) + "\n"
+                        for event, fields in batch
+                    ))
+        except Exception as e:
+            self._error = e
+
+
+class NullLedger:
+    """
+    Ledger that discards every event, for runs without a ledger.
+    """
+    filepath = None
+
+    def record(self, event, **fields):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _json_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def read_ledger(filepath, event=None):
+    """
+    Loads a ledger file as a DataFrame, optionally only the rows of one
+    event type.
+    """
+    df = pd.read_json(filepath, lines=True)
+    if event is not None:
+        df = df[df["event"] == event].dropna(axis=1, how="all").reset_index(drop=True)
+    return df
@@ -0,0 +1,135 @@
+import os
+import numpy as np
+import pandas as pd
+
+
+class MembershipIndex:
+    """
+    Point-in-time index membership built from a snapshot file (one row per
+    date with the comma-joined list of member tickers). A snapshot's members
+    are in effect from its date until the next snapshot.
+
+    Tickers are interned into a ticker table and membership is kept twice:
+    as a packed snapshots x tickers bitset, which answers "who was a member
+    on date D" with one binary search, and as per-ticker intervals of
+    snapshot rows, which answer "was T a member over [start, end]" with one
+    binary search in T's intervals. Removals and re-additions are kept.
+    """
+    def __init__(self, dates, tickers, bits):
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.tickers = list(tickers)
+        self.ticker_index = {ticker: k for k, ticker in enumerate(self.tickers)}
+        self.bits = np.asarray(bits, dtype=np.uint8)
+        self._build_intervals()
+
+    @classmethod
+    def from_snapshot_csv(cls, filepath):
+        """
+        Parses a snapshot CSV with 'date' and 'tickers' columns.
+        """
+        df = pd.read_csv(filepath, usecols=['date', 'tickers'], parse_dates=['date'])
+        df = df.sort_values('date', kind='stable').drop_duplicates('date', keep='last')
+        tickers = df['tickers'].fillna('').str.split(',').explode().str.strip()
+        tickers = tickers[tickers != '']
+        rows = df.index.get_indexer(tickers.index)
+        codes, table = pd.factorize(tickers, sort=True)
+        members = np.zeros((len(df), len(table)), dtype=bool)
+        members[rows, codes] = True
+        return cls(df['date'].values, table, np.packbits(members, axis=1))
+
+    @classmethod
+    def load(cls, filepath):
+        with np.load(filepath) as stored:
+            return cls(stored['dates'], stored['tickers'].tolist(), stored['bits'])
+
+    def save(self, filepath):
+        np.savez(filepath, dates=self.dates, tickers=np.array(self.tickers, dtype=str), bits=self.bits)
+
+    @classmethod
+    def load_or_build(cls, snapshot_filepath, index_filepath=None):
+        """
+        Loads the binary index next to the snapshot file, rebuilding it when
+        it is missing or older than the snapshot file.
+        """
+        index_filepath = index_filepath or os.path.splitext(snapshot_filepath)[0] + ".membership.npz"
+        if os.path.exists(index_filepath) and os.path.getmtime(index_filepath) >= os.path.getmtime(snapshot_filepath):
+            return cls.load(index_filepath)
+        index = cls.from_snapshot_csv(snapshot_filepath)
+        index.save(index_filepath)
+        return index
+
+    def members(self, date):
+        """
+        Tickers that were members on date.
+        """
+        row = self._row(date)
+        if row < 0:
+            return []
+        columns = np.flatnonzero(np.unpackbits(self.bits[row], count=len(self.tickers)))
+        return [self.tickers[k] for k in columns]
+
+    def is_member(self, ticker, date):
+        return self.was_member(ticker, date, date)
+
+    def was_member(self, ticker, start, end):
+        """
+        Whether ticker was a member on every date in [start, end].
+        """
+        k = self.ticker_index.get(ticker)
+        first, last = self._row(start), self._row(end)
+        if k is None or first < 0:
+            return False
+        starts = self._interval_starts[self._offsets[k]:self._offsets[k + 1]]
+        i = np.searchsorted(starts, first, side='right') - 1
+        return i >= 0 and self._interval_ends[self._offsets[k] + i] >= last
+
+    def member_mask(self, dates, tickers):
+        """
+        dates x tickers boolean array of point-in-time membership, False for
+        tickers that never appear in the index.
+        """
+        rows = np.searchsorted(self.dates, np.asarray(dates, dtype='datetime64[D]'), side='right') - 1
+        known = np.array([ticker in self.ticker_index for ticker in tickers], dtype=bool)
+        columns = np.array([self.ticker_index.get(ticker, 0) for ticker in tickers], dtype=np.int64)
+        members = np.unpackbits(self.bits[np.maximum(rows, 0)], axis=1, count=len(self.tickers)).astype(bool)
+        return members[:, columns] & known & (rows >= 0)[:, None]
+
+    def tickers_between(self, start, end):
+        """
+        Tickers that were members at any time in [start, end], sorted.
+        """
+        first, last = max(self._row(start), 0), self._row(end)
+        if last < 0:
+            return []
+        members = np.bitwise_or.reduce(self.bits[first:last + 1], axis=0)
+        return [self.tickers[k] for k in np.flatnonzero(np.unpackbits(members, count=len(self.tickers)))]
+
+    def first_member_dates(self, start, end):
+        """
+        First snapshot date in [start, end] on which each ticker that was a
+        member in that range appears.
+        """
+        first = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start).date(), 'D'))
+        last = self._row(end)
+        if first > last:
+            return {}
+        members = np.unpackbits(self.bits[first:last + 1], axis=1, count=len(self.tickers)).astype(bool)
+        seen = members.any(axis=0)
+        rows = first + members.argmax(axis=0)
+        return {self.tickers[k]: pd.Timestamp(self.dates[rows[k]]) for k in np.flatnonzero(seen)}
+
+    def _row(self, date):
+        # Snapshot in effect on date, -1 before the first snapshot
+        return int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date).date(), 'D'), side='right')) - 1
+
+    def _build_intervals(self):
+        # Runs of consecutive member snapshots per ticker, stored ticker by ticker
+        members = np.unpackbits(self.bits, axis=1, count=len(self.tickers)).astype(bool)
+        padded = np.zeros((len(self.dates) + 2, len(self.tickers)), dtype=np.int8)
+        padded[1:-1] = members
+        edges = np.diff(padded, axis=0)
+        start_columns, start_rows = np.nonzero(edges.T == 1)
+        _, end_rows = np.nonzero(edges.T == -1)
+        self._interval_starts = start_rows
+        self._interval_ends = end_rows - 1
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(start_columns, minlength=len(self.tickers)))])
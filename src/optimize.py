@@ -0,0 +1,287 @@
+import math
+import shutil
+import itertools
+import tempfile
+import numpy as np
+
+from src.sweep import run_sweep
+
+
+class Trial:
+    """
+    One parameter set evaluated on the first `budget` fraction of the
+    trading period. score is the objective (higher is better) once the
+    run has finished; terminated marks runs stopped early because they
+    could no longer beat the search's threshold.
+    """
+    def __init__(self, params, budget=1.0):
+        self.params = params
+        self.budget = budget
+        self.score = None
+        self.terminated = False
+
+    def __repr__(self):
+        return f"Trial({self.params}, budget={self.budget:.3f}, score={self.score})"
+
+
+class SearchStrategy:
+    """
+    Ask/tell interface of the optimizers run by optimize. space maps every
+    searched parameter to its list of candidate values.
+
+    ask returns the next batch of trials to run ([] once the search is
+    done), tell receives finished trials (possibly in several chunks per
+    batch), and threshold gives the score a trial at a budget must beat to
+    still matter, so worse runs can be terminated early (None when every
+    run must finish).
+    """
+    def __init__(self, space, seed=0):
+        self.space = {name: list(values) for name, values in space.items()}
+        self.rng = np.random.default_rng(seed)
+        self.trials = []
+
+    def grid(self):
+        names = list(self.space)
+        return [dict(zip(names, values)) for values in itertools.product(*self.space.values())]
+
+    def ask(self):
+        raise NotImplementedError
+
+    def tell(self, trials):
+        self.trials.extend(trials)
+
+    def threshold(self, budget):
+        return None
+
+    def best(self):
+        """
+        Best trial run on the full period.
+        """
+        full = [trial for trial in self.trials if trial.budget >= 1 and _scored(trial)]
+        return max(full, key=lambda trial: trial.score, default=None)
+
+
+class GridSearch(SearchStrategy):
+    """
+    Every grid cell on the full period. Runs that can no longer beat the best
+    score so far are terminated early, so the optimum is the grid's.
+    """
+    def __init__(self, space, seed=0):
+        super().__init__(space, seed)
+        self._asked = False
+
+    def ask(self):
+        if self._asked:
+            return []
+        self._asked = True
+        return [Trial(params) for params in self.grid()]
+
+    def threshold(self, budget):
+        best = self.best()
+        return None if best is None else best.score
+
+
+class SuccessiveHalving(SearchStrategy):
+    """
+    Successive halving: num_candidates random grid cells (all of them by
+    default) run on the first min_budget of the trading period, the best
+    1/eta of them are rerun on eta times that period, and so on until the
+    survivors run on the full period.
+    """
+    def __init__(self, space, num_candidates=None, min_budget=1 / 9, eta=3, seed=0):
+        super().__init__(space, seed)
+        grid = self.grid()
+        if num_candidates is not None and num_candidates < len(grid):
+            grid = [grid[i] for i in sorted(self.rng.choice(len(grid), num_candidates, replace=False))]
+        self.eta = eta
+        self.budgets = []
+        budget = min_budget
+        while budget < 1:
+            self.budgets.append(budget)
+            budget *= eta
+        self.budgets.append(1.0)
+        self._rung = 0
+        self._candidates = grid
+        self._pending = None
+
+    def ask(self):
+        if self._pending is not None:
+            rung = [trial for trial in self._pending if _scored(trial) and not trial.terminated]
+            if self._rung == len(self.budgets) - 1:
+                return []
+            self._candidates = [trial.params for trial in self._top(rung, self._promoted())]
+            self._rung += 1
+        self._pending = [Trial(params, self.budgets[self._rung]) for params in self._candidates]
+        return self._pending
+
+    def threshold(self, budget):
+        # A run worse than the k-th best of its rung so far cannot be promoted
+        rung = [trial for trial in self._pending if _scored(trial) and not trial.terminated]
+        k = self._promoted()
+        return self._top(rung, k)[-1].score if len(rung) >= k else None
+
+    def _promoted(self):
+        if self._rung == len(self.budgets) - 1:
+            return 1
+        return max(1, math.ceil(len(self._pending) / self.eta))
+
+    @staticmethod
+    def _top(trials, k):
+        return sorted(trials, key=lambda trial: trial.score, reverse=True)[:k]
+
+
+class TPESearch(SearchStrategy):
+    """
+    Tree-structured Parzen estimator over the grid: after num_startup random
+    trials, each parameter's values are weighted by a Parzen estimate over
+    the top gamma of trials, l(x), and over the rest, g(x), and the next
+    trials are the unseen cells with the highest l(x) / g(x) among
+    num_samples draws from l(x). Runs on the full period, num_trials trials
+    in batches of batch_size.
+    """
+    def __init__(self, space, num_trials=40, num_startup=10, gamma=0.25, batch_size=4,
+                 num_samples=64, bandwidth=1.0, seed=0):
+        super().__init__(space, seed)
+        self.num_trials = num_trials
+        self.num_startup = num_startup
+        self.gamma = gamma
+        self.batch_size = batch_size
+        self.num_samples = num_samples
+        self.bandwidth = bandwidth
+        self._seen = set()
+        self._asked = 0
+
+    def ask(self):
+        size = min(self.batch_size, self.num_trials - self._asked, self._grid_size() - len(self._seen))
+        if size <= 0:
+            return []
+        scored = [trial for trial in self.trials if _scored(trial)]
+        if len(scored) < self.num_startup:
+            batch = self._random(size)
+        else:
+            batch = self._suggest(scored, size)
+        self._asked += len(batch)
+        return [Trial(params) for params in batch]
+
+    def threshold(self, budget):
+        # Runs below the gamma quantile end up in g(x) whatever their score
+        scores = [trial.score for trial in self.trials if _scored(trial)]
+        if len(scores) < self.num_startup:
+            return None
+        return float(np.quantile(scores, 1 - self.gamma))
+
+    def _grid_size(self):
+        return math.prod(len(values) for values in self.space.values())
+
+    def _key(self, params):
+        return tuple(params[name] for name in self.space)
+
+    def _random(self, size):
+        batch = []
+        while len(batch) < size:
+            params = {name: values[self.rng.integers(len(values))] for name, values in self.space.items()}
+            if self._key(params) not in self._seen:
+                self._seen.add(self._key(params))
+                batch.append(params)
+        return batch
+
+    def _suggest(self, scored, size):
+        scored = sorted(scored, key=lambda trial: trial.score, reverse=True)
+        num_good = max(1, int(math.ceil(self.gamma * len(scored))))
+        good, bad = scored[:num_good], scored[num_good:]
+
+        # Draws from l(x), one parameter at a time, scored by l(x) / g(x)
+        draws = np.empty((self.num_samples, len(self.space)), dtype=np.int64)
+        ratio = np.zeros(self.num_samples)
+        for j, (name, values) in enumerate(self.space.items()):
+            l = self._parzen(name, values, good)
+            g = self._parzen(name, values, bad)
+            draws[:, j] = self.rng.choice(len(values), self.num_samples, p=l)
+            ratio += np.log(l[draws[:, j]]) - np.log(g[draws[:, j]])
+
+        batch = []
+        for row in np.argsort(-ratio, kind='stable'):
+            params = {name: values[draws[row, j]] for j, (name, values) in enumerate(self.space.items())}
+            if self._key(params) not in self._seen:
+                self._seen.add(self._key(params))
+                batch.append(params)
+                if len(batch) == size:
+                    return batch
+        return batch + self._random(size - len(batch))
+
+    def _parzen(self, name, values, trials):
+        # Gaussian kernels over the positions of the observed values, plus a
+        # uniform prior so unseen values keep some weight
+        positions = np.arange(len(values))
+        weights = np.full(len(values), 1.0 / len(values))
+        for trial in trials:
+            center = values.index(trial.params[name])
+            weights += np.exp(-0.5 * ((positions - center) / self.bandwidth) ** 2)
+        return weights / weights.sum()
+
+
+def _scored(trial):
+    return trial.score is not None and not np.isnan(trial.score)
+
+
+def optimize(panel, search, fixed_params=None, objective="max_drawdown", workers=1, cache_dir=None,
+             chunk_size=None, early_stop=True):
+    """
+    Runs a SearchStrategy on the NumPy engine and returns its best
+    full-period trial.
+
+    A trial's budget is a fraction of the trading period: the panel is cut
+    to the warm-up bars plus that fraction of the remaining dates, so a
+    shorter run is the start of the full run. Trials are run through
+    run_sweep in chunks of chunk_size (default 2 * workers); between chunks
+    the search's threshold is refreshed, and with early_stop and the
+    max_drawdown objective it is passed to the engine as stop_drawdown.
+    Without cache_dir a temporary feature cache is shared by all chunks.
+    """
+    fixed_params = fixed_params or {}
+    chunk_size = chunk_size or 2 * workers
+    warmup = _warmup_rows(panel, search, fixed_params)
+    temporary = cache_dir is None
+    cache_dir = tempfile.mkdtemp(prefix="optimize_cache_") if temporary else cache_dir
+    try:
+        while True:
+            trials = search.ask()
+            if not trials:
+                break
+            for budget in sorted({trial.budget for trial in trials}):
+                group = [trial for trial in trials if trial.budget == budget]
+                num_dates = warmup + int(math.ceil(budget * (len(panel.dates) - warmup)))
+                sub_panel = panel if num_dates >= len(panel.dates) else panel.head(num_dates)
+                for first in range(0, len(group), chunk_size):
+                    chunk = group[first:first + chunk_size]
+                    cell_params = dict(fixed_params)
+                    threshold = search.threshold(budget) if early_stop and objective == "max_drawdown" else None
+                    if threshold is not None:
+                        cell_params["stop_drawdown"] = threshold
+                    for cell in run_sweep(sub_panel, [trial.params for trial in chunk], cell_params,
+                                          workers=workers, cache_dir=cache_dir):
+                        trial = chunk[cell["index"]]
+                        trial.score = float(cell[objective])
+                        trial.terminated = cell["terminated"]
+                    search.tell(chunk)
+    finally:
+        if temporary:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    return search.best()
+
+
+def _warmup_rows(panel, search, fixed_params, hurst_power=8):
+    # Dates before the first possible rebalance of any searched parameter
+    # set: every feed must have a bar, then the regime window and the
+    # longest total_window must fill
+    total_windows = search.space.get("total_window", [fixed_params.get("total_window", 0)])
+    started = np.flatnonzero((panel.bar_counts() >= 1).all(axis=1))
+    first = started[0] if len(started) else len(panel.dates)
+    return min(int(first) + max(2**hurst_power + 2, max(total_windows)), len(panel.dates))
+
+
+def evaluations(search):
+    """
+    Number of runs and their cost in full-period runs.
+    """
+    return len(search.trials), sum(trial.budget for trial in search.trials)
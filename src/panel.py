@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from src.cache import fingerprint
+
+YAHOO_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+class PricePanel:
+    """
+    Close and volume of a set of tickers aligned on the union of their dates
+    (dates x tickers). NaN marks dates on which a ticker has no bar.
+    """
+    def __init__(self, dates, tickers, close, volume):
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.tickers = list(tickers)
+        self.close = np.asarray(close, dtype=float)
+        self.volume = np.asarray(volume, dtype=float)
+        self._fingerprints = None
+
+    @classmethod
+    def from_csv(cls, filepaths):
+        """
+        Builds a panel from Yahoo style CSV files (Date, Open, High, Low,
+        Close, Adj Close, Volume). filepaths maps ticker names to paths, in
+        the order the tickers should appear in the panel.
+        """
+        frames = {ticker: load_yahoo_csv(path) for ticker, path in filepaths.items()}
+        if not frames:
+            return cls([], [], np.empty((0, 0)), np.empty((0, 0)))
+        dates = pd.DatetimeIndex(sorted(set().union(*(df.index for df in frames.values()))))
+        close = np.column_stack([df['close'].reindex(dates).to_numpy() for df in frames.values()])
+        volume = np.column_stack([df['volume'].reindex(dates).to_numpy() for df in frames.values()])
+        return cls(dates.values, frames.keys(), close, volume)
+
+    @classmethod
+    def from_store(cls, store, tickers=None):
+        """
+        Builds a panel from a PriceStore, adjusting close and volume the same
+        way load_yahoo_csv does. tickers defaults to every ticker in the store.
+        """
+        tickers = store.tickers if tickers is None else list(tickers)
+        columns = [store.ticker_index[ticker] for ticker in tickers]
+        close, volume = adjust_yahoo(
+            store.field('close')[:, columns],
+            store.field('adj_close')[:, columns],
+            store.field('volume')[:, columns],
+        )
+        return cls(store.dates, tickers, close, volume)
+
+    def head(self, num_dates):
+        """
+        Panel of the first num_dates dates, with the same tickers.
+        """
+        return PricePanel(self.dates[:num_dates], self.tickers, self.close[:num_dates], self.volume[:num_dates])
+
+    def bar_counts(self):
+        """
+        Number of bars each ticker has delivered up to and including each date
+        (len(data) of the equivalent backtrader feed).
+        """
+        return np.cumsum(~np.isnan(self.close), axis=0)
+
+    def fingerprints(self):
+        """
+        Content hash of every ticker's close and volume columns, computed once
+        per panel and used to key cached features.
+        """
+        if self._fingerprints is None:
+            self._fingerprints = [
+                fingerprint(self.close[:, k], self.volume[:, k]) for k in range(len(self.tickers))
+            ]
+        return self._fingerprints
+
+    def fingerprint(self):
+        """
+        Content hash of the whole panel (dates, tickers and every ticker's
+        columns), used to key stored sweep results to the data they ran on.
+        """
+        return fingerprint(self.dates.astype(np.int64), np.array(self.tickers), np.array(self.fingerprints()))
+
+
+def load_yahoo_csv(filepath):
+    """
+    Loads a Yahoo style CSV the way backtrader's YahooFinanceCSVData does:
+    rows with 'null' values are skipped, the close is replaced by the adjusted
+    close rounded to 2 decimals and the volume is scaled by the adjustment
+    factor and rounded.
+    """
+    df = read_yahoo_csv(filepath)
+    close, volume = adjust_yahoo(df['Close'].to_numpy(), df['Adj Close'].to_numpy(), df['Volume'].to_numpy())
+    return pd.DataFrame({'close': close, 'volume': volume}, index=df.index)
+
+
+def read_yahoo_csv(filepath):
+    """
+    Reads the raw Open, High, Low, Close, Adj Close and Volume columns of a
+    Yahoo style CSV, skipping rows with 'null' values.
+    """
+    df = pd.read_csv(filepath, dtype=str, keep_default_na=False)
+    df = df[~(df.iloc[:, 1:] == 'null').any(axis=1)]
+    dates = pd.DatetimeIndex(pd.to_datetime(df.iloc[:, 0].str[:10]), name='Date')
+    columns = {name: df.iloc[:, i + 1].astype(float).to_numpy() for i, name in enumerate(YAHOO_COLUMNS[:5])}
+    columns['Volume'] = pd.to_numeric(df.iloc[:, 6], errors='coerce').fillna(0.0).to_numpy()
+    return pd.DataFrame(columns, index=dates)
+
+
+def adjust_yahoo(raw_close, adj_close, volume):
+    """
+    Close and volume as YahooFinanceCSVData delivers them: the adjusted close
+    rounded to 2 decimals and the volume scaled by the adjustment factor.
+    """
+    adjfactor = raw_close / adj_close
+    return round_half_even(adj_close, 2), np.round(volume * adjfactor)
+
+
+def round_half_even(values, decimals):
+    """
+    Vectorized equivalent of Python's round(value, decimals). np.round only
+    differs from it on values that sit almost exactly halfway between two
+    roundings, so those few are rounded one by one.
+    """
+    values = np.asarray(values, dtype=float)
+    scaled = values * 10.0 ** decimals
+    rounded = np.round(values, decimals)
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    flat = rounded.reshape(-1)
+    flat[ties] = [round(float(v), decimals) for v in values.reshape(-1)[ties]]
+    return rounded
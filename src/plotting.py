@@ -1,12 +1,14 @@
 import pandas as pd
-import yfinance as yf
 import matplotlib.pyplot as plt
 
-def plot_momentum_portfolio_strategy(strategy_results, initial_cash):
+from src.benchmark_store import BenchmarkStore
+
+def plot_momentum_portfolio_strategy(strategy_results, initial_cash, benchmarks=None):
     momentum_strategy = strategy_results[0]
+    benchmarks = benchmarks or BenchmarkStore()
 
     # Calculate the benchmark strategy (buy and hold SPY)
-    spy_data = yf.download('PTNQ', start=momentum_strategy.dates[0], end=momentum_strategy.dates[-1], progress=False)
+    spy_data = benchmarks.get('PTNQ', momentum_strategy.dates[0], momentum_strategy.dates[-1])
     initial_spy_price = spy_data['Adj Close'].iloc[0]
     spy_shares = initial_cash / initial_spy_price
     spy_values = spy_data['Adj Close'] * spy_shares
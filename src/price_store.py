@@ -0,0 +1,243 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+import backtrader as bt
+from datetime import datetime
+
+from src.panel import YAHOO_COLUMNS, read_yahoo_csv
+
+FIELDS = ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+
+
+class PriceStore:
+    """
+    Columnar on-disk store of OHLCV bars (daily, or intraday with timestamps). Every field is one
+    dates x tickers .npy array (column major, so a ticker's history is
+    contiguous) that is memory-mapped read-only on open, next to a date index
+    and a ticker index. NaN marks dates on which a ticker has no bar.
+
+    Build it once from the per-ticker CSV files with from_csv; opening it
+    afterwards costs a few file opens regardless of the number of tickers.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "tickers.json")) as f:
+            self.tickers = json.load(f)
+        self.ticker_index = {ticker: k for k, ticker in enumerate(self.tickers)}
+        self.dates = np.load(os.path.join(directory, "dates.npy"), mmap_mode="r")
+        self._fields = {}
+
+    def field(self, name):
+        """
+        Memory-mapped dates x tickers array of one of FIELDS.
+        """
+        if name not in self._fields:
+            self._fields[name] = np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+        return self._fields[name]
+
+    def column(self, ticker, name):
+        """
+        One ticker's history of a field, as a view into the memory map.
+        """
+        return self.field(name)[:, self.ticker_index[ticker]]
+
+    def date_index(self, date):
+        """
+        Row of the first stored date on or after date.
+        """
+        return int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date).date(), 'D')))
+
+    def frame(self, ticker):
+        """
+        The ticker's bars as a Yahoo style DataFrame indexed by Date.
+        """
+        k = self.ticker_index[ticker]
+        df = pd.DataFrame(
+            {column: self.field(name)[:, k] for column, name in zip(YAHOO_COLUMNS, FIELDS)},
+            index=pd.DatetimeIndex(self.dates, name='Date'),
+        )
+        return df[df['Close'].notna()]
+
+    def to_csv(self, ticker, filepath):
+        """
+        Exports one ticker as a Yahoo style CSV and returns filepath.
+        """
+        self.frame(ticker).to_csv(filepath)
+        return filepath
+
+    @classmethod
+    def write(cls, directory, dates, tickers, fields):
+        """
+        Writes a store from a dates array, a ticker list and a dict mapping
+        every name in FIELDS to a dates x tickers array.
+        """
+        tmp_directory = directory.rstrip(os.sep) + ".tmp"
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+        np.save(os.path.join(tmp_directory, "dates.npy"), _store_dates(dates))
+        with open(os.path.join(tmp_directory, "tickers.json"), "w") as f:
+            json.dump(list(tickers), f)
+        for name in FIELDS:
+            np.save(os.path.join(tmp_directory, f"{name}.npy"), np.asfortranarray(fields[name], dtype=float))
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_directory, directory)
+        return cls(directory)
+
+    @classmethod
+    def write_chunks(cls, directory, tickers, num_dates, chunks):
+        """
+        Writes a store of num_dates dates from an iterable of (dates, fields)
+        row chunks in date order, fields mapping every name in FIELDS to a
+        (chunk dates x tickers) array. The field files are preallocated and
+        filled chunk by chunk, so histories larger than memory (e.g. minute
+        bars) can be stored.
+        """
+        tmp_directory = directory.rstrip(os.sep) + ".tmp"
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+        with open(os.path.join(tmp_directory, "tickers.json"), "w") as f:
+            json.dump(list(tickers), f)
+        arrays = {
+            name: np.lib.format.open_memmap(
+                os.path.join(tmp_directory, f"{name}.npy"), mode="w+", dtype=float,
+                shape=(num_dates, len(tickers)), fortran_order=True,
+            )
+            for name in FIELDS
+        }
+        dates_path = os.path.join(tmp_directory, "dates.npy")
+        timestamps = np.lib.format.open_memmap(dates_path, mode="w+", dtype='datetime64[s]', shape=(num_dates,))
+        daily = True
+        row = 0
+        for dates, fields in chunks:
+            dates = np.asarray(dates).astype('datetime64[s]')
+            timestamps[row:row + len(dates)] = dates
+            daily &= bool(np.all(dates.astype('datetime64[D]') == dates))
+            for name in FIELDS:
+                arrays[name][row:row + len(dates)] = fields[name]
+            row += len(dates)
+        if row != num_dates:
+            raise ValueError(f"Expected {num_dates} dates, got {row}")
+        for array in [timestamps, *arrays.values()]:
+            array.flush()
+        days = np.array(timestamps, dtype='datetime64[D]') if daily else None
+        del timestamps, arrays
+        if days is not None:
+            np.save(dates_path, days)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_directory, directory)
+        return cls(directory)
+
+    @classmethod
+    def from_csv(cls, directory, filepaths):
+        """
+        Builds a store from Yahoo style CSV files. filepaths maps ticker names
+        to paths, in the order the tickers should appear in the store. The
+        sizes and modification times of the sources are recorded so
+        load_or_build can tell when the store is stale.
+        """
+        frames = {ticker: read_yahoo_csv(path) for ticker, path in filepaths.items()}
+        dates = pd.DatetimeIndex(sorted(set().union(*(df.index for df in frames.values()))))
+        fields = {
+            name: np.column_stack([df[column].reindex(dates).to_numpy() for df in frames.values()])
+            if frames else np.empty((0, 0))
+            for column, name in zip(YAHOO_COLUMNS, FIELDS)
+        }
+        store = cls.write(directory, dates.values, frames.keys(), fields)
+        with open(os.path.join(directory, "sources.json"), "w") as f:
+            json.dump(_source_stamps(filepaths), f)
+        return store
+
+    @classmethod
+    def load_or_build(cls, directory, filepaths):
+        """
+        Opens the store in directory, rebuilding it from filepaths first if it
+        is missing or was built from different or since modified files.
+        """
+        sources = os.path.join(directory, "sources.json")
+        if os.path.exists(sources):
+            with open(sources) as f:
+                if json.load(f) == _source_stamps(filepaths):
+                    return cls(directory)
+        return cls.from_csv(directory, filepaths)
+
+
+def _store_dates(dates):
+    # Daily dates are stored by day, intraday timestamps by second
+    dates = np.asarray(dates).astype('datetime64[s]')
+    days = dates.astype('datetime64[D]')
+    return days if np.all(days == dates) else dates
+
+
+def _source_stamps(filepaths):
+    stamps = []
+    for ticker, path in filepaths.items():
+        stat = os.stat(path)
+        stamps.append([ticker, os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return stamps
+
+
+class PriceStoreData(bt.feed.DataBase):
+    """
+    Backtrader feed that reads one ticker straight from a PriceStore's memory
+    maps. Bars are delivered exactly as YahooFinanceCSVData delivers them from
+    the equivalent CSV file, including the adjusted close handling. Bars of
+    an intraday store are stamped with their stored timestamps.
+    """
+    lines = ('adjclose',)
+
+    params = (
+        ('store', None),
+        ('ticker', None),
+        ('adjclose', True),
+        ('adjvolume', True),
+        ('round', True),
+        ('decimals', 2),
+        ('roundvolume', False),
+    )
+
+    def start(self):
+        super(PriceStoreData, self).start()
+        store = self.p.store
+        k = store.ticker_index[self.p.ticker]
+        self._columns = [store.field(name)[:, k] for name in FIELDS]
+        self._intraday = store.dates.dtype != np.dtype('datetime64[D]')
+        self._rows = iter(np.flatnonzero(~np.isnan(self._columns[3])))
+
+    def _load(self):
+        row = next(self._rows, None)
+        if row is None:
+            return False
+
+        o, h, l, c, adjustedclose, v = (float(column[row]) for column in self._columns)
+        dt = self.p.store.dates[row].astype(object)
+        # Daily bars are stamped at the session end, intraday bars keep their time
+        self.lines.datetime[0] = bt.date2num(dt if self._intraday else datetime.combine(dt, self.p.sessionend))
+        self.lines.openinterest[0] = 0.0
+
+        adjfactor = c / adjustedclose
+        if self.p.adjclose:
+            o /= adjfactor
+            h /= adjfactor
+            l /= adjfactor
+            c = adjustedclose
+            if self.p.adjvolume:
+                v *= adjfactor
+
+        if self.p.round:
+            decimals = self.p.decimals
+            o = round(o, decimals)
+            h = round(h, decimals)
+            l = round(l, decimals)
+            c = round(c, decimals)
+
+        v = round(v, self.p.roundvolume)
+
+        self.lines.open[0] = o
+        self.lines.high[0] = h
+        self.lines.low[0] = l
+        self.lines.close[0] = c
+        self.lines.volume[0] = v
+        self.lines.adjclose[0] = adjustedclose
+        return True
@@ -0,0 +1,135 @@
+import json
+import time
+import numpy as np
+
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+class PhaseProfiler:
+    """
+    Cumulative wall time and call counts per named phase of a run.
+
+    Phases are timed by wrapping callables (wrap), so code that is not
+    profiled runs the original callables untouched. A phase may name a
+    parent phase it runs inside; only phases without a parent are summed
+    when the untimed remainder of the run is worked out. Phases created
+    with samples=True also keep every call's duration for latency
+    percentiles.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.seconds = {}
+        self.calls = {}
+        self.parents = {}
+        self.samples = {}
+        self.started = None
+        self.stopped = None
+
+    def add_phase(self, name, parent=None, samples=False):
+        if name not in self.seconds:
+            self.seconds[name] = 0.0
+            self.calls[name] = 0
+            self.parents[name] = parent
+            if samples:
+                self.samples[name] = []
+
+    def wrap(self, name, fn, parent=None, samples=False):
+        """
+        Returns fn timed as phase name. Several callables can share a phase.
+        """
+        self.add_phase(name, parent, samples)
+        clock, seconds, calls = self.clock, self.seconds, self.calls
+        durations = self.samples.get(name)
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                seconds[name] += elapsed
+                calls[name] += 1
+                if durations is not None:
+                    durations.append(elapsed)
+        return timed
+
+    def start(self):
+        self.started = self.clock()
+
+    def stop(self):
+        self.stopped = self.clock()
+
+    def report(self, bars=0, feed_bars=0, untimed="other"):
+        """
+        Summary of the run between start and stop: per phase seconds,
+        calls, mean call time and share of the run, latency percentiles of
+        the sampled phases and bars per second. The time not spent in any
+        top level phase is reported as the untimed phase.
+        """
+        total = (self.stopped if self.stopped is not None else self.clock()) - self.started
+        top_level = sum(seconds for name, seconds in self.seconds.items() if self.parents[name] is None)
+
+        phases = []
+        for name, seconds in self.seconds.items():
+            calls = self.calls[name]
+            phase = {
+                "phase": name,
+                "parent": self.parents[name],
+                "seconds": seconds,
+                "calls": calls,
+                "mean_seconds": seconds / calls if calls else 0.0,
+                "share": seconds / total if total > 0 else 0.0,
+            }
+            durations = self.samples.get(name)
+            if durations:
+                values = np.percentile(durations, LATENCY_PERCENTILES)
+                phase["latency"] = {f"p{p}": float(v) for p, v in zip(LATENCY_PERCENTILES, values)}
+                phase["latency"]["max"] = float(max(durations))
+            phases.append(phase)
+
+        remainder = max(total - top_level, 0.0)
+        phases.append({
+            "phase": untimed,
+            "parent": None,
+            "seconds": remainder,
+            "calls": None,
+            "mean_seconds": None,
+            "share": remainder / total if total > 0 else 0.0,
+        })
+        return {
+            "total_seconds": total,
+            "bars": bars,
+            "feed_bars": feed_bars,
+            "bars_per_second": bars / total if total > 0 else 0.0,
+            "feed_bars_per_second": feed_bars / total if total > 0 else 0.0,
+            "phases": phases,
+        }
+
+
+def format_report(report):
+    """
+    Text table of a PhaseProfiler report, child phases indented under
+    their parents.
+    """
+    depth = {}
+    for phase in report["phases"]:
+        depth[phase["phase"]] = depth[phase["parent"]] + 1 if phase["parent"] in depth else 0
+
+    lines = [f"{'phase':<28} {'seconds':>10} {'share':>7} {'calls':>9} {'mean ms':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}"]
+    for phase in report["phases"]:
+        name = "  " * depth[phase["phase"]] + phase["phase"]
+        calls = "" if phase["calls"] is None else f"{phase['calls']:>9d}"
+        mean = "" if phase["mean_seconds"] is None else f"{phase['mean_seconds'] * 1e3:>9.3f}"
+        latency = phase.get("latency")
+        percentiles = "" if latency is None else " ".join(f"{latency[f'p{p}'] * 1e3:>8.3f}" for p in LATENCY_PERCENTILES)
+        lines.append(f"{name:<28} {phase['seconds']:>10.3f} {phase['share']:>7.1%} {calls:>9} {mean:>9} {percentiles}".rstrip())
+    lines.append(
+        f"{report['total_seconds']:.3f}s total, {report['bars']} bars ({report['bars_per_second']:,.0f} bars/s), "
+        f"{report['feed_bars']} feed bars ({report['feed_bars_per_second']:,.0f} feed bars/s)"
+    )
+    return "\n".join(lines)
+
+
+def write_report(report, filepath):
+    with open(filepath, "w") as f:
+        json.dump(report, f, indent=2)
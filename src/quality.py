@@ -0,0 +1,98 @@
+import json
+import numpy as np
+import pandas as pd
+
+QUALITY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+def repair_frames(frames, max_zero_run, skip_long_runs=True, block_size=256):
+    """
+    Data-quality stage for freshly downloaded tickers (ticker -> DataFrame
+    with the QUALITY_COLUMNS, indexed by date), run on all of them at once on
+    a dates x tickers x columns panel.
+
+    In every column that has zero or negative values, zeros (and missing
+    values) are replaced with the ticker's previous value. A ticker with a
+    run of more than max_zero_run consecutive zero bars in any column is
+    dropped when skip_long_runs is set and only flagged otherwise.
+
+    Returns the repaired frames of the kept tickers and a report with, per
+    ticker, the number of bad (zero or negative) bars, the longest zero run,
+    the affected columns and the action taken.
+    """
+    frames = {ticker: data for ticker, data in frames.items() if not data.empty}
+    tickers = list(frames)
+    repaired, report = {}, []
+    # Blocks of tickers bound the size of the panel held in memory
+    for first in range(0, len(tickers), block_size):
+        block = {ticker: frames[ticker] for ticker in tickers[first:first + block_size]}
+        block_repaired, block_report = _repair_block(block, max_zero_run, skip_long_runs)
+        repaired.update(block_repaired)
+        report.extend(block_report)
+    return repaired, report
+
+
+def _repair_block(frames, max_zero_run, skip_long_runs):
+    dates = np.unique(np.concatenate([data.index.values for data in frames.values()]))
+    values = np.full((len(dates), len(frames), len(QUALITY_COLUMNS)), np.nan)
+    present = np.zeros((len(dates), len(frames), 1), dtype=bool)
+    ticker_rows = []
+    for k, data in enumerate(frames.values()):
+        rows = np.searchsorted(dates, data.index.values)
+        values[rows, k] = np.column_stack([data[column].to_numpy(dtype=float) for column in QUALITY_COLUMNS])
+        present[rows, k] = True
+        ticker_rows.append(rows)
+
+    bad = present & (values <= 0)
+    affected = bad.any(axis=0)
+
+    # Runs and repairs only concern the tickers with bad values
+    touched = np.flatnonzero(affected.any(axis=1))
+    longest_run = np.zeros(affected.shape, dtype=np.int64)
+    if len(touched):
+        block, block_present = values[:, touched], present[:, touched]
+        zero = block_present & (block == 0)
+
+        # Longest run of consecutive zero bars, counted over each ticker's own bars
+        zeros_seen = np.cumsum(zero, axis=0)
+        reset = block_present & ~zero
+        zeros_at_reset = np.maximum.accumulate(np.where(reset, zeros_seen, 0), axis=0)
+        longest_run[touched] = (zeros_seen - zeros_at_reset).max(axis=0)
+
+        # Forward fill zeros and missing values in the affected columns
+        fill = block_present & affected[touched] & (zero | np.isnan(block))
+        rows = np.arange(len(dates))[:, None, None]
+        source = np.maximum.accumulate(np.where(block_present & ~fill, rows, -1), axis=0)
+        filled = np.take_along_axis(block, np.maximum(source, 0), axis=0)
+        values[:, touched] = np.where(fill, np.where(source >= 0, filled, np.nan), block)
+
+    long_runs = (longest_run > max_zero_run).any(axis=1)
+    repaired, report = {}, []
+    for k, (ticker, data) in enumerate(frames.items()):
+        if long_runs[k]:
+            action = "skipped" if skip_long_runs else "flagged"
+        else:
+            action = "repaired" if affected[k].any() else "ok"
+        report.append({
+            'ticker': ticker,
+            'bad_bars': int(bad[:, k].any(axis=1).sum()),
+            'longest_zero_run': int(longest_run[k].max()),
+            'columns': [column for column, hit in zip(QUALITY_COLUMNS, affected[k]) if hit],
+            'action': action,
+        })
+        if action == "ok":
+            repaired[ticker] = data
+        elif action != "skipped":
+            repaired[ticker] = pd.DataFrame(values[ticker_rows[k], k], index=data.index, columns=QUALITY_COLUMNS)
+    return repaired, report
+
+
+def write_quality_report(report, filepath):
+    """
+    Writes the report as JSON and prints a one line summary per action.
+    """
+    with open(filepath, "w") as f:
+        json.dump(report, f, indent=2)
+    actions = pd.Series([entry['action'] for entry in report], dtype=object).value_counts()
+    for action, count in actions.items():
+        print(f"Data quality: {count} tickers {action}")
@@ -0,0 +1,213 @@
+import numpy as np
+import scipy.stats as sps
+
+from src.hurst import rolling_hurst, _window_block_means, _ols_slope_test
+
+
+def rolling_dfa(prices, power=8, windows=None):
+    """
+    Detrended fluctuation analysis (DFA-1) Hurst exponent, its t-statistic
+    against H = 0.5 and the two-sided p-value for every rolling window of
+    2**power + 1 prices, with the outputs of rolling_hurst.
+
+    The profile (cumulative sum) of each window's returns is split into
+    boxes of 2**p points for p = 2 .. power - 2, and the exponent is the
+    slope of the log2 root mean square of the linear-detrend residuals
+    against log2 box size. Residuals of a linear fit do not change when a
+    line is added, so each box's residuals are those of the whole series'
+    profile and every box is computed once for all windows that use it.
+    """
+    prices, squeeze = _as_panel(prices)
+    returns = prices[1:] / prices[:-1] - 1
+    window_starts = _window_starts(len(returns), power, windows)
+    if window_starts is None:
+        return _empty(prices, squeeze)
+
+    X = np.arange(2, power - 1)
+    profile = np.cumsum(returns, axis=0)
+    variances = _window_block_means(profile, power, X, _block_detrended_variance,
+                                    None if windows is None else window_starts)
+    Y = 0.5 * np.log2(variances)
+    return _result(_ols_slope_test(X, Y, 0.5), squeeze)
+
+
+def rolling_aggregated_variance(prices, power=8, windows=None):
+    """
+    Aggregated variance Hurst exponent, its t-statistic against H = 0.5 and
+    the two-sided p-value for every rolling window of 2**power + 1 prices,
+    with the outputs of rolling_hurst.
+
+    Each window's returns are averaged over blocks of 2**p returns for
+    p = 0 .. power - 2; the variance of the block means scales as
+    2**(p * (2H - 2)), so H = 1 + slope / 2 of the log2 variance against p.
+    The block means and their squares are summed over every window with
+    running sums, in O(1) per window and block size.
+    """
+    prices, squeeze = _as_panel(prices)
+    returns = prices[1:] / prices[:-1] - 1
+    window_starts = _window_starts(len(returns), power, windows)
+    if window_starts is None:
+        return _empty(prices, squeeze)
+
+    num_windows = len(returns) - 2**power + 1
+    running = _running_sums(returns)
+    X = np.arange(0, power - 1)
+    Y = np.empty((num_windows, returns.shape[1], len(X)))
+    for k, p in enumerate(X):
+        m, count = 2**p, 2**(power - p)
+        means = (running[m:] - running[:-m]) / m
+        total = _strided_sums(means, m, count, num_windows)
+        total_sq = _strided_sums(means * means, m, count, num_windows)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            Y[:, :, k] = np.log2((total_sq - total * total / count) / (count - 1))
+
+    slopes, tstats, pvalues = _ols_slope_test(X, Y[window_starts], -1.0)
+    return _result((1 + slopes / 2, tstats, pvalues), squeeze)
+
+
+def rolling_variance_ratio(prices, power=8, windows=None):
+    """
+    Lo-MacKinlay variance ratio test for every rolling window of 2**power + 1
+    prices, with the outputs of rolling_hurst: the Hurst exponent implied by
+    the variance ratio, the heteroskedasticity-consistent z-statistic of
+    the ratio against 1 and its two-sided p-value.
+
+    The ratio compares the variance of overlapping q-period log returns to
+    q times the variance of one-period log returns, with q = 2**(power - 4)
+    (at least 2), and VR(q) = q**(2H - 1) gives the implied exponent. Every
+    sum in the ratio and in the variance of its estimate is a difference of
+    running sums, so each window costs O(q).
+    """
+    prices, squeeze = _as_panel(prices)
+    returns = np.log(prices[1:] / prices[:-1])
+    window_starts = _window_starts(len(returns), power, windows)
+    if window_starts is None:
+        return _empty(prices, squeeze)
+
+    n = 2**power
+    q = 2**max(power - 4, 1)
+    num_windows = len(returns) - n + 1
+    total = _strided_sums(returns, 1, n, num_windows)
+    total_sq = _strided_sums(returns * returns, 1, n, num_windows)
+    mean = total / n
+    # Sum of squared deviations of the one-period and the overlapping
+    # q-period returns from their means
+    deviation_sq = total_sq - n * mean * mean
+    running = _running_sums(returns)
+    period = running[q:] - running[:-q]
+    period_total = _strided_sums(period, 1, n - q + 1, num_windows)
+    period_sq = _strided_sums(period * period, 1, n - q + 1, num_windows)
+    period_deviation_sq = period_sq - 2 * q * mean * period_total + (n - q + 1) * q * q * mean * mean
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = (period_deviation_sq / (q * (n - q + 1) * (1 - q / n))) / (deviation_sq / (n - 1))
+        # Heteroskedasticity-consistent variance of the ratio: weighted sums
+        # of the products of squared deviations j bars apart
+        theta = np.zeros_like(ratio)
+        for j in range(1, q):
+            lagged_sq = _lagged_deviation_products(returns, j, mean, n, num_windows)
+            theta += (2 * (q - j) / q)**2 * lagged_sq / (deviation_sq * deviation_sq)
+        zstats = (ratio - 1) / np.sqrt(theta)
+        hursts = 0.5 + np.log(ratio) / (2 * np.log(q))
+    pvalues = 2 * sps.norm.sf(np.abs(zstats))
+    return _result((hursts[window_starts], zstats[window_starts], pvalues[window_starts]), squeeze)
+
+
+# Regime estimators by name, selectable with the regime_estimator
+# parameter. Each maps (prices, power, windows) to the (estimate, t-stat,
+# p-value) arrays of rolling_hurst, with the estimate on the Hurst scale
+REGIME_ESTIMATORS = {
+    "rs": rolling_hurst,
+    "dfa": rolling_dfa,
+    "variance_ratio": rolling_variance_ratio,
+    "aggregated_variance": rolling_aggregated_variance,
+}
+
+# Smallest power each estimator supports: R/S, DFA and aggregated variance
+# regress over power - 1, power - 3 and power - 1 scales and need at least
+# three, and the variance ratio needs q = 2 well inside the window
+MIN_REGIME_POWERS = {
+    "rs": 4,
+    "dfa": 6,
+    "variance_ratio": 4,
+    "aggregated_variance": 4,
+}
+
+
+def get_regime_estimator(name, power=None):
+    """
+    The regime estimator registered as name (see REGIME_ESTIMATORS). With
+    power, also checks that the estimator supports windows of 2**power + 1
+    prices.
+    """
+    if name not in REGIME_ESTIMATORS:
+        raise ValueError(f"Unknown regime estimator {name}; expected one of {list(REGIME_ESTIMATORS)}")
+    if power is not None and power < MIN_REGIME_POWERS[name]:
+        raise ValueError(f"Regime estimator {name} needs a power of at least {MIN_REGIME_POWERS[name]}, got {power}")
+    return REGIME_ESTIMATORS[name]
+
+
+def _block_detrended_variance(blocks):
+    # Mean squared residual of the least squares line through each
+    # (block, ticker) row of a (blocks, tickers, m) array
+    m = blocks.shape[2]
+    ramp = np.arange(m) - (m - 1) / 2
+    centered = blocks - blocks.mean(axis=2, keepdims=True)
+    slope = centered @ ramp / (ramp @ ramp)
+    return ((centered * centered).sum(axis=2) - slope * slope * (ramp @ ramp)) / m
+
+
+def _lagged_deviation_products(returns, lag, mean, n, num_windows):
+    # Sum over each window of (x[k] - mean)**2 * (x[k - lag] - mean)**2 for
+    # the n - lag pairs inside it, expanded into running sums of products
+    a, b = returns[lag:], returns[:-lag]
+    count = n - lag
+    quad, cubic, square, cross, linear = (
+        _strided_sums(values, 1, count, num_windows)
+        for values in (a * a * b * b, a * b * (a + b), a * a + b * b, a * b, a + b)
+    )
+    return quad - 2 * mean * cubic + mean**2 * (square + 4 * cross) - 2 * mean**3 * linear + count * mean**4
+
+
+def _running_sums(values):
+    # Running sums of values along axis 0, with a leading row of zeros
+    return np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+
+
+def _strided_sums(values, stride, count, num_windows):
+    """
+    Sum of values[t + k * stride] over k < count for every t < num_windows,
+    from running sums along each of the stride residue classes of rows.
+    """
+    rows = -(-len(values) // stride) * stride
+    padded = np.zeros((rows + stride,) + values.shape[1:])
+    padded[stride:stride + len(values)] = values
+    running = np.cumsum(padded.reshape((-1, stride) + values.shape[1:]), axis=0).reshape(padded.shape)
+    t = np.arange(num_windows)
+    return running[t + count * stride] - running[t]
+
+
+def _as_panel(prices):
+    prices = np.asarray(prices, dtype=float)
+    squeeze = prices.ndim == 1
+    return (prices[:, None] if squeeze else prices), squeeze
+
+
+def _window_starts(num_returns, power, windows):
+    # Start rows of the windows to estimate, None when there are none
+    num_windows = num_returns - 2**power + 1
+    window_starts = np.arange(max(num_windows, 0)) if windows is None else np.asarray(windows, dtype=np.int64)
+    if num_windows <= 0 or len(window_starts) == 0:
+        return None
+    return window_starts
+
+
+def _empty(prices, squeeze):
+    empty = np.empty((0,) if squeeze else (0, prices.shape[1]))
+    return empty, empty.copy(), empty.copy()
+
+
+def _result(estimates, squeeze):
+    if squeeze:
+        return tuple(values[:, 0] for values in estimates)
+    return tuple(estimates)
@@ -0,0 +1,129 @@
+import io
+import json
+import sqlite3
+import numpy as np
+import pandas as pd
+
+METRICS = ['final_value', 'max_drawdown', 'sharpe', 'annual_return', 'annual_volatility']
+CURVES = ['portfolio_values', 'hursts', 'pvalues']
+
+
+def params_key(params):
+    """
+    Canonical text form of a parameter set, used as its key in the store.
+    """
+    return json.dumps({name: _plain(value) for name, value in params.items()}, sort_keys=True)
+
+
+class ResultsStore:
+    """
+    SQLite file of sweep results keyed by (data fingerprint, parameter set).
+
+    Each cell's metrics are stored in indexed columns so rankings and grid
+    surfaces are plain SQL queries; its equity curve, regime series and
+    dates are stored as one compressed .npz blob and only read back by
+    load. save commits every cell as it arrives, so a sweep that dies keeps
+    everything finished so far and completed tells a restart what to skip.
+    Results on other data (a different fingerprint) share the file but are
+    never mixed into queries.
+    """
+    def __init__(self, filepath, fingerprint):
+        self.filepath = filepath
+        self.fingerprint = fingerprint
+        self.connection = sqlite3.connect(filepath)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f"{metric} REAL" for metric in METRICS)
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS cells (fingerprint TEXT, params TEXT, {columns}, "
+            "curves BLOB, PRIMARY KEY (fingerprint, params))"
+        )
+        for metric in METRICS:
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS cells_{metric} ON cells (fingerprint, {metric})")
+        self.connection.commit()
+
+    def save(self, cell):
+        """
+        Stores a run_sweep result dict, replacing any earlier result for
+        the same parameters.
+        """
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            dates=np.asarray(cell["dates"], dtype='datetime64[D]'),
+            **{name: np.asarray(cell[name], dtype=float) for name in CURVES},
+        )
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO cells VALUES (?, ?, {', '.join('?' * len(METRICS))}, ?)",
+            (self.fingerprint, params_key(cell["params"]), *(_plain(cell[metric]) for metric in METRICS), buffer.getvalue()),
+        )
+        self.connection.commit()
+
+    def completed(self):
+        """
+        Keys (see params_key) of the cells already stored for this data.
+        """
+        rows = self.connection.execute("SELECT params FROM cells WHERE fingerprint = ?", (self.fingerprint,))
+        return {params for params, in rows}
+
+    def load(self, params):
+        """
+        Full stored result for params (metrics, dates and curves) in the
+        run_sweep result format, or None when it is not stored.
+        """
+        row = self.connection.execute(
+            f"SELECT {', '.join(METRICS)}, curves FROM cells WHERE fingerprint = ? AND params = ?",
+            (self.fingerprint, params_key(params)),
+        ).fetchone()
+        if row is None:
+            return None
+        cell = {"params": dict(params), **dict(zip(METRICS, row[:-1]))}
+        with np.load(io.BytesIO(row[-1])) as stored:
+            cell["dates"] = stored["dates"].tolist()
+            for name in CURVES:
+                cell[name] = stored[name]
+        return cell
+
+    def frame(self, order_by=None, ascending=True, limit=None):
+        """
+        Metrics of every stored cell as a DataFrame with one column per
+        parameter, optionally sorted by a metric and limited to the first
+        limit rows.
+        """
+        query = f"SELECT params, {', '.join(METRICS)} FROM cells WHERE fingerprint = ?"
+        if order_by is not None:
+            if order_by not in METRICS:
+                raise ValueError(f"Unknown metric {order_by}; expected one of {METRICS}")
+            query += f" ORDER BY {order_by} {'ASC' if ascending else 'DESC'}"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        rows = self.connection.execute(query, (self.fingerprint,)).fetchall()
+        params = pd.DataFrame([json.loads(row[0]) for row in rows])
+        metrics = pd.DataFrame([row[1:] for row in rows], columns=METRICS)
+        return pd.concat([params, metrics], axis=1)
+
+    def top(self, k, by="max_drawdown", ascending=False):
+        """
+        The k best cells by a metric; by default the shallowest drawdowns.
+        """
+        return self.frame(order_by=by, ascending=ascending, limit=k)
+
+    def surface(self, metric, x, y):
+        """
+        metric over the grid of two parameters, as a y x x DataFrame.
+        """
+        return self.frame().pivot_table(index=y, columns=x, values=metric)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _plain(value):
+    # NumPy scalars to the Python values json and sqlite3 accept
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import backtrader as bt
+
+from src.strategies import MomentumStrategy
+from src.panel import PricePanel
+from src.engine import run_momentum_backtest
+
+# Runs MomentumStrategy on backtrader and on the NumPy panel engine over the
+# same CSV files and checks that both produce the same outputs.
+# Usage: python -m src.scripts.check_engine_parity --data-dir <stock_data dir>
+
+ETF_TICKERS = [
+    'XLY', 'XLP', 'XLE', 'XLF', 'XLV', 'XLI', 'XLB', 'XLRE', 'XLK', 'XLU',
+    'SCHA', 'VONG', 'IWD', 'IDEV', 'INDA', 'EWJ',
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--data-dir', default='data/stock_data/stock_data_01-01-2000-09-03-2024/')
+parser.add_argument('--spy', default='data/benchmark/SPY.csv')
+parser.add_argument('--tickers', nargs='*', default=ETF_TICKERS)
+parser.add_argument('--momentum-window', type=int, default=14)
+parser.add_argument('--total-window', type=int, default=252)
+parser.add_argument('--long-percentile', type=float, default=0.38)
+parser.add_argument('--num-stocks', type=int, default=16)
+parser.add_argument('--tolerance', type=float, default=1e-6)
+args = parser.parse_args()
+
+filepaths = {"SPY": args.spy}
+for ticker in args.tickers:
+    ticker_filepath = os.path.join(args.data_dir, f"{ticker}.csv")
+    if os.path.exists(ticker_filepath):
+        filepaths[ticker] = ticker_filepath
+
+initial_cash = 1000000
+params = dict(
+    momentum_window=args.momentum_window,
+    total_window=args.total_window,
+    long_percentile=args.long_percentile,
+    num_stocks=args.num_stocks,
+)
+
+start = time.perf_counter()
+cerebro = bt.Cerebro(stdstats=False)
+cerebro.broker.setcash(initial_cash)
+cerebro.broker.set_coc(True)
+for ticker, ticker_filepath in filepaths.items():
+    cerebro.adddata(bt.feeds.YahooFinanceCSVData(dataname=ticker_filepath), name=ticker)
+cerebro.addstrategy(MomentumStrategy, **params)
+expected = cerebro.run()[0]
+backtrader_time = time.perf_counter() - start
+
+start = time.perf_counter()
+panel = PricePanel.from_csv(filepaths)
+load_time = time.perf_counter() - start
+start = time.perf_counter()
+actual = run_momentum_backtest(panel, initial_cash=initial_cash, **params)
+numpy_time = time.perf_counter() - start
+
+failures = []
+if list(expected.dates) != list(actual.dates):
+    failures.append(f"dates differ ({len(expected.dates)} vs {len(actual.dates)} bars)")
+else:
+    for name in ('portfolio_values', 'hursts', 'pvalues'):
+        diff = np.max(np.abs(np.asarray(getattr(expected, name)) - np.asarray(getattr(actual, name))), initial=0)
+        print(f"{name}: max abs difference {diff:.3g}")
+        if not diff <= args.tolerance * (initial_cash if name == 'portfolio_values' else 1):
+            failures.append(f"{name} differ by {diff:.3g}")
+
+print(f"backtrader: {backtrader_time:.2f}s, numpy: {numpy_time:.3f}s (+{load_time:.3f}s loading)")
+if failures:
+    print("Parity check failed: " + "; ".join(failures))
+    sys.exit(1)
+print("Parity check passed")
@@ -0,0 +1,104 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from src.panel import PricePanel
+from src.synthetic import synthetic_frames, write_yahoo_csvs
+from src.regime import REGIME_ESTIMATORS, MIN_REGIME_POWERS
+
+# Compares the regime estimators of src/regime.py with the R/S Hurst filter
+# on SPY: the cost of the whole rolling series and of a single window, and
+# how often each one's momentum/cash decision agrees with R/S on the
+# rebalance schedule.
+# Usage: python -m src.scripts.compare_regime_estimators --spy data/benchmark/SPY.csv
+#        python -m src.scripts.compare_regime_estimators --synthetic 25
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--spy', default='data/benchmark/SPY.csv')
+parser.add_argument('--synthetic', type=int, metavar="YEARS", help="use a synthetic SPY series instead of --spy")
+parser.add_argument('--hurst-power', type=int, default=8)
+parser.add_argument('--hurst-threshold', type=float, default=0.5)
+parser.add_argument('--pvalue-threshold', type=float, default=0.05)
+parser.add_argument('--momentum-window', type=int, default=14, help="bars between regime decisions")
+parser.add_argument('--repeat', type=int, default=5)
+parser.add_argument('--output-dir', default="results/regime_estimators")
+args = parser.parse_args()
+
+spy = args.spy
+if args.synthetic:
+    directory = os.path.join("data", "synthetic", f"spy_{args.synthetic}y")
+    spy = write_yahoo_csvs(synthetic_frames(0, args.synthetic), os.path.join(directory, "csv"))["SPY"]
+panel = PricePanel.from_csv({"SPY": spy})
+has_bar = ~np.isnan(panel.close[:, 0])
+closes, dates = panel.close[has_bar, 0], pd.DatetimeIndex(panel.dates[has_bar])
+if args.hurst_power < max(MIN_REGIME_POWERS.values()):
+    parser.error(f"--hurst-power must be at least {max(MIN_REGIME_POWERS.values())} for every estimator")
+n = 2**args.hurst_power
+if len(closes) <= n:
+    parser.error(f"SPY has {len(closes)} bars; the estimators need more than {n}")
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+estimates, rows = {}, []
+for name, estimator in REGIME_ESTIMATORS.items():
+    series_seconds = best_time(lambda: estimator(closes, args.hurst_power), args.repeat)
+    window_seconds = best_time(lambda: estimator(closes[-n - 1:], args.hurst_power), args.repeat * 20)
+    estimates[name] = estimator(closes, args.hurst_power)
+    rows.append({"estimator": name, "series_seconds": series_seconds, "window_microseconds": window_seconds * 1e6})
+
+# Decisions on the rebalance schedule, as the strategy reads them
+decision_rows = np.arange(0, len(closes) - n, args.momentum_window)
+decisions = {
+    name: (hurst[decision_rows] > args.hurst_threshold) & (pvalue[decision_rows] < args.pvalue_threshold)
+    for name, (hurst, _, pvalue) in estimates.items()
+}
+reference_hurst, reference = estimates["rs"][0], decisions["rs"]
+for row in rows:
+    name = row["estimator"]
+    hurst = estimates[name][0]
+    valid = ~np.isnan(hurst) & ~np.isnan(reference_hurst)
+    row.update(
+        correlation=np.corrcoef(hurst[valid], reference_hurst[valid])[0, 1],
+        mean_estimate=np.nanmean(hurst),
+        in_market=decisions[name].mean(),
+        agreement=(decisions[name] == reference).mean(),
+        switches=int(np.count_nonzero(np.diff(decisions[name].astype(int)))),
+    )
+
+comparison = pd.DataFrame(rows).set_index("estimator")
+pd.set_option('display.width', 200)
+print(f"SPY: {len(closes)} bars, {2**args.hurst_power + 1}-bar windows, {len(decision_rows)} regime decisions")
+print(comparison.to_string(float_format=lambda x: f"{x:.4f}"))
+
+os.makedirs(args.output_dir, exist_ok=True)
+comparison.to_csv(os.path.join(args.output_dir, "comparison.csv"))
+
+# Estimates over time and the momentum-driven periods of each estimator
+fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
+window_dates = dates[n:]
+for name, (hurst, _, _) in estimates.items():
+    ax1.plot(window_dates, hurst, linewidth=0.8, label=name)
+ax1.axhline(args.hurst_threshold, color="black", linewidth=0.8)
+ax1.set_ylabel("Hurst exponent")
+ax1.set_title(f"Regime estimates over {2**args.hurst_power + 1}-bar windows")
+ax1.legend()
+ax1.grid()
+for k, (name, decision) in enumerate(decisions.items()):
+    ax2.fill_between(window_dates[decision_rows], k, k + decision * 0.8, step="post", label=name)
+ax2.set_yticks(np.arange(len(decisions)) + 0.4, list(decisions))
+ax2.set_title(f"Momentum driven (H > {args.hurst_threshold:g}, p < {args.pvalue_threshold:g}) at each regime decision")
+plt.savefig(os.path.join(args.output_dir, "regime_estimators.png"))
+print(f"Saved comparison and plot to {args.output_dir}")
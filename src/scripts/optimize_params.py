@@ -0,0 +1,88 @@
+import os
+import time
+import argparse
+import numpy as np
+
+from src.panel import PricePanel
+from src.price_store import PriceStore
+from src.synthetic import synthetic_frames, write_yahoo_csvs
+from src.optimize import GridSearch, SuccessiveHalving, TPESearch, optimize, evaluations
+
+# Searches the monte_carlo.py parameter grid with an adaptive optimizer on the
+# NumPy engine instead of running every cell.
+# Usage: python -m src.scripts.optimize_params --search halving
+#        python -m src.scripts.optimize_params --search tpe --trials 40 --compare-grid
+#        python -m src.scripts.optimize_params --synthetic 16 25 --search halving --compare-grid
+
+ETF_TICKERS = [
+    'XLY', 'XLP', 'XLE', 'XLF', 'XLV', 'XLI', 'XLB', 'XLRE', 'XLK', 'XLU',
+    'SCHA', 'VONG', 'IWD', 'IDEV', 'INDA', 'EWJ',
+]
+
+SPACE = {
+    "long_percentile": [i / 16 for i in range(1, 17)],
+    "momentum_window": list(range(1, 21)),
+}
+
+
+def make_search(name, args):
+    if name == "grid":
+        return GridSearch(SPACE, seed=args.seed)
+    if name == "halving":
+        return SuccessiveHalving(SPACE, num_candidates=args.candidates, min_budget=args.min_budget,
+                                 eta=args.eta, seed=args.seed)
+    return TPESearch(SPACE, num_trials=args.trials, batch_size=max(args.workers, 4), seed=args.seed)
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--search', choices=["grid", "halving", "tpe"], default="halving")
+parser.add_argument('--objective', choices=["max_drawdown", "sharpe", "final_value"], default="max_drawdown")
+parser.add_argument('--data-dir', default='data/stock_data/stock_data_01-01-2000-09-03-2024/')
+parser.add_argument('--spy', default='data/benchmark/SPY.csv')
+parser.add_argument('--tickers', nargs='*', default=ETF_TICKERS)
+parser.add_argument('--synthetic', nargs=2, type=int, metavar=("TICKERS", "YEARS"),
+                    help="search a synthetic universe instead of the CSV files")
+parser.add_argument('--total-window', type=int, default=252)
+parser.add_argument('--num-stocks', type=int, default=16)
+parser.add_argument('--candidates', type=int, default=None, help="successive halving: grid cells to start from (default all)")
+parser.add_argument('--min-budget', type=float, default=1 / 9, help="successive halving: first rung's share of the period")
+parser.add_argument('--eta', type=int, default=3, help="successive halving: 1/eta of each rung is promoted")
+parser.add_argument('--trials', type=int, default=40, help="tpe: number of full-period runs")
+parser.add_argument('--workers', type=int, default=os.cpu_count())
+parser.add_argument('--no-early-stop', action='store_true', help="run every trial to the end")
+parser.add_argument('--compare-grid', action='store_true', help="also run the full grid and report the gap")
+parser.add_argument('--seed', type=int, default=0)
+args = parser.parse_args()
+
+if args.synthetic:
+    directory = os.path.join("data", "synthetic", f"{args.synthetic[0]}x{args.synthetic[1]}")
+    filepaths = write_yahoo_csvs(synthetic_frames(*args.synthetic, seed=args.seed), os.path.join(directory, "csv"))
+    store = PriceStore.load_or_build(os.path.join(directory, "store"), filepaths)
+else:
+    filepaths = {"SPY": args.spy}
+    for ticker in args.tickers:
+        ticker_filepath = os.path.join(args.data_dir, f"{ticker}.csv")
+        if os.path.exists(ticker_filepath):
+            filepaths[ticker] = ticker_filepath
+    store = PriceStore.load_or_build(os.path.join(args.data_dir, "price_store"), filepaths)
+panel = PricePanel.from_store(store)
+fixed_params = dict(total_window=args.total_window, num_stocks=args.num_stocks)
+grid_size = int(np.prod([len(values) for values in SPACE.values()]))
+
+searches = [args.search] + (["grid"] if args.compare_grid and args.search != "grid" else [])
+found = {}
+for name in searches:
+    search = make_search(name, args)
+    start = time.perf_counter()
+    best = optimize(panel, search, fixed_params, objective=args.objective, workers=args.workers,
+                    early_stop=not args.no_early_stop)
+    runs, cost = evaluations(search)
+    terminated = sum(trial.terminated for trial in search.trials)
+    found[name] = best
+    print(f"{name}: {runs} runs ({terminated} stopped early), {cost:.1f} full-period equivalents "
+          f"({cost / grid_size:.1%} of the {grid_size} cell grid) in {time.perf_counter() - start:.1f}s")
+    print(f"{name}: best {best.params} {args.objective} {best.score:.4f}")
+
+if "grid" in found and args.search != "grid":
+    gap = found["grid"].score - found[args.search].score
+    print(f"{args.search} is {gap:.4f} {args.objective} from the grid optimum")
@@ -0,0 +1,247 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+from src.hurst import rolling_hurst
+from src.regime import REGIME_ESTIMATORS
+from src.panel import PricePanel
+from src.price_store import PriceStore, PriceStoreData
+from src.quality import repair_frames
+from src.universe import DollarVolumePanel
+from src.engine import run_momentum_backtest
+from src.factors import factor_panel
+from src.synthetic import synthetic_frames, write_yahoo_csvs
+
+# Times the strategy's hot paths on deterministic synthetic panels and saves
+# the results as JSON. Runs offline; no data downloads or API keys needed.
+# Usage: python -m src.scripts.run_benchmarks --sizes etf16-5y sp500-5y
+#        python -m src.scripts.run_benchmarks --compare results/benchmarks/<previous>.json
+
+SIZES = {
+    "etf16-5y": (16, 5),
+    "etf16-25y": (16, 25),
+    "sp500-5y": (500, 5),
+    "sp500-25y": (500, 25),
+    "sp1500-5y": (1500, 5),
+    "sp1500-25y": (1500, 25),
+}
+
+STRATEGY_PARAMS = dict(momentum_window=14, total_window=252, long_percentile=0.38, num_stocks=16)
+
+
+class BenchmarkData:
+    """
+    One synthetic universe in every form the benchmarks read: frames, CSV
+    files, a PriceStore and a PricePanel.
+    """
+    def __init__(self, num_tickers, years, seed, directory):
+        self.directory = directory
+        self.frames = synthetic_frames(num_tickers, years, seed=seed)
+        self.filepaths = write_yahoo_csvs(self.frames, os.path.join(directory, "csv"))
+        self.store_dir = os.path.join(directory, "store")
+        self.store = PriceStore.from_csv(self.store_dir, self.filepaths)
+        self.panel = PricePanel.from_store(self.store)
+        has_bar = ~np.isnan(self.panel.close)
+        self.feed_closes = [self.panel.close[has_bar[:, k], k] for k in range(len(self.panel.tickers))]
+
+
+def bench_load_csv(data):
+    PricePanel.from_csv(data.filepaths)
+
+
+def bench_build_store(data):
+    PriceStore.from_csv(os.path.join(data.directory, "store_bench"), data.filepaths)
+
+
+def bench_open_store(data):
+    PricePanel.from_store(PriceStore(data.store_dir))
+
+
+def bench_quality(data):
+    repair_frames(data.frames, max_zero_run=14)
+
+
+def bench_hurst(data):
+    rolling_hurst(data.feed_closes[0], 8)
+
+
+def bench_regime(name):
+    def bench(data):
+        REGIME_ESTIMATORS[name](data.feed_closes[0], 8)
+    return bench
+
+
+def bench_factor(name):
+    def bench(data):
+        factor_panel(data.panel.close, name, STRATEGY_PARAMS["momentum_window"], STRATEGY_PARAMS["total_window"])
+    return bench
+
+
+def bench_universe(data):
+    # One DollarVolumePanel update per bar, as MomentumStrategy does
+    panel = data.panel
+    lengths = panel.bar_counts()
+    volume = np.nan_to_num(panel.volume)
+    close = np.nan_to_num(panel.close)
+    universe = DollarVolumePanel(len(panel.tickers), STRATEGY_PARAMS["total_window"])
+    for row in range(len(panel.dates)):
+        universe.update(lengths[row], volume[row], close[row])
+        universe.top(STRATEGY_PARAMS["num_stocks"])
+
+
+def bench_engine(data):
+    run_momentum_backtest(data.panel, **STRATEGY_PARAMS)
+
+
+def bench_cerebro(data):
+    from src.strategies import MomentumStrategy
+
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.broker.setcash(1000000)
+    cerebro.broker.set_coc(True)
+    for ticker in data.store.tickers:
+        cerebro.adddata(PriceStoreData(store=data.store, ticker=ticker), name=ticker)
+    cerebro.addstrategy(MomentumStrategy, ledger_path=os.path.join(data.directory, "ledger.jsonl"), **STRATEGY_PARAMS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cerebro.run()
+
+
+BENCHMARKS = {
+    "load_csv": bench_load_csv,
+    "build_store": bench_build_store,
+    "open_store": bench_open_store,
+    "quality": bench_quality,
+    "hurst": bench_hurst,
+    "regime_dfa": bench_regime("dfa"),
+    "regime_variance_ratio": bench_regime("variance_ratio"),
+    "regime_aggregated_variance": bench_regime("aggregated_variance"),
+    "factor_rsi": bench_factor("rsi"),
+    "factor_macd": bench_factor("macd"),
+    "factor_momentum": bench_factor("momentum"),
+    "universe": bench_universe,
+    "engine": bench_engine,
+    "cerebro": bench_cerebro,
+}
+
+
+def measure(bench, data, repeat, memory):
+    """
+    Best and mean wall time over repeat runs, and the peak traced memory of
+    one extra run when memory is set.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bench(data)
+        times.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        bench(data)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"seconds": min(times), "mean_seconds": float(np.mean(times)), "peak_bytes": peak}
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """
+    Prints the change of every benchmark present in both runs and returns
+    the ones that got slower by more than threshold (and by more than
+    min_seconds, so timer noise on very short benchmarks is not flagged).
+    """
+    previous = {(r["size"], r["benchmark"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["size"], result["benchmark"]))
+        if before is None:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        flag = ""
+        if ratio > 1 + threshold and result["seconds"] - before["seconds"] > min_seconds:
+            flag = "  REGRESSION"
+            regressions.append(result)
+        print(f"{result['size']:>11} {result['benchmark']:>26}: {before['seconds']:.4f}s -> {result['seconds']:.4f}s ({ratio:.2f}x){flag}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', nargs='*', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--benchmarks', nargs='*', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="skip the peak memory pass")
+    parser.add_argument('--output', default=None, help="JSON file to write (default: results/benchmarks/<timestamp>.json)")
+    parser.add_argument('--compare', default=None, help="previous results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="slowdown flagged as a regression")
+    parser.add_argument('--min-seconds', type=float, default=0.005, help="smallest slowdown flagged, in seconds")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        num_tickers, years = SIZES[size]
+        directory = tempfile.mkdtemp(prefix=f"bench_{size}_")
+        try:
+            start = time.perf_counter()
+            data = BenchmarkData(num_tickers, years, args.seed, directory)
+            print(f"{size}: generated {len(data.frames)} tickers x {years} years in {time.perf_counter() - start:.1f}s")
+            for name in args.benchmarks:
+                # The backtrader run is slow enough that one run is representative
+                repeat = 1 if name == "cerebro" else args.repeat
+                result = measure(BENCHMARKS[name], data, repeat, not args.no_memory)
+                result.update(size=size, benchmark=name, tickers=num_tickers + 1, years=years)
+                results.append(result)
+                peak = f", peak {result['peak_bytes'] / 2**20:.1f} MiB" if result['peak_bytes'] is not None else ""
+                print(f"{size:>11} {name:>26}: {result['seconds']:.4f}s{peak}")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": pd.Timestamp.now().isoformat(timespec='seconds'),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        "results", "benchmarks", f"benchmarks-{pd.Timestamp.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"{len(regressions)} benchmarks slower by more than {args.threshold:.0%}")
+            sys.exit(1)
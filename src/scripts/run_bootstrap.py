@@ -0,0 +1,96 @@
+import os
+import time
+import argparse
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from src.panel import PricePanel
+from src.price_store import PriceStore
+from src.synthetic import synthetic_frames, write_yahoo_csvs
+from src.factors import FACTORS
+from src.bootstrap import run_monte_carlo, BOOTSTRAP_METHODS
+from src.regime import REGIME_ESTIMATORS
+
+# Block-bootstrap Monte Carlo of the momentum/Hurst strategy: simulates the
+# strategy on thousands of synthetic price paths resampled from the ETF
+# universe and reports the distribution of final value, max drawdown and Sharpe.
+# Usage: python -m src.scripts.run_bootstrap --paths 10000 --years 25
+#        python -m src.scripts.run_bootstrap --synthetic 16 25 --paths 1000 --method circular
+
+ETF_TICKERS = [
+    'XLY', 'XLP', 'XLE', 'XLF', 'XLV', 'XLI', 'XLB', 'XLRE', 'XLK', 'XLU',
+    'SCHA', 'VONG', 'IWD', 'IDEV', 'INDA', 'EWJ',
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--data-dir', default='data/stock_data/stock_data_01-01-2000-09-03-2024/')
+parser.add_argument('--spy', default='data/benchmark/SPY.csv')
+parser.add_argument('--tickers', nargs='*', default=ETF_TICKERS)
+parser.add_argument('--synthetic', nargs=2, type=int, metavar=("TICKERS", "YEARS"),
+                    help="resample a synthetic universe instead of the CSV files")
+parser.add_argument('--paths', type=int, default=10000)
+parser.add_argument('--years', type=float, default=25)
+parser.add_argument('--method', choices=BOOTSTRAP_METHODS, default="stationary")
+parser.add_argument('--block-size', type=int, default=20, help="(mean) block length in trading days")
+parser.add_argument('--chunk-size', type=int, default=100, help="paths simulated at once")
+parser.add_argument('--momentum-window', type=int, default=14)
+parser.add_argument('--total-window', type=int, default=252)
+parser.add_argument('--long-percentile', type=float, default=0.38)
+parser.add_argument('--num-stocks', type=int, default=16)
+parser.add_argument('--momentum-factor', choices=list(FACTORS), default="rsi")
+parser.add_argument('--regime-estimator', choices=list(REGIME_ESTIMATORS), default="rs")
+parser.add_argument('--hurst-threshold', type=float, default=0.5)
+parser.add_argument('--pvalue-threshold', type=float, default=0.05)
+parser.add_argument('--seed', type=int, default=0)
+parser.add_argument('--output-dir', default="results/bootstrap")
+args = parser.parse_args()
+
+if args.synthetic:
+    directory = os.path.join("data", "synthetic", f"{args.synthetic[0]}x{args.synthetic[1]}")
+    filepaths = write_yahoo_csvs(synthetic_frames(*args.synthetic), os.path.join(directory, "csv"))
+    store = PriceStore.load_or_build(os.path.join(directory, "store"), filepaths)
+else:
+    filepaths = {"SPY": args.spy}
+    for ticker in args.tickers:
+        ticker_filepath = os.path.join(args.data_dir, f"{ticker}.csv")
+        if os.path.exists(ticker_filepath):
+            filepaths[ticker] = ticker_filepath
+    store = PriceStore.load_or_build(os.path.join(args.data_dir, "price_store"), filepaths)
+panel = PricePanel.from_store(store)
+
+start = time.perf_counter()
+result = run_monte_carlo(
+    panel,
+    args.paths,
+    momentum_window=args.momentum_window,
+    total_window=args.total_window,
+    long_percentile=args.long_percentile,
+    num_stocks=args.num_stocks,
+    momentum_factor=args.momentum_factor,
+    regime_estimator=args.regime_estimator,
+    hurst_threshold=args.hurst_threshold,
+    pvalue_threshold=args.pvalue_threshold,
+    years=args.years,
+    block_size=args.block_size,
+    method=args.method,
+    chunk_size=args.chunk_size,
+    seed=args.seed,
+)
+print(f"Simulated {args.paths} paths x {args.years:g} years in {time.perf_counter() - start:.1f}s")
+print(result.summary().to_string())
+
+os.makedirs(args.output_dir, exist_ok=True)
+result.frame().to_csv(os.path.join(args.output_dir, "paths.csv"), index_label="path")
+
+fig, (ax1, ax2, ax3, ax4) = plt.subplots(4, 1, figsize=(12, 18))
+for curve in result.curves:
+    ax1.plot(curve, linewidth=0.8)
+ax1.set_title(f"First {len(result.curves)} bootstrap paths")
+ax1.set_ylabel("Portfolio Value")
+for ax, column, label in [(ax2, "final_value", "Final Value"), (ax3, "max_drawdown", "Max Drawdown"), (ax4, "sharpe", "Sharpe Ratio")]:
+    ax.hist(result.frame()[column].dropna(), bins=100)
+    ax.set_title(f"{label} over {args.paths} paths ({args.method} bootstrap, block size {args.block_size})")
+    ax.grid()
+plt.savefig(os.path.join(args.output_dir, "bootstrap.png"))
+print(f"Saved per-path results and plots to {args.output_dir}")
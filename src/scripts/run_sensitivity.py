@@ -0,0 +1,113 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from src.panel import PricePanel
+from src.cache import FeatureCache
+from src.price_store import PriceStore
+from src.factors import FACTORS
+from src.engine import run_momentum_backtest
+from src.sweep import max_drawdown
+from src.synthetic import synthetic_frames, write_yahoo_csvs
+from src.sensitivity import regime_sensitivity
+from src.regime import REGIME_ESTIMATORS
+
+# Sensitivity of the strategy to the Hurst regime filter: final value, max
+# drawdown and Sharpe ratio over a grid of Hurst exponent and p-value
+# thresholds and Hurst window powers, from one pass over the data.
+# Usage: python -m src.scripts.run_sensitivity
+#        python -m src.scripts.run_sensitivity --synthetic 16 25 --hurst-powers 6 7 8 --check 3
+
+ETF_TICKERS = [
+    'XLY', 'XLP', 'XLE', 'XLF', 'XLV', 'XLI', 'XLB', 'XLRE', 'XLK', 'XLU',
+    'SCHA', 'VONG', 'IWD', 'IDEV', 'INDA', 'EWJ',
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--data-dir', default='data/stock_data/stock_data_01-01-2000-09-03-2024/')
+parser.add_argument('--spy', default='data/benchmark/SPY.csv')
+parser.add_argument('--tickers', nargs='*', default=ETF_TICKERS)
+parser.add_argument('--synthetic', nargs=2, type=int, metavar=("TICKERS", "YEARS"),
+                    help="use a synthetic universe instead of the CSV files")
+parser.add_argument('--hurst-thresholds', nargs='*', type=float,
+                    default=np.round(np.arange(0.40, 0.701, 0.02), 2).tolist())
+parser.add_argument('--pvalue-thresholds', nargs='*', type=float,
+                    default=[0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0])
+parser.add_argument('--hurst-powers', nargs='*', type=int, default=[6, 7, 8])
+parser.add_argument('--momentum-window', type=int, default=14)
+parser.add_argument('--total-window', type=int, default=252)
+parser.add_argument('--long-percentile', type=float, default=0.38)
+parser.add_argument('--num-stocks', type=int, default=16)
+parser.add_argument('--momentum-factor', choices=list(FACTORS), default="rsi")
+parser.add_argument('--regime-estimator', choices=list(REGIME_ESTIMATORS), default="rs")
+parser.add_argument('--initial-cash', type=float, default=1000000)
+parser.add_argument('--check', type=int, default=0, help="rerun the N best cells with the exact engine")
+parser.add_argument('--cache-dir', default="data/feature_cache")
+parser.add_argument('--output-dir', default="results/sensitivity")
+args = parser.parse_args()
+
+if args.synthetic:
+    directory = os.path.join("data", "synthetic", f"{args.synthetic[0]}x{args.synthetic[1]}")
+    filepaths = write_yahoo_csvs(synthetic_frames(*args.synthetic), os.path.join(directory, "csv"))
+    store = PriceStore.load_or_build(os.path.join(directory, "store"), filepaths)
+else:
+    filepaths = {"SPY": args.spy}
+    for ticker in args.tickers:
+        ticker_filepath = os.path.join(args.data_dir, f"{ticker}.csv")
+        if os.path.exists(ticker_filepath):
+            filepaths[ticker] = ticker_filepath
+    store = PriceStore.load_or_build(os.path.join(args.data_dir, "price_store"), filepaths)
+panel = PricePanel.from_store(store)
+
+strategy_params = dict(
+    momentum_window=args.momentum_window,
+    total_window=args.total_window,
+    long_percentile=args.long_percentile,
+    num_stocks=args.num_stocks,
+    initial_cash=args.initial_cash,
+    momentum_factor=args.momentum_factor,
+    regime_estimator=args.regime_estimator,
+)
+cache = FeatureCache(args.cache_dir)
+start = time.perf_counter()
+result = regime_sensitivity(panel, hurst_thresholds=args.hurst_thresholds, pvalue_thresholds=args.pvalue_thresholds,
+                            hurst_powers=args.hurst_powers, cache=cache, **strategy_params)
+cells = result.frame()
+print(f"Evaluated {len(cells)} regime filter settings in {time.perf_counter() - start:.2f}s")
+pd.set_option('display.width', 200)
+best = cells.sort_values("final_value", ascending=False).head(max(args.check, 10))
+print(best.to_string(index=False))
+
+# The exact engine on the best cells, to gauge the fractional share model
+for cell in best.head(args.check).itertuples():
+    run = run_momentum_backtest(panel, hurst_power=cell.hurst_power, hurst_threshold=cell.hurst_threshold,
+                                pvalue_threshold=cell.pvalue_threshold, cache=cache, **strategy_params)
+    print(f"power {cell.hurst_power}, H > {cell.hurst_threshold:g}, p < {cell.pvalue_threshold:g}: "
+          f"final value {cell.final_value:,.2f} (engine {run.portfolio_values[-1]:,.2f}), "
+          f"max drawdown {cell.max_drawdown:.2%} (engine {max_drawdown(run.portfolio_values):.2%})")
+
+os.makedirs(args.output_dir, exist_ok=True)
+cells.to_csv(os.path.join(args.output_dir, "cells.csv"), index=False)
+
+# One row of heatmaps per Hurst power
+statistics = [("max_drawdown", "Max Drawdown"), ("final_value", "Final Value")]
+fig, axes = plt.subplots(len(result.hurst_powers), len(statistics), squeeze=False,
+                         figsize=(7 * len(statistics), 5 * len(result.hurst_powers)))
+for row, power in enumerate(result.hurst_powers):
+    for ax, (statistic, label) in zip(axes[row], statistics):
+        surface = result.surface(statistic, power)
+        image = ax.imshow(surface.values, aspect="auto", origin="lower", cmap="viridis")
+        ax.set_xticks(range(len(surface.columns)), [f"{p:g}" for p in surface.columns])
+        ax.set_yticks(range(len(surface.index)), [f"{h:g}" for h in surface.index])
+        ax.set_xlabel("p-value threshold")
+        ax.set_ylabel("Hurst threshold")
+        ax.set_title(f"{label}, Hurst window 2^{power}")
+        fig.colorbar(image, ax=ax)
+plt.tight_layout()
+plt.savefig(os.path.join(args.output_dir, "sensitivity.png"))
+print(f"Saved per-cell results and heatmaps to {args.output_dir}")
@@ -0,0 +1,78 @@
+import os
+import time
+import resource
+import argparse
+import numpy as np
+
+from src.price_store import PriceStore
+from src.synthetic import synthetic_bar_chunks, synthetic_tickers
+from src.streaming import run_streaming_backtest, store_chunks, STREAMING_FACTORS
+from src.regime import REGIME_ESTIMATORS
+
+# Out-of-core backtest of the momentum/Hurst strategy on intraday (or daily)
+# bars: bars are streamed from a PriceStore in row chunks and the outputs are
+# spilled to disk, so memory stays flat however long the history is.
+# Windows are in bars (390 one-minute bars per trading day).
+# Usage: python -m src.scripts.run_streaming --store data/intraday/price_store
+#        python -m src.scripts.run_streaming --synthetic 100 1000000
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--store', help="PriceStore directory; the first ticker is the regime series")
+parser.add_argument('--synthetic', nargs=2, type=int, metavar=("TICKERS", "BARS"),
+                    help="stream a synthetic minute bar universe instead of --store")
+parser.add_argument('--chunk-size', type=int, default=16384, help="bars read from the store at once")
+parser.add_argument('--momentum-window', type=int, default=390)
+parser.add_argument('--total-window', type=int, default=390 * 20)
+parser.add_argument('--long-percentile', type=float, default=0.38)
+parser.add_argument('--num-stocks', type=int, default=16)
+parser.add_argument('--momentum-factor', choices=list(STREAMING_FACTORS), default="rsi")
+parser.add_argument('--regime-estimator', choices=list(REGIME_ESTIMATORS), default="rs")
+parser.add_argument('--hurst-threshold', type=float, default=0.5)
+parser.add_argument('--pvalue-threshold', type=float, default=0.05)
+parser.add_argument('--initial-cash', type=float, default=1000000)
+parser.add_argument('--output-dir', default="results/streaming")
+args = parser.parse_args()
+
+if args.synthetic:
+    num_tickers, num_bars = args.synthetic
+    directory = os.path.join("data", "synthetic", f"{num_tickers}x{num_bars}_minute", "store")
+    if not os.path.exists(directory):
+        chunks = synthetic_bar_chunks(num_tickers, num_bars, chunk_size=args.chunk_size)
+        PriceStore.write_chunks(directory, synthetic_tickers(num_tickers), num_bars, chunks)
+    store = PriceStore(directory)
+elif args.store:
+    store = PriceStore(args.store)
+else:
+    parser.error("pass --store or --synthetic")
+
+start = time.perf_counter()
+result = run_streaming_backtest(
+    store_chunks(store, chunk_size=args.chunk_size),
+    store.tickers,
+    args.output_dir,
+    momentum_window=args.momentum_window,
+    total_window=args.total_window,
+    long_percentile=args.long_percentile,
+    num_stocks=args.num_stocks,
+    initial_cash=args.initial_cash,
+    momentum_factor=args.momentum_factor,
+    regime_estimator=args.regime_estimator,
+    hurst_threshold=args.hurst_threshold,
+    pvalue_threshold=args.pvalue_threshold,
+)
+elapsed = time.perf_counter() - start
+
+# Max drawdown over the memory-mapped values, one chunk at a time
+peak, drawdown = -np.inf, 0.0
+for first in range(0, len(result.portfolio_values), args.chunk_size):
+    values = np.asarray(result.portfolio_values[first:first + args.chunk_size])
+    peaks = np.maximum.accumulate(np.maximum(values, peak))
+    drawdown = min(drawdown, float(((values - peaks) / peaks).min()))
+    peak = peaks[-1]
+
+num_bars = len(store.dates)
+print(f"Streamed {num_bars} bars x {len(store.tickers)} tickers in {elapsed:.1f}s ({num_bars / elapsed:,.0f} bars/s)")
+print(f"Peak resident memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+if len(result.portfolio_values):
+    print(f"Final value {result.portfolio_values[-1]:,.2f}, max drawdown {drawdown:.2%}")
+print(f"Saved portfolio values, dates, Hurst exponents and p-values to {args.output_dir}")
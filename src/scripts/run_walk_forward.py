@@ -0,0 +1,102 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from src.panel import PricePanel
+from src.price_store import PriceStore
+from src.results_store import ResultsStore
+from src.synthetic import synthetic_frames, write_yahoo_csvs
+from src.walk_forward import walk_forward, WALK_FORWARD_OBJECTIVES
+
+# Walk-forward optimization of the monte_carlo.py parameter grid: parameters
+# are picked on rolling train windows and evaluated on the following test
+# windows, and the out-of-sample test windows are stitched into one curve.
+# Usage: python -m src.scripts.run_walk_forward --train-years 5 --test-years 1
+#        python -m src.scripts.run_walk_forward --synthetic 16 25 --anchored
+
+ETF_TICKERS = [
+    'XLY', 'XLP', 'XLE', 'XLF', 'XLV', 'XLI', 'XLB', 'XLRE', 'XLK', 'XLU',
+    'SCHA', 'VONG', 'IWD', 'IDEV', 'INDA', 'EWJ',
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--data-dir', default='data/stock_data/stock_data_01-01-2000-09-03-2024/')
+parser.add_argument('--spy', default='data/benchmark/SPY.csv')
+parser.add_argument('--tickers', nargs='*', default=ETF_TICKERS)
+parser.add_argument('--synthetic', nargs=2, type=int, metavar=("TICKERS", "YEARS"),
+                    help="use a synthetic universe instead of the CSV files")
+parser.add_argument('--train-years', type=int, default=5)
+parser.add_argument('--test-years', type=int, default=1)
+parser.add_argument('--step-years', type=int, default=None, help="fold step (default: --test-years)")
+parser.add_argument('--anchored', action='store_true', help="expanding train windows from the first date")
+parser.add_argument('--objective', choices=WALK_FORWARD_OBJECTIVES, default="max_drawdown")
+parser.add_argument('--total-window', type=int, default=252)
+parser.add_argument('--num-stocks', type=int, default=16)
+parser.add_argument('--initial-cash', type=float, default=1000000)
+parser.add_argument('--workers', type=int, default=os.cpu_count())
+parser.add_argument('--cache-dir', default="data/feature_cache")
+parser.add_argument('--results', default="results/sweep_results.sqlite", help="ResultsStore of finished cells")
+parser.add_argument('--output-dir', default="results/walk_forward")
+args = parser.parse_args()
+
+if args.synthetic:
+    directory = os.path.join("data", "synthetic", f"{args.synthetic[0]}x{args.synthetic[1]}")
+    filepaths = write_yahoo_csvs(synthetic_frames(*args.synthetic), os.path.join(directory, "csv"))
+    store = PriceStore.load_or_build(os.path.join(directory, "store"), filepaths)
+else:
+    filepaths = {"SPY": args.spy}
+    for ticker in args.tickers:
+        ticker_filepath = os.path.join(args.data_dir, f"{ticker}.csv")
+        if os.path.exists(ticker_filepath):
+            filepaths[ticker] = ticker_filepath
+    store = PriceStore.load_or_build(os.path.join(args.data_dir, "price_store"), filepaths)
+panel = PricePanel.from_store(store)
+
+grid = [
+    dict(long_percentile=i / 16, momentum_window=j)
+    for i in range(1, 17)
+    for j in range(1, 21)
+]
+fixed_params = dict(total_window=args.total_window, num_stocks=args.num_stocks, initial_cash=args.initial_cash)
+folds_spec = dict(train_years=args.train_years, test_years=args.test_years, step_years=args.step_years,
+                  anchored=args.anchored)
+
+os.makedirs(os.path.dirname(args.results) or ".", exist_ok=True)
+with ResultsStore(args.results, panel.fingerprint()) as results_store:
+    result = walk_forward(panel, grid, folds_spec, fixed_params, objective=args.objective,
+                          workers=args.workers, cache_dir=args.cache_dir, store=results_store)
+
+summary = result.summary()
+pd.set_option('display.width', 200)
+print(summary.to_string(index=False))
+values = result.portfolio_values
+peak = np.maximum.accumulate(values)
+print(f"Out-of-sample: {len(summary)} folds, final value {values[-1]:,.2f}, max drawdown {((values - peak) / peak).min():.2%}")
+
+os.makedirs(args.output_dir, exist_ok=True)
+summary.to_csv(os.path.join(args.output_dir, "folds.csv"), index=False)
+pd.Series(values, index=pd.DatetimeIndex(result.dates), name="portfolio_value").to_csv(
+    os.path.join(args.output_dir, "out_of_sample.csv"), index_label="Date"
+)
+
+# Out-of-sample curve against the grid's best cell over the whole history
+# (in-sample), rebased to the first test date
+in_sample = result.in_sample
+in_sample_params = {name: in_sample["params"][name] for name in grid[0]}
+print(f"In-sample best: {in_sample_params}")
+in_sample_series = pd.Series(in_sample["portfolio_values"], index=pd.DatetimeIndex(in_sample["dates"]))
+in_sample_series = in_sample_series[in_sample_series.index >= pd.Timestamp(result.dates[0])]
+in_sample_series = in_sample_series / in_sample_series.iloc[0] * values[0]
+plt.figure(figsize=(12, 6))
+plt.plot(pd.DatetimeIndex(result.dates), values, label="Walk-forward (out-of-sample)")
+plt.plot(in_sample_series.index, in_sample_series.values, label="Best full-history parameters (in-sample)")
+plt.ylabel("Portfolio Value")
+plt.title(f"Walk-forward: {args.train_years}y train / {args.test_years}y test, objective {args.objective}")
+plt.legend()
+plt.grid()
+plt.savefig(os.path.join(args.output_dir, "walk_forward.png"))
+print(f"Saved folds, out-of-sample curve and plot to {args.output_dir}")
@@ -0,0 +1,95 @@
+import json
+import random
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the EODHD /eod endpoint, serving deterministic synthetic
+# bars so EODDownloader can be exercised without an API key or quota.
+# Usage: python -m src.scripts.stub_eod_server --port 8765 --fail-rate 0.2
+# then point EODDownloader(base_url="http://127.0.0.1:8765") at it.
+
+HISTORY_START = '1990-01-01'
+
+
+class StubEODHandler(BaseHTTPRequestHandler):
+    fail_rate = 0.0
+    throttle_rate = 0.0
+    missing = ()
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            type(self).requests += 1
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "eod":
+            return self.send_error(404)
+        ticker = parts[1]
+        if ticker in self.missing:
+            return self.send_error(404, "Ticker not found")
+        if random.random() < self.throttle_rate:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        if random.random() < self.fail_rate:
+            return self.send_error(500)
+
+        query = parse_qs(url.query)
+        body = json.dumps(synthetic_bars(ticker, query["from"][0], query["to"][0])).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def synthetic_bars(ticker, from_date, to_date):
+    """
+    Deterministic random walk bars for a ticker in the API's JSON layout. The
+    walk starts on a fixed date, so overlapping requests return the same bars.
+    """
+    dates = pd.bdate_range(HISTORY_START, to_date)
+    seed = sum(ticker.encode())
+    close = 50 * np.exp(np.cumsum(np.random.default_rng([seed, 0]).normal(0, 0.01, len(dates))))
+    volume = np.random.default_rng([seed, 1]).integers(10**5, 10**7, len(dates))
+    first = dates.searchsorted(pd.Timestamp(from_date))
+    return [
+        {
+            'date': date.strftime('%Y-%m-%d'), 'open': round(c, 4), 'high': round(c * 1.01, 4),
+            'low': round(c * 0.99, 4), 'close': round(c, 4), 'adjusted_close': round(c, 4), 'volume': int(v),
+        }
+        for date, c, v in zip(dates[first:], close[first:], volume[first:])
+    ]
+
+
+def make_server(port=0, fail_rate=0.0, throttle_rate=0.0, missing=()):
+    """
+    Returns a ThreadingHTTPServer on 127.0.0.1 (port 0 picks a free port);
+    run it with serve_forever(), e.g. in a daemon thread.
+    """
+    handler = type("Handler", (StubEODHandler,), dict(
+        fail_rate=fail_rate, throttle_rate=throttle_rate, missing=set(missing), requests=0,
+    ))
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--missing', nargs='*', default=[])
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.fail_rate, args.throttle_rate, args.missing)
+    print(f"Serving stub EOD API on http://127.0.0.1:{server.server_address[1]}")
+    server.serve_forever()
@@ -0,0 +1,143 @@
+import math
+import numpy as np
+import pandas as pd
+
+from src.regime import get_regime_estimator
+from src.bootstrap import path_statistics
+from src.factors import select_longs
+from src.engine import PanelFeatures, _cached
+
+SENSITIVITY_STATISTICS = ['final_value', 'max_drawdown', 'sharpe', 'in_market']
+
+
+class SensitivityResult:
+    """
+    Final value, max drawdown, Sharpe ratio and fraction of rebalances spent
+    in the market of every cell of a regime threshold grid, as arrays of
+    shape (hurst powers x hurst thresholds x p-value thresholds).
+    """
+    def __init__(self, hurst_powers, hurst_thresholds, pvalue_thresholds, final_value, max_drawdown, sharpe,
+                 in_market):
+        self.hurst_powers = list(hurst_powers)
+        self.hurst_thresholds = list(hurst_thresholds)
+        self.pvalue_thresholds = list(pvalue_thresholds)
+        self.final_value = final_value
+        self.max_drawdown = max_drawdown
+        self.sharpe = sharpe
+        self.in_market = in_market
+
+    def frame(self):
+        """
+        One row per cell.
+        """
+        index = pd.MultiIndex.from_product(
+            [self.hurst_powers, self.hurst_thresholds, self.pvalue_thresholds],
+            names=["hurst_power", "hurst_threshold", "pvalue_threshold"],
+        )
+        return pd.DataFrame(
+            {name: getattr(self, name).ravel() for name in SENSITIVITY_STATISTICS}, index=index
+        ).reset_index()
+
+    def surface(self, statistic, hurst_power=None):
+        """
+        statistic over the threshold grid of one Hurst power (the first by
+        default): one row per Hurst threshold, one column per p-value
+        threshold.
+        """
+        k = 0 if hurst_power is None else self.hurst_powers.index(hurst_power)
+        return pd.DataFrame(
+            getattr(self, statistic)[k],
+            index=pd.Index(self.hurst_thresholds, name="hurst_threshold"),
+            columns=pd.Index(self.pvalue_thresholds, name="pvalue_threshold"),
+        )
+
+
+def regime_sensitivity(panel, momentum_window, total_window, long_percentile, num_stocks, hurst_thresholds,
+                       pvalue_thresholds, hurst_powers=(8,), initial_cash=1000000, momentum_factor="rsi",
+                       cache=None, membership=None, regime_estimator="rs"):
+    """
+    Outcomes of the strategy for every (hurst_power, hurst_threshold,
+    pvalue_threshold) cell of a grid of regime filter settings, without a
+    backtest per cell.
+
+    The universe, factors and target weights of each rebalance do not depend
+    on the regime filter, so they are computed once, along with the return
+    of those weights, held as fractional shares, on every date up to the
+    next rebalance. The regime series is estimated once per Hurst power,
+    with regime_estimator (see src/regime.py).
+    A cell's equity curve then follows from its in-market mask alone: in
+    the market a rebalance period earns the return of its weights, in cash
+    it earns nothing.
+
+    Unlike run_momentum_backtest, positions are fractional, orders are not
+    margin checked and longs without volume on the rebalance bar are held
+    in cash instead of keeping their position, so a cell is close to, not
+    equal to, the backtest with the same thresholds. Curves cover the dates
+    recorded for the smallest Hurst power; larger powers hold cash through
+    their longer warm-up.
+    """
+    base_power = min(hurst_powers)
+    features = PanelFeatures(panel, momentum_window, total_window, momentum_factor, base_power, cache, membership,
+                             regime_estimator)
+    rebalance_rows = features.rebalance_rows
+    if len(rebalance_rows) == 0:
+        raise ValueError("The panel has no rebalance dates for these windows")
+    num_rebalances, num_feeds = len(rebalance_rows), features.close_now.shape[1]
+
+    # Target weights of every rebalance in the market
+    num_to_long = int(math.ceil(num_stocks * long_percentile))
+    weights = np.zeros((num_rebalances, num_feeds))
+    for i, row in enumerate(rebalance_rows):
+        universe = features.universe(i, num_stocks)
+        longs, long_weights = select_longs(features.factors[i][universe], num_to_long)
+        traded = features.volume_now[row, universe[longs]] > 0
+        weights[i, universe[longs][traded]] = long_weights[traded]
+
+    # Value of each recorded date relative to the last rebalance before it,
+    # holding that rebalance's weights
+    rows = np.flatnonzero(features.recorded)
+    bounds = np.append(np.searchsorted(rows, rebalance_rows, side='right'), len(rows))
+    period = np.searchsorted(rebalance_rows, rows, side='left') - 1
+    growth = np.ones(len(rows))
+    for i, row in enumerate(rebalance_rows):
+        held = weights[i] > 0
+        prices = features.close_now[rows[bounds[i]:bounds[i + 1]]][:, held]
+        growth[bounds[i]:bounds[i + 1]] = 1 - weights[i].sum() + prices / features.close_now[row, held] @ weights[i, held]
+    period_growth = np.append(growth[bounds[1:-1] - 1], 1.0)
+    started = period >= 0
+
+    hurst_thresholds = np.asarray(hurst_thresholds, dtype=float)
+    pvalue_thresholds = np.asarray(pvalue_thresholds, dtype=float)
+    spy_closes = panel.close[:, 0][~np.isnan(panel.close[:, 0])]
+    estimate_regime = get_regime_estimator(regime_estimator, base_power)
+    shape = (len(hurst_powers), len(hurst_thresholds), len(pvalue_thresholds))
+    statistics = {name: np.empty(shape) for name in SENSITIVITY_STATISTICS}
+    for k, power in enumerate(hurst_powers):
+        # Regime estimate of every rebalance over the closes before its bar
+        regime_hurst, _, regime_pvalue = _cached(
+            cache, "regime", panel.tickers[0], dict(power=power, estimator=regime_estimator), panel.fingerprints()[0],
+            lambda: estimate_regime(spy_closes, power)
+        )
+        spy_bars = features.bars[:, 0] - 1 - 2**power
+        estimated = (spy_bars >= 0) & (features.counters[rebalance_rows] > 2**power + 1)
+        hurst = np.where(estimated, regime_hurst[np.maximum(spy_bars, 0)], np.nan)
+        pvalue = np.where(estimated, regime_pvalue[np.maximum(spy_bars, 0)], np.nan)
+
+        in_market = (hurst > hurst_thresholds[:, None, None]) & (pvalue < pvalue_thresholds[None, :, None])
+        in_market = in_market.reshape(-1, num_rebalances)
+        # Value at each rebalance, then on every date of its period
+        level = np.cumprod(np.where(in_market, period_growth, 1.0), axis=1)
+        level = np.hstack([np.ones((len(in_market), 1)), level[:, :-1]])
+        curves = np.full((len(in_market), len(rows)), float(initial_cash))
+        curves[:, started] *= level[:, period[started]] * np.where(
+            in_market[:, period[started]], growth[started], 1.0
+        )
+
+        final_value, max_drawdown, sharpe = path_statistics(curves.T)
+        statistics["final_value"][k] = final_value.reshape(shape[1:])
+        statistics["max_drawdown"][k] = max_drawdown.reshape(shape[1:])
+        statistics["sharpe"][k] = sharpe.reshape(shape[1:])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            statistics["in_market"][k] = (in_market.sum(axis=1) / estimated.sum()).reshape(shape[1:])
+
+    return SensitivityResult(hurst_powers, hurst_thresholds.tolist(), pvalue_thresholds.tolist(), **statistics)
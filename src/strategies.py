@@ -1,22 +1,14 @@
 import os
 import math
-import logging
 import numpy as np
-import pandas as pd
-import pandas_ta as ta
 import backtrader as bt
-import scipy.stats as sps
-import statsmodels.api as sm
 
-logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/backtest_output.log'),
-    ]
-)
-
-logger = logging.getLogger(__name__)
+from src.regime import get_regime_estimator
+from src.universe import DollarVolumePanel
+from src.profiling import PhaseProfiler, format_report, write_report
+from src.ledger import TradeLedger, NullLedger
+from src.factors import FACTORS, select_longs
+from src.indicators import HurstRegime, StreamingRSI, StreamingMACD, MomentumFactor, PanelFactor
 
 class MomentumStrategy(bt.Strategy):
     params = (
@@ -24,6 +16,16 @@ class MomentumStrategy(bt.Strategy):
         ("total_window", 0),
         ("long_percentile", 0.0),
         ("num_stocks", 0),
+        ("momentum_factor", "rsi"),
+        ("hurst_threshold", 0.5),
+        ("pvalue_threshold", 0.05),
+        ("regime_estimator", "rs"),
+        ("hurst_power", 8),
+        ("membership", None),
+        ("ledger", False),
+        ("ledger_path", None),
+        ("profile", False),
+        ("profile_output", "logs/profile.json"),
         ("plot_only", False)
     )
     
@@ -33,70 +35,145 @@ class MomentumStrategy(bt.Strategy):
         self.current_positions = []
         self.portfolio_values = []
         self.dates = []
-        self.hursts = []
-        self.pvalues = []
         self.total_counter = 0
         self.prev_hurst = 0.5
         self.prev_pvalue = 0
 
-        # clear logs
-        if os.path.exists('logs/backtest_output.log'):
-            with open('logs/backtest_output.log', 'w'):
-                pass
+        # SPY regime filter, precomputed over the whole series with the
+        # regime_estimator of src/regime.py over 2**hurst_power + 1 closes.
+        # regime_bars records, for every recorded bar, the regime bar whose
+        # estimate is in effect (-1 before the first rebalance decision)
+        self.hurst_power = self.p.hurst_power
+        self.estimate_regime = get_regime_estimator(self.p.regime_estimator, self.hurst_power)
+        self.regime = HurstRegime(self.data.close, power=self.hurst_power, estimator=self.p.regime_estimator)
+        self.regime_bars = []
+        self._regime_bar = -1
+
+        # Per-feed momentum factor indicators, updated in O(1) per bar. Other
+        # factors registered in src/factors.py are computed in batch
+        factor_indicators = {
+            "rsi": lambda data: StreamingRSI(data.close, period=self.p.momentum_window),
+            "macd": lambda data: StreamingMACD(data.close),
+            "momentum": lambda data: MomentumFactor(data.close),
+        }
+        if self.p.momentum_factor not in FACTORS:
+            raise ValueError(f"Unknown momentum factor {self.p.momentum_factor}; expected one of {list(FACTORS)}")
+        make_indicator = factor_indicators.get(self.p.momentum_factor, lambda data: PanelFactor(
+            data.close, factor=self.p.momentum_factor,
+            momentum_window=self.p.momentum_window, total_window=self.p.total_window,
+        ))
+        self.factor_indicators = {data: make_indicator(data) for data in self.data_feeds}
+
+        # Rolling dollar volume and tradability of every feed for universe selection
+        self.universe_panel = DollarVolumePanel(len(self.data_feeds), self.p.total_window)
+        self.feed_names = [data._name for data in self.data_feeds]
+
+        # Structured event ledger, written only on request (ledger or
+        # ledger_path), one file per run (logs/ledger/ by default)
+        self.ledger = TradeLedger(self.p.ledger_path) if self.p.ledger or self.p.ledger_path else NullLedger()
+
+        self.profiler = None
+        if self.p.profile:
+            self._instrument()
+
+    def _instrument(self):
+        # Timed wrappers are bound as instance attributes over the hot path
+        # methods, so a run without profile calls the plain methods and pays
+        # nothing per bar. Time outside the timed phases is backtrader's own
+        # feed iteration, clock alignment and broker processing
+        profiler = self.profiler = PhaseProfiler()
+        self.next = profiler.wrap("next", self.next, samples=True)
+        self.prenext = profiler.wrap("next", self.prenext)
+        self.update_universe_panel = profiler.wrap("universe_update", self.update_universe_panel, parent="next")
+        self.rebalance_portfolio = profiler.wrap("rebalance", self.rebalance_portfolio, parent="next", samples=True)
+        self.universe_panel.top = profiler.wrap("universe_select", self.universe_panel.top, parent="rebalance")
+        self.compute_factors = profiler.wrap("factors", self.compute_factors, parent="rebalance")
+        self.order_target_percent = profiler.wrap("orders", self.order_target_percent, parent="next")
+        self.notify_order = profiler.wrap("notify_order", self.notify_order)
+        self.notify_trade = profiler.wrap("notify_trade", self.notify_trade)
+
+        # Indicators are advanced by the strategy before next, bar by bar
+        # (_next) or over the whole series at once (_once)
+        indicators = [("regime", self.regime)] + [("factor_indicators", ind) for ind in self.factor_indicators.values()]
+        for name, indicator in indicators:
+            indicator._next = profiler.wrap(name, indicator._next)
+            indicator._once = profiler.wrap(name, indicator._once)
+
+    def start(self):
+        if self.profiler is not None:
+            self.profiler.start()
+
+    def stop(self):
+        self.ledger.close()
+        if self.profiler is None:
+            return
+        self.profiler.stop()
+        report = self.profiler.report(
+            bars=len(self),
+            feed_bars=sum(len(data) for data in self.data_feeds),
+            untimed="feed_iteration",
+        )
+        print(format_report(report))
+        output_dir = os.path.dirname(self.p.profile_output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        write_report(report, self.p.profile_output)
+        print(f"Saved profile to {self.p.profile_output}")
+
+    @property
+    def hursts(self):
+        return self._regime_series(self.regime.lines.hurst, 0.5)
+
+    @property
+    def pvalues(self):
+        return self._regime_series(self.regime.lines.pvalue, 0)
+
+    def _regime_series(self, line, initial):
+        # Per-bar regime values held constant between rebalance bars
+        bars = np.asarray(self.regime_bars, dtype=int)
+        values = np.asarray(line.array)[np.maximum(bars, 0)]
+        return np.where(bars >= 0, values, initial)
         
+    def update_universe_panel(self):
+        feeds = self.data_feeds
+        self.universe_panel.update(
+            [len(data) for data in feeds],
+            [data.volume[0] if len(data) else 0 for data in feeds],
+            [data.close[0] if len(data) else 0 for data in feeds],
+        )
+
+    def prenext(self):
+        self.update_universe_panel()
+
     def next(self):
-        power = 8
-        num_values = 2**power + 1
+        self.update_universe_panel()
+        num_values = 2**self.hurst_power + 1
         
         # Check if there are enough data points
         if self.total_counter > num_values:
             self.portfolio_values.append(self.broker.getvalue())
             self.dates.append(self.data.datetime.date(0))  
-            # Use Backtrader's methods to get the most recent num_values
-            data_list = [self.data.close[i] for i in range(-num_values, 0)]  # Replace .close with the appropriate line if needed
-            
-            # Ensure compute_hurst_exponent handles the data_list correctly
-            hursts, tstats, pvalues = self.compute_hurst_exponent(data_list, power)
 
             if ((self.total_counter % self.p.momentum_window == 0) and (self.total_counter >= self.p.total_window)):
-                if hursts[0] > 0.5 and pvalues[0] < 0.05:
-                    logger.info("-----")
-                    logger.info("Rebalancing -- market is momentum driven.")
+                # Regime estimate over the num_values closes before this bar
+                hurst = self.regime.hurst[-1]
+                pvalue = self.regime.pvalue[-1]
+                momentum_driven = hurst > self.p.hurst_threshold and pvalue < self.p.pvalue_threshold
+                self.ledger.record("regime", date=self.datetime.date(0), hurst=hurst, pvalue=pvalue, momentum=momentum_driven)
+                if momentum_driven:
                     self.rebalance_portfolio()
                 else:
-                    logger.info("-----")
-                    logger.info("Staying in cash -- market is not momentum driven.")
+                    # Staying in cash -- market is not momentum driven
                     for data in self.data_feeds:
                         if self.getposition(data).size > 0:
                             self.order_target_percent(data, 0)
+                            self.ledger.record("target", date=self.datetime.date(0), ticker=data._name, weight=0, action="exit")
 
-                self.hursts.append(hursts[0])
-                self.pvalues.append(pvalues[0])
-                self.prev_hurst = hursts[0]
-                self.prev_pvalue = pvalues[0]
-            else: 
-                self.hursts.append(self.prev_hurst)
-                self.pvalues.append(self.prev_pvalue)
-
-            """ if hursts[0] > 0.5 and pvalues[0] < 0.05:
-                if ((self.total_counter % self.p.momentum_window == 0) and (self.total_counter >= self.p.total_window)):
-                    logger.info("-----")
-                    logger.info("Rebalancing -- market is momentum driven.")
-                    self.rebalance_portfolio()
+                self._regime_bar = len(self.data) - 2
+                self.prev_hurst = hurst
+                self.prev_pvalue = pvalue
 
-                    self.hursts.append(hursts[0])
-                    self.pvalues.append(pvalues[0])
-                    self.prev_hurst = hursts[0]
-                    self.prev_pvalue = pvalues[0]
-                else: 
-                    self.hursts.append(self.prev_hurst)
-                    self.pvalues.append(self.prev_pvalue)
-            else:
-                logger.info("-----")
-                logger.info("Staying in cash -- market is not momentum driven.")
-                for data in self.data_feeds:
-                    if self.getposition(data).size > 0:
-                        self.order_target_percent(data, 0) """
+            self.regime_bars.append(self._regime_bar)
                         
         self.total_counter += 1
 
@@ -105,62 +182,44 @@ class MomentumStrategy(bt.Strategy):
         if ((self.total_counter % self.p.momentum_window == 0) and (self.total_counter >= self.p.total_window)):
             current_datetime = self.datetime.datetime(0)
             
-            # Filter data feeds to remove stocks with volume == -1 
-            # for any date in the past total_window days. 
-            # This indicates that the stock was not tradeable
-            filtered_data_feeds = [data for data in self.data_feeds if all((data.volume[0 - i] > 0 and data.close[0 - i] > 0 )for i in range(self.p.total_window))]            
-            
-            # Sort data by dollar volume
-            dollar_volumes = {
-                data: sum(data.volume[0 - i] * data.close[0 - i] for i in range(self.p.total_window))
-                for data in filtered_data_feeds
-            }
-            sorted_by_dollar_volume = sorted(filtered_data_feeds, key=lambda data: dollar_volumes[data], reverse=True)
-            
-            # Construct the universe by selecting the top N stocks by dollar volume
-            data_universe = sorted_by_dollar_volume[:self.p.num_stocks]
+            # Construct the universe by selecting the top N stocks by dollar
+            # volume over the past total_window days, excluding stocks with
+            # volume or close <= 0 on any of those days. This indicates that
+            # the stock was not tradeable. With a membership index, only
+            # stocks that were index members on this date are considered
+            members = None
+            if self.p.membership is not None:
+                members = self.p.membership.member_mask([self.datetime.date(0)], self.feed_names)[0]
+            universe = self.universe_panel.top(self.p.num_stocks, members)
+            data_universe = [self.data_feeds[i] for i in universe]
             print(len(data_universe))
 
-            # Compute momentum for each stock in the universe
-            momentum_factors = {}
-            for data in data_universe:
-                momentum_factor = self.compute_rsi(data, self.p.momentum_window, self.p.total_window)
-                #momentum_factor = self.compute_macd(data)
-                momentum_factors[data] = momentum_factor
-                #print(f"Date: {current_datetime}, Stock: {data._name}, Dollar Volume: {dollar_volumes[data]:,.2f}, Volume: {data.volume[0]:,.2f}, Momentum Factor: {momentum_factors[data]:,.2f}")
-            
-            # Create list of top stocks ranked by momentum
-            sorted_by_momentum = sorted(data_universe, key=lambda data: momentum_factors[data], reverse=True)
-            
-            # Generate a list of stocks to long by selecting
-            # the top percentile of stocks sorted by momentum,
-            # excluding stocks with negative momentum factors
+            # Momentum factors of the universe, then the top long_percentile
+            # of them with positive factors, weighted by factor
+            momentum_factors = self.compute_factors(data_universe)
             num_stocks_to_long = int(math.ceil(self.p.num_stocks * self.p.long_percentile))
-            stocks_to_long = sorted_by_momentum[:num_stocks_to_long]
-            stocks_to_long = [data for data in stocks_to_long if momentum_factors[data] > 0]
+            longs, weights = select_longs(momentum_factors, num_stocks_to_long)
+            stocks_to_long = [data_universe[i] for i in longs]
+            target_percentages = dict(zip(stocks_to_long, weights.tolist()))
             print(len(stocks_to_long))
 
-            total_momentum = sum(momentum_factors[data] for data in stocks_to_long)
-            target_percentages = {}
-            for data in stocks_to_long:
-                if total_momentum > 0:
-                    target_percentages[data] = (momentum_factors[data] / total_momentum) * 0.9
-                else:
-                    target_percentages[data] = 0
-                    #target_percentages[data] = 0.16
-
             # Fetch current positions
             current_holdings = [data for data in self.data_feeds if self.getposition(data).size > 0]
-            logger.info("Current holdings:")
-            for data in current_holdings:
-                logger.info(f"{data._name}")
+            current_date = current_datetime.date()
+            self.ledger.record(
+                "rebalance",
+                date=current_date,
+                universe=[data._name for data in data_universe],
+                holdings=[data._name for data in current_holdings],
+                factors=dict(zip((data._name for data in data_universe), momentum_factors.tolist())),
+            )
             
             # Sell any stocks which are currently being held
             # but are not in the stocks_to_long list
             for data in current_holdings:
                 if data not in stocks_to_long:
                     self.order_target_percent(data, 0)
-                    logger.info(f"Selling {data._name}: {data._name} is no longer high momentum.")
+                    self.ledger.record("target", date=current_date, ticker=data._name, weight=0, action="sell")
             
             if len(stocks_to_long) > 0:
                 # Rebalance all stocks in the stocks_to_long list
@@ -169,194 +228,103 @@ class MomentumStrategy(bt.Strategy):
                         target_percent = target_percentages[data]
                         if data in current_holdings:
                             self.order_target_percent(data, target_percent)
-                            logger.info(f"Rebalancing {data._name}: {data._name} is still high momentum. New target: {target_percent:.2%}")
+                            self.ledger.record("target", date=current_date, ticker=data._name, weight=target_percent, action="rebalance")
                 
                 for data in stocks_to_long: 
                     if data.volume[0] > 0: 
                         target_percent = target_percentages[data]
                         if data not in current_holdings: 
                             self.order_target_percent(data, target_percent)
-                            logger.info(f"Buying {data._name}: {data._name} became high momentum. Target: {target_percent:.2%}")
-            
-            logger.info(f"{current_datetime} - Finished rebalancing. ")
-            logger.info("-----")
+                            self.ledger.record("target", date=current_date, ticker=data._name, weight=target_percent, action="buy")
 
     def notify_order(self, order):
         if order.status in [order.Completed]:
-            if order.isbuy():
-                logger.info(f"BUY EXECUTED: {order.data._name}, Price: {order.executed.price}, Cost: {order.executed.value}, Size: {order.executed.size}")
-            elif order.issell():
-                logger.info(f"SELL EXECUTED: {order.data._name}, Price: {order.executed.price}, Cost: {order.executed.value}, Size: {order.executed.size}")
-        elif order.status == order.Canceled:
-            logger.warning(f"Order Failed: {order.data._name}. Order was canceled.")
-        elif order.status == order.Margin:
-            logger.warning(f"Order Failed: {order.data._name}. Order was margin.")
-        elif order.status == order.Rejected:
-            logger.warning(f"Order Failed: {order.data._name}. Order was rejected.")
+            self.ledger.record(
+                "fill",
+                date=bt.num2date(order.executed.dt).date(),
+                ticker=order.data._name,
+                side="buy" if order.isbuy() else "sell",
+                price=order.executed.price,
+                value=order.executed.value,
+                size=order.executed.size,
+                commission=order.executed.comm,
+            )
+        elif order.status in [order.Canceled, order.Margin, order.Rejected]:
+            self.ledger.record("order_failed", date=self.datetime.date(0), ticker=order.data._name, status=order.getstatusname())
 
         return order
 
     def notify_trade(self, trade):
         if trade.isclosed:
-            logger.info(f"OPERATION PROFIT: {trade.data._name}, Gross: {trade.pnl}, Net: {trade.pnlcomm}")
+            self.ledger.record(
+                "trade",
+                date=self.datetime.date(0),
+                ticker=trade.data._name,
+                pnl=trade.pnl,
+                pnlcomm=trade.pnlcomm,
+                bars=trade.barlen,
+            )
 
         return trade
     
     def compute_hurst_exponent(self, data, power):
-        n = 2**power
-        # Compute returns
-        prices = np.array(data)[1:]
-        returns = prices / np.array(data)[:-1] - 1
-        # Initialize empty arrays
-        hursts = np.array([])
-        tstats = np.array([])
-        pvalues = np.array([])
-        # Start sliding the rolling window from n to the end of array
-        # (need to wait for n values to compute the first hurst exponent value)
-        for t in np.arange(n, len(returns) + 1):
-            # Rolling window sample
-            data = returns[t-n:t]
-            # Generate list of powers of two
-            X = np.arange(2, power + 1)
-            # Initialize empty array for mean adjusted series
-            Y = np.array([])
-            # Iterate through list of powers of two
-            for p in X:
-                # Indexing for window subdivisions
-                m = 2**p
-                s = 2**(power - p)
-                rs_array = np.array([])
-                for i in np.arange(0, s):
-                    # Subsample window (depends on m which depends on the power p)
-                    subsample = data[i*m:(i+1)*m]
-                    # Compute mean
-                    mean = np.average(subsample)
-                    deviate = np.cumsum(subsample - mean)
-                    difference = max(deviate) - min(deviate)
-                    stdev = np.std(subsample)
-                    rescaled_range = difference / stdev
-                    rs_array = np.append(rs_array, rescaled_range)
-                Y = np.append(Y, np.log2(np.average(rs_array)))
-            reg = sm.OLS(Y, sm.add_constant(X))
-            res = reg.fit()
-            hurst = res.params[1]
-            tstat = (res.params[1] - 0.5) / res.bse[1]
-            pvalue = 2 * (1 - sps.t.cdf(abs(tstat), res.df_resid))
-            hursts = np.append(hursts, hurst)
-            tstats = np.append(tstats, tstat)
-            pvalues = np.append(pvalues, pvalue)
-        
-        return hursts, tstats, pvalues
+        # Rolling Hurst exponent, t-stat and p-value of the regime_estimator
+        # for every 2**power + 1 price window in data (see src/regime.py)
+        return self.estimate_regime(data, power)
             
         
+    def compute_factors(self, feeds):
+        # Current momentum factor of every feed in feeds, as an array, read
+        # from the per-feed factor indicators
+        indicators = [self.factor_indicators[data] for data in feeds]
+        if self.p.momentum_factor == "rsi":
+            values = [100 - indicator.rsi[0] for indicator in indicators]
+        elif self.p.momentum_factor == "macd":
+            values = [indicator.histo[0] if indicator.signal[0] == indicator.signal[0] else 0 for indicator in indicators]
+        elif self.p.momentum_factor == "momentum":
+            values = [indicator.momentum[0] for indicator in indicators]
+        else:
+            values = [indicator.factor[0] for indicator in indicators]
+        return np.array(values, dtype=float)
+
     def compute_momentum(self, data, momentum_window, total_window):
-        # Convert Backtrader data feed to pandas DataFrame
-        df = pd.DataFrame({
-            'close': data.close.get(size=len(data)),
-            'datetime': data.datetime.datetime()
-        })
-        df.set_index('datetime', inplace=True)
-        df.sort_index(inplace=True)
-
-        if len(df) < total_window:
+        # Streaming momentum factor maintained per feed (see MomentumFactor)
+        if len(data) < total_window:
             print(f"Length of data must be at least {total_window}")
             return 0
 
-        # End of date range
-        now = df.index[-1]
-
-        total_window_start = df.index[-total_window]
-        momentum_window_start = df.index[-momentum_window]
-
-        # Get price change up to before the momentum window
-        df_past_total_window = df[(df.index >= total_window_start) & (df.index < momentum_window_start)]
-        if len(df_past_total_window) > 0:
-            price_change_total_window = (df_past_total_window['close'].iloc[-1] - df_past_total_window['close'].iloc[0]) / df_past_total_window['close'].iloc[0]
-        else:
-            price_change_total_window = 0
-
-        df_past_momentum_window = df[(df.index >= momentum_window_start) & (df.index <= now)]
-        if len(df_past_momentum_window) > 0:
-            price_change_momentum_window = (df_past_momentum_window['close'].iloc[-1] - df_past_momentum_window['close'].iloc[0]) / df_past_momentum_window['close'].iloc[0]
-        else:
-            price_change_momentum_window = 0
-        
-        # Calculate daily returns and standard deviation over the total window
-        df_last_total_window = df[df.index >= total_window_start]
-        df_last_total_window['Daily_Return'] = df_last_total_window['close'].pct_change()
-        std_dev = df_last_total_window['Daily_Return'].std()
-
-        # Compute momentum factor
-        if std_dev != 0:
-            momentum_factor = (price_change_total_window - price_change_momentum_window) / std_dev
-        else:
-            momentum_factor = 0
-
-        return momentum_factor
+        return self._factor_indicator(data, 'momentum').momentum[0]
     
     def compute_rsi(self, data, rsi_window, total_window):
-        # Convert Backtrader data feed to pandas DataFrame
-        df = pd.DataFrame({
-            'close': data.close.get(size=len(data)),
-            'datetime': data.datetime.datetime()
-        })
-        df.set_index('datetime', inplace=True)
-        df.sort_index(inplace=True)
-
-        if len(df) < total_window:
+        # Streaming RSI maintained per feed (see StreamingRSI)
+        if len(data) < total_window:
             print(f"Length of data must be at least {total_window}")
             return 0
 
-        # End of date range
-        now = df.index[-1]
-
-        total_window_start = df.index[-total_window]
-        rsi_window_start = df.index[-rsi_window]
-
-        # Calculate RSI
-        df_last_total_window = df[df.index >= total_window_start]
-        df_last_total_window['RSI'] = ta.rsi(df_last_total_window['close'], length=rsi_window)
-
         # Ensure RSI values are computed
-        if df_last_total_window['RSI'].isnull().all():
+        if len(data) - 1 < rsi_window:
             print(f"Not enough data to compute RSI")
             return 0
 
-        # Compute RSI value for the most recent date
-        latest_rsi = df_last_total_window['RSI'].iloc[-1]
-        
-        # Return 100 - RSI
-        return 100 - latest_rsi
+        # Return 100 - RSI for the most recent date
+        return 100 - self._factor_indicator(data, 'rsi').rsi[0]
     
     def compute_macd(self, data, fast=12, slow=26, signal=9, total_window=None):
-        # Convert Backtrader data feed to pandas DataFrame
-        df = pd.DataFrame({
-            'close': data.close.get(size=len(data)),
-            'datetime': data.datetime.datetime()
-        })
-        df.set_index('datetime', inplace=True)
-        df.sort_index(inplace=True)
-
-        if total_window is not None and len(df) < total_window:
+        # Streaming MACD maintained per feed (see StreamingMACD)
+        if total_window is not None and len(data) < total_window:
             print(f"Length of data must be at least {total_window}")
             return 0
 
-        # Calculate MACD
-        macd = ta.macd(df['close'], fast=fast, slow=slow, signal=signal)
-        
         # Ensure MACD values are computed
-        if macd['MACD_12_26_9'].isnull().all() or macd['MACDs_12_26_9'].isnull().all():
+        macd = self._factor_indicator(data, 'macd')
+        if math.isnan(macd.signal[0]):
             print(f"Not enough data to compute MACD")
             return 0
 
-        # Compute MACD histogram (MACD line - Signal line)
-        macd['MACD_hist'] = macd['MACD_12_26_9'] - macd['MACDs_12_26_9']
-
-        # If total_window is specified, only consider the last total_window periods
-        if total_window is not None:
-            macd = macd.iloc[-total_window:]
-
-        # Compute momentum factor based on MACD histogram
-        momentum_factor = macd['MACD_hist'].iloc[-1]
+        # Compute momentum factor based on MACD histogram (MACD line - Signal line)
+        return macd.histo[0]
 
-        return momentum_factor
\ No newline at end of file
+    def _factor_indicator(self, data, factor):
+        if factor != self.p.momentum_factor:
+            raise ValueError(f"{factor} indicators are not built; run with momentum_factor='{factor}'")
+        return self.factor_indicators[data]
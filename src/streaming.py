@@ -0,0 +1,302 @@
+import os
+import math
+import numpy as np
+
+from src.regime import get_regime_estimator
+from src.panel import adjust_yahoo
+from src.universe import DollarVolumePanel
+from src.engine import BacktestResult, _fill_orders, _position_value, _rebalance_orders
+
+
+def store_chunks(store, tickers=None, chunk_size=65536, start=0, stop=None):
+    """
+    Generator of (dates, close, volume) row chunks of a PriceStore, adjusted
+    the way PricePanel.from_store adjusts them. Only chunk_size rows are
+    read and held at a time, and the fields are memory-mapped afresh for
+    every chunk so the pages of chunks already streamed are released.
+    tickers defaults to every ticker in the store.
+    """
+    tickers = store.tickers if tickers is None else list(tickers)
+    columns = [store.ticker_index[ticker] for ticker in tickers]
+    stop = len(store.dates) if stop is None else min(stop, len(store.dates))
+    for first in range(start, stop, chunk_size):
+        rows = slice(first, min(first + chunk_size, stop))
+        close, adj_close, volume = (
+            np.load(os.path.join(store.directory, f"{name}.npy"), mmap_mode="r")[rows, columns]
+            for name in ('close', 'adj_close', 'volume')
+        )
+        chunk_close, chunk_volume = adjust_yahoo(close, adj_close, volume)
+        yield np.array(store.dates[rows]), chunk_close, chunk_volume
+
+
+def iter_bars(chunks):
+    """
+    Generator of (date, close, volume) rows from (dates, close, volume) chunks.
+    """
+    for dates, close, volume in chunks:
+        for i in range(len(dates)):
+            yield dates[i], close[i], volume[i]
+
+
+class RingBuffer:
+    """
+    The last `size` values appended to a 1-d series.
+    """
+    def __init__(self, size):
+        self.values = np.zeros(size)
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+
+    def last(self, n):
+        """
+        The last n values in order, n at most size.
+        """
+        end = self.count % len(self.values)
+        return np.roll(self.values, -end)[len(self.values) - n:]
+
+
+class SpillArray:
+    """
+    Append-only 1-d array that holds at most buffer_size values in memory and
+    spills the rest to a raw file. close() returns the values as a read-only
+    memory map of that file.
+    """
+    def __init__(self, filepath, dtype, buffer_size=65536):
+        self.filepath = filepath
+        self.dtype = np.dtype(dtype)
+        self._buffer = np.empty(buffer_size, dtype=self.dtype)
+        self._count = 0
+        self._spilled = 0
+        self._file = open(filepath, "wb")
+
+    def __len__(self):
+        return self._spilled + self._count
+
+    def append(self, value):
+        self._buffer[self._count] = value
+        self._count += 1
+        if self._count == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        self._file.write(self._buffer[:self._count].tobytes())
+        self._spilled += self._count
+        self._count = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        if self._spilled == 0:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(self.filepath, dtype=self.dtype, mode="r", shape=(self._spilled,))
+
+
+class _RSIState:
+    # 100 - RSI of every feed (see rsi_factor), from decayed sums of gains
+    # and losses
+    def __init__(self, num_feeds, momentum_window, total_window):
+        self.momentum_window = momentum_window
+        self.total_window = total_window
+        self.decay = 1.0 - 1.0 / momentum_window
+        self.previous = np.zeros(num_feeds)
+        self.gain = np.zeros(num_feeds)
+        self.loss = np.zeros(num_feeds)
+
+    def update(self, feeds, closes, bars):
+        changes = np.where(bars > 0, closes - self.previous[feeds], 0.0)
+        self.gain[feeds] = self.gain[feeds] * self.decay + np.maximum(changes, 0)
+        self.loss[feeds] = self.loss[feeds] * self.decay + np.maximum(-changes, 0)
+        self.previous[feeds] = closes
+
+    def values(self, bars):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = 100 - 100 * self.gain / (self.gain + self.loss)
+        return np.where((bars + 1 < self.total_window) | (bars < self.momentum_window), 0, factor)
+
+
+class _MomentumState:
+    # Momentum factor of every feed (see momentum_factor), from running sums
+    # of returns and squared returns
+    def __init__(self, num_feeds, momentum_window, total_window):
+        self.total_window = total_window
+        self.first = np.zeros(num_feeds)
+        self.previous = np.zeros(num_feeds)
+        self.total = np.zeros(num_feeds)
+        self.total_sq = np.zeros(num_feeds)
+
+    def update(self, feeds, closes, bars):
+        started = bars > 0
+        returns = np.where(started, closes / np.where(started, self.previous[feeds], 1) - 1, 0.0)
+        self.first[feeds] = np.where(started, self.first[feeds], closes)
+        self.total[feeds] += returns
+        self.total_sq[feeds] += returns * returns
+        self.previous[feeds] = closes
+
+    def values(self, bars):
+        count = bars.astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = (self.total_sq - self.total * self.total / count) / (count - 1)
+            std_dev = np.where(count > 1, np.sqrt(np.maximum(variance, 0)), np.nan)
+            factor = np.where(std_dev != 0, -(self.previous - self.first) / self.first / std_dev, 0)
+        return np.where(bars + 1 < self.total_window, 0, factor)
+
+
+class _SeededEMAState:
+    # Per-feed EMA seeded with the mean of each feed's first `seed` values
+    # (see src/factors.py); NaN until seeded
+    def __init__(self, num_feeds, length, seed=None):
+        self.seed = length if seed is None else seed
+        self.alpha = 2.0 / (length + 1)
+        self.count = np.zeros(num_feeds, dtype=np.int64)
+        self.seed_values = np.zeros((num_feeds, self.seed))
+        self.value = np.full(num_feeds, np.nan)
+
+    def update(self, feeds, values):
+        count = self.count[feeds]
+        seeding = count < self.seed
+        self.seed_values[feeds[seeding], count[seeding]] = values[seeding]
+        seeded = feeds[~seeding]
+        self.value[seeded] = self.alpha * values[~seeding] + (1 - self.alpha) * self.value[seeded]
+        for k in feeds[count == self.seed - 1]:
+            self.value[k] = np.mean(self.seed_values[k])
+        self.count[feeds] += 1
+
+
+class _MACDState:
+    # MACD histogram of every feed (see macd_factor)
+    def __init__(self, num_feeds, momentum_window, total_window, fast=12, slow=26, signal=9):
+        fast, slow = sorted((fast, slow))
+        self.fast = _SeededEMAState(num_feeds, fast)
+        self.slow = _SeededEMAState(num_feeds, slow)
+        self.signal = _SeededEMAState(num_feeds, signal, seed=1)
+        self.histo = np.zeros(num_feeds)
+
+    def update(self, feeds, closes, bars):
+        self.fast.update(feeds, closes)
+        self.slow.update(feeds, closes)
+        macd = self.fast.value[feeds] - self.slow.value[feeds]
+        valid = ~np.isnan(macd)
+        self.signal.update(feeds[valid], macd[valid])
+        histo = macd - self.signal.value[feeds]
+        self.histo[feeds] = np.where(np.isnan(histo), 0, histo)
+
+    def values(self, bars):
+        return self.histo
+
+
+STREAMING_FACTORS = {
+    "rsi": _RSIState,
+    "macd": _MACDState,
+    "momentum": _MomentumState,
+}
+
+
+def run_streaming_backtest(chunks, tickers, output_dir, momentum_window, total_window, long_percentile,
+                           num_stocks, initial_cash=1000000, momentum_factor="rsi", hurst_power=8,
+                           membership=None, buffer_size=65536, regime_estimator="rs", hurst_threshold=0.5,
+                           pvalue_threshold=0.05):
+    """
+    Runs the MomentumStrategy rules of run_momentum_backtest on a stream of
+    (dates, close, volume) row chunks (see store_chunks) with memory that
+    does not grow with the length of the history, so hourly or minute bars
+    of a large universe can be backtested out of core. Windows are counted
+    in bars, whatever their size.
+
+    Instead of whole-history feature arrays, every feed keeps O(1) factor
+    state and a total_window ring of dollar volumes (DollarVolumePanel), and
+    the regime series keeps a ring of its last 2**hurst_power + 1 closes
+    for the regime_estimator (see src/regime.py).
+    The recorded portfolio values, dates, Hurst exponents and p-values are
+    spilled to raw files in output_dir as they are produced and returned as
+    memory maps.
+
+    Outputs match run_momentum_backtest on the same bars up to floating
+    point rounding of the running sums.
+    """
+    if momentum_factor not in STREAMING_FACTORS:
+        raise ValueError(f"No streaming state for factor {momentum_factor}; expected one of {list(STREAMING_FACTORS)}")
+    os.makedirs(output_dir, exist_ok=True)
+    estimate_regime = get_regime_estimator(regime_estimator, hurst_power)
+    num_feeds = len(tickers)
+    num_values = 2**hurst_power + 1
+    num_to_long = int(math.ceil(num_stocks * long_percentile))
+
+    lengths = np.zeros(num_feeds, dtype=np.int64)
+    factor_lengths = np.zeros(num_feeds, dtype=np.int64)
+    close_now = np.full(num_feeds, np.nan)
+    volume_now = np.full(num_feeds, np.nan)
+    factors = STREAMING_FACTORS[momentum_factor](num_feeds, momentum_window, total_window)
+    universe_panel = DollarVolumePanel(num_feeds, total_window)
+    regime_closes = RingBuffer(num_values + 1)
+    regime_date = None
+
+    cash = float(initial_cash)
+    position = np.zeros(num_feeds)
+    pending = []
+    counter = -1
+    hurst, pvalue = 0.5, 0.0
+    outputs = None
+
+    for date, close, volume in iter_bars(chunks):
+        if outputs is None:
+            outputs = {
+                "portfolio_values": SpillArray(os.path.join(output_dir, "portfolio_values.f8"), float, buffer_size),
+                "dates": SpillArray(os.path.join(output_dir, "dates.m8"), np.asarray(date).dtype, buffer_size),
+                "hursts": SpillArray(os.path.join(output_dir, "hursts.f8"), float, buffer_size),
+                "pvalues": SpillArray(os.path.join(output_dir, "pvalues.f8"), float, buffer_size),
+            }
+
+        # Per-feed state of every feed with a bar on this date
+        feeds = np.flatnonzero(~np.isnan(close))
+        if len(feeds):
+            lengths[feeds] += 1
+            close_now[feeds] = close[feeds]
+            volume_now[feeds] = volume[feeds]
+            # Factors skip non-tradeable sentinel bars (see factor_panel)
+            valid = feeds[close[feeds] > 0]
+            factor_lengths[valid] += 1
+            factors.update(valid, close[valid], factor_lengths[valid] - 1)
+            universe_panel.update(lengths.copy(), volume_now, close_now)
+            if feeds[0] == 0:
+                regime_closes.append(close[0])
+                regime_date = date
+
+        # Orders submitted on the previous bar fill on this one
+        if pending:
+            cash, position = _fill_orders(pending, cash, position)
+            pending = []
+
+        # Strategy next() runs once every feed has delivered a bar
+        if lengths.min() < 1:
+            continue
+        counter += 1
+        if counter <= num_values:
+            continue
+        value = cash + _position_value(position, close_now)
+
+        if counter % momentum_window == 0 and counter >= total_window:
+            # Regime estimate over the closes before this bar
+            if regime_closes.count > num_values:
+                window = regime_closes.last(num_values + 1)[:-1]
+                hurst, _, pvalue = (float(estimate[0]) for estimate in estimate_regime(window, hurst_power))
+            else:
+                hurst, pvalue = np.nan, np.nan
+            members = membership.member_mask([date], tickers)[0] if membership is not None else None
+            pending = _rebalance_orders(
+                hurst, pvalue, position, value, close_now, volume_now,
+                factors.values(factor_lengths - 1), universe_panel.top(num_stocks, members), num_to_long,
+                hurst_threshold, pvalue_threshold,
+            )
+
+        outputs["portfolio_values"].append(value)
+        outputs["dates"].append(regime_date)
+        outputs["hursts"].append(hurst)
+        outputs["pvalues"].append(pvalue)
+
+    if outputs is None:
+        return BacktestResult(np.empty(0), np.empty(0, dtype='datetime64[D]'), np.empty(0), np.empty(0))
+    return BacktestResult(**{name: spill.close() for name, spill in outputs.items()})
+
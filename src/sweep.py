@@ -0,0 +1,159 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.panel import PricePanel
+from src.cache import FeatureCache
+from src.engine import run_momentum_backtest
+from src.results_store import params_key
+
+
+class SharedPanel:
+    """
+    Writes a PricePanel's arrays to .npy files in a temporary directory so
+    worker processes can memory-map them read-only instead of receiving a
+    pickled copy. Use as a context manager; the files are removed on exit.
+    """
+    def __init__(self, panel, directory=None):
+        self.directory = tempfile.mkdtemp(prefix="panel_", dir=directory)
+        np.save(os.path.join(self.directory, "dates.npy"), panel.dates)
+        np.save(os.path.join(self.directory, "close.npy"), panel.close)
+        np.save(os.path.join(self.directory, "volume.npy"), panel.volume)
+        with open(os.path.join(self.directory, "tickers.txt"), "w") as f:
+            f.write("\n".join(panel.tickers))
+
+    @staticmethod
+    def load(directory):
+        """
+        Memory-maps the panel stored in directory.
+        """
+        with open(os.path.join(directory, "tickers.txt")) as f:
+            tickers = f.read().split("\n")
+        return PricePanel(
+            np.load(os.path.join(directory, "dates.npy")),
+            tickers,
+            np.load(os.path.join(directory, "close.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "volume.npy"), mmap_mode="r"),
+        )
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_sweep(panel, grid, fixed_params=None, workers=None, cache_dir=None, store=None):
+    """
+    Runs the NumPy engine for every parameter set in grid (a list of dicts,
+    merged with fixed_params) across a pool of worker processes that share
+    the panel through memory-mapped files.
+
+    Each worker keeps a FeatureCache so features that do not depend on the
+    swept parameters are computed once; with cache_dir the cache also has a
+    disk tier shared by all workers and later sweeps.
+
+    With store, a ResultsStore, every result is saved as soon as it
+    arrives and cells already in the store are skipped, so an interrupted
+    sweep resumes where it stopped.
+
+    Yields one result dict per cell run as soon as it finishes, in
+    completion order: index (position in grid), params, max_drawdown,
+    final_value, sharpe, annual_return, annual_volatility, terminated
+    (see run_momentum_backtest's stop_drawdown), portfolio_values, dates,
+    hursts and pvalues.
+    """
+    fixed_params = fixed_params or {}
+    workers = workers or os.cpu_count()
+    cells = [(index, dict(fixed_params, **params)) for index, params in enumerate(grid)]
+    if store is not None:
+        completed = store.completed()
+        pending = [(index, params) for index, params in cells if params_key(params) not in completed]
+        if len(pending) < len(cells):
+            print(f"Skipping {len(cells) - len(pending)} cells already in {store.filepath}")
+        cells = pending
+    if not cells:
+        return
+
+    for cell in _run_cells(panel, cells, workers, cache_dir):
+        if store is not None:
+            store.save(cell)
+        yield cell
+
+
+def _run_cells(panel, cells, workers, cache_dir):
+    if workers == 1:
+        cache = FeatureCache(cache_dir)
+        for index, params in cells:
+            yield _run_cell(panel, cache, index, params)
+        return
+
+    with SharedPanel(panel) as shared:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.directory, cache_dir)) as executor:
+            futures = [executor.submit(_run_worker_cell, index, params) for index, params in cells]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+_worker_panel = None
+_worker_cache = None
+
+
+def _init_worker(directory, cache_dir):
+    global _worker_panel, _worker_cache
+    _worker_panel = SharedPanel.load(directory)
+    _worker_cache = FeatureCache(cache_dir)
+
+
+def _run_worker_cell(index, params):
+    return _run_cell(_worker_panel, _worker_cache, index, params)
+
+
+def _run_cell(panel, cache, index, params):
+    result = run_momentum_backtest(panel, cache=cache, **params)
+    values = np.asarray(result.portfolio_values)
+    annual_return, annual_volatility, sharpe = return_statistics(values)
+    return {
+        "index": index,
+        "params": params,
+        "max_drawdown": max_drawdown(values),
+        "final_value": values[-1] if len(values) else np.nan,
+        "sharpe": sharpe,
+        "annual_return": annual_return,
+        "annual_volatility": annual_volatility,
+        "terminated": result.terminated,
+        "portfolio_values": values,
+        "dates": result.dates,
+        "hursts": result.hursts,
+        "pvalues": result.pvalues,
+    }
+
+
+def max_drawdown(values):
+    """
+    Most negative drawdown of an equity curve (see calculate_drawdown).
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.nan
+    peak = np.maximum.accumulate(values)
+    return ((values - peak) / peak).min()
+
+
+def return_statistics(values, periods_per_year=252):
+    """
+    Annualized mean daily return, annualized volatility and Sharpe ratio
+    (zero risk-free rate) of an equity curve.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) < 3:
+        return np.nan, np.nan, np.nan
+    returns = np.diff(values) / values[:-1]
+    mean, std = returns.mean() * periods_per_year, returns.std(ddof=1) * np.sqrt(periods_per_year)
+    return mean, std, mean / std if std > 0 else np.nan
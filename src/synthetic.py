@@ -0,0 +1,107 @@
+import os
+import numpy as np
+import pandas as pd
+
+
+def synthetic_frames(num_tickers, years, seed=0, start='2000-01-03'):
+    """
+    Deterministic synthetic daily bars for SPY plus num_tickers tickers, as
+    Yahoo style DataFrames (ticker -> DataFrame indexed by Date). Prices are
+    geometric random walks with a common market factor. Some tickers list
+    after the start date and a few have short runs of zero volume, so the
+    panels exercise the same code paths as real data.
+    """
+    dates = pd.bdate_range(start, periods=int(years * 252), name='Date')
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0003, 0.01, len(dates))
+
+    frames = {}
+    for k in range(num_tickers + 1):
+        ticker = "SPY" if k == 0 else f"S{k:04d}"
+        beta = 1.0 if k == 0 else rng.uniform(0.5, 1.5)
+        noise = 0.0 if k == 0 else rng.uniform(0.005, 0.02)
+        returns = beta * market + rng.normal(0, noise, len(dates))
+        close = rng.uniform(20, 200) * np.exp(np.cumsum(returns))
+        spread = np.abs(rng.normal(0, 0.005, len(dates)))
+        volume = np.round(rng.lognormal(13, 1, len(dates)))
+
+        # A quarter of the tickers list during the first half of the period
+        first = 0 if k == 0 or rng.random() < 0.75 else int(rng.integers(1, len(dates) // 2))
+        if k and rng.random() < 0.05:
+            gap = int(rng.integers(first, len(dates) - 5))
+            volume[gap:gap + int(rng.integers(1, 5))] = 0
+
+        adjustment = np.exp(-rng.uniform(0, 0.0001) * np.arange(len(dates))[::-1])
+        frames[ticker] = pd.DataFrame({
+            'Open': np.round(close * (1 + rng.normal(0, 0.003, len(dates))), 4),
+            'High': np.round(close * (1 + spread), 4),
+            'Low': np.round(close * (1 - spread), 4),
+            'Close': np.round(close, 4),
+            'Adj Close': np.round(close * adjustment, 4),
+            'Volume': volume,
+        }, index=dates)[first:]
+    return frames
+
+
+def write_yahoo_csvs(frames, directory):
+    """
+    Writes one Yahoo style CSV per ticker and returns the ticker -> path dict
+    PricePanel.from_csv and PriceStore.from_csv take.
+    """
+    os.makedirs(directory, exist_ok=True)
+    filepaths = {}
+    for ticker, data in frames.items():
+        filepaths[ticker] = os.path.join(directory, f"{ticker}.csv")
+        data.to_csv(filepaths[ticker])
+    return filepaths
+
+
+def synthetic_bar_chunks(num_tickers, num_bars, chunk_size=65536, seed=0, start='2000-01-03',
+                         bars_per_day=390):
+    """
+    Deterministic synthetic intraday bars for SPY plus num_tickers tickers,
+    generated chunk_size bars at a time so histories larger than memory can
+    be written with PriceStore.write_chunks. Yields (timestamps, fields)
+    chunks; bars are one minute apart from 09:30 on business days. As in
+    synthetic_frames, prices share a market factor, some tickers list late
+    and a few have runs of zero volume.
+    """
+    rng = np.random.default_rng(seed)
+    num_feeds = num_tickers + 1
+    beta = np.concatenate([[1.0], rng.uniform(0.5, 1.5, num_tickers)])
+    noise = np.concatenate([[0.0], rng.uniform(0.0005, 0.002, num_tickers)])
+    first = np.where(rng.random(num_feeds) < 0.75, 0, rng.integers(1, max(num_bars // 2, 2), num_feeds))
+    first[0] = 0
+    log_close = np.log(rng.uniform(20, 200, num_feeds))
+    open_time = np.timedelta64(9 * 60 + 30, 'm')
+
+    for begin in range(0, num_bars, chunk_size):
+        bars = np.arange(begin, min(begin + chunk_size, num_bars))
+        days = np.busday_offset(np.datetime64(start, 'D'), bars // bars_per_day, roll='forward')
+        timestamps = days + open_time + (bars % bars_per_day).astype('timedelta64[m]')
+
+        market = rng.normal(0.000003, 0.001, len(bars))
+        returns = beta * market[:, None] + rng.normal(0, 1, (len(bars), num_feeds)) * noise
+        close = np.exp(log_close + np.cumsum(returns, axis=0))
+        log_close = np.log(close[-1])
+        spread = np.abs(rng.normal(0, 0.0005, close.shape))
+        volume = np.round(rng.lognormal(8, 1, close.shape))
+        volume[rng.random(close.shape) < 0.0005] = 0
+
+        listed = bars[:, None] >= first
+        close = np.where(listed, np.round(close, 4), np.nan)
+        yield timestamps, {
+            'open': np.round(close * (1 + rng.normal(0, 0.0003, close.shape)), 4),
+            'high': np.round(close * (1 + spread), 4),
+            'low': np.round(close * (1 - spread), 4),
+            'close': close,
+            'adj_close': close,
+            'volume': np.where(listed, volume, np.nan),
+        }
+
+
+def synthetic_tickers(num_tickers):
+    """
+    Ticker names of a synthetic universe of num_tickers tickers plus SPY.
+    """
+    return ["SPY"] + [f"S{k:04d}" for k in range(1, num_tickers + 1)]
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class DollarVolumePanel:
+    """
+    Rolling dollar volume and tradability state for every data feed, updated
+    once per bar across all feeds.
+
+    Each feed keeps a ring buffer of its last `window` dollar volumes, their
+    running sum and the number of consecutive bars with positive volume and
+    close. A feed is eligible once that run covers the whole window.
+    """
+    def __init__(self, num_feeds, window):
+        self.window = window
+        self.ring = np.zeros((max(window, 1), num_feeds))
+        self.dollar_volume = np.zeros(num_feeds)
+        self.good_bars = np.zeros(num_feeds, dtype=np.int64)
+        self.lengths = np.zeros(num_feeds, dtype=np.int64)
+        self._updates = 0
+
+    def update(self, lengths, volumes, closes):
+        """
+        Records the current bar of every feed whose length advanced.
+        lengths, volumes and closes hold len(data), data.volume[0] and
+        data.close[0] for every feed.
+        """
+        lengths = np.asarray(lengths, dtype=np.int64)
+        advanced = np.flatnonzero(lengths > self.lengths)
+        if len(advanced) == 0:
+            return
+        volumes = np.asarray(volumes, dtype=float)[advanced]
+        closes = np.asarray(closes, dtype=float)[advanced]
+
+        # Replace the dollar volume leaving each feed's window
+        slots = (lengths[advanced] - 1) % len(self.ring)
+        dollar_volumes = volumes * closes
+        self.dollar_volume[advanced] += dollar_volumes - self.ring[slots, advanced]
+        self.ring[slots, advanced] = dollar_volumes
+
+        tradeable = (volumes > 0) & (closes > 0)
+        self.good_bars[advanced] = np.where(tradeable, self.good_bars[advanced] + 1, 0)
+        self.lengths = lengths
+
+        # Resum the windows periodically so rounding errors cannot accumulate
+        self._updates += 1
+        if self._updates % len(self.ring) == 0:
+            self.dollar_volume = self.ring.sum(axis=0)
+
+    def eligible(self):
+        """
+        Mask of feeds with positive volume and close on each of the last
+        `window` bars.
+        """
+        return self.good_bars >= self.window
+
+    def top(self, n, mask=None):
+        """
+        Indices of the n eligible feeds with the largest rolling dollar
+        volume, in descending order of dollar volume. mask optionally
+        restricts the candidates further (e.g. to index members).
+        """
+        eligible = self.eligible()
+        candidates = np.flatnonzero(eligible if mask is None else eligible & mask)
+        if n < len(candidates):
+            partition = np.argpartition(-self.dollar_volume[candidates], n - 1)[:n]
+            candidates = candidates[partition]
+        # Order by dollar volume, ties by feed order
+        order = np.lexsort((candidates, -self.dollar_volume[candidates]))
+        return candidates[order]
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+from src.sweep import run_sweep, max_drawdown, return_statistics
+
+WALK_FORWARD_OBJECTIVES = ['max_drawdown', 'sharpe', 'total_return']
+
+
+def walk_forward_folds(dates, train_years, test_years, step_years=None, anchored=False):
+    """
+    Rolling train/test folds over dates, as (train_start, train_end,
+    test_start, test_end) row ranges with exclusive ends. Each test window
+    directly follows its train window; folds advance by step_years
+    (test_years by default) until the test window runs past the last date.
+    With anchored, every train window starts at the first date.
+    """
+    dates = pd.DatetimeIndex(dates)
+    step = pd.DateOffset(years=step_years or test_years)
+    folds = []
+    start = dates[0]
+    while True:
+        train_from = dates[0] if anchored else start
+        test_from = start + pd.DateOffset(years=train_years)
+        test_to = test_from + pd.DateOffset(years=test_years)
+        rows = dates.searchsorted([train_from, test_from, test_to])
+        if rows[1] >= len(dates):
+            break
+        folds.append((int(rows[0]), int(rows[1]), int(rows[1]), int(rows[2])))
+        start += step
+    return folds
+
+
+def window_scores(curves, start, end, objective):
+    """
+    objective of every curve (rows of a cells x dates array) over the
+    dates [start, end); higher is better.
+    """
+    window = curves[:, start:end]
+    if objective == "max_drawdown":
+        peak = np.maximum.accumulate(window, axis=1)
+        return ((window - peak) / peak).min(axis=1)
+    if objective == "total_return":
+        return window[:, -1] / window[:, 0] - 1
+    if objective == "sharpe":
+        return np.array([return_statistics(values)[2] for values in window])
+    raise ValueError(f"Unknown objective {objective}; expected one of {WALK_FORWARD_OBJECTIVES}")
+
+
+class WalkForwardResult:
+    """
+    Per-fold choices and the stitched out-of-sample equity curve of a
+    walk-forward run, along with the in-sample reference: the cell of the
+    run's grid with the best objective over the whole history.
+    """
+    def __init__(self, folds, dates, portfolio_values, in_sample):
+        self.folds = folds
+        self.dates = dates
+        self.portfolio_values = portfolio_values
+        self.in_sample = in_sample
+
+    def summary(self):
+        """
+        One row per fold: windows, chosen parameters, train score and the
+        test window's max drawdown and return.
+        """
+        return pd.DataFrame([
+            {**{key: value for key, value in fold.items() if key != "params"}, **fold["params"]}
+            for fold in self.folds
+        ])
+
+
+def walk_forward(panel, grid, folds_spec, fixed_params=None, objective="max_drawdown", workers=None,
+                 cache_dir=None, store=None):
+    """
+    Walk-forward optimization over the parameter sets in grid.
+
+    The engine is causal (a run on the first N dates equals the start of the
+    full run), so one full-history run per parameter set holds its results
+    for every train and test window. Those runs go through run_sweep, in
+    parallel across processes that share the memory-mapped panel and the
+    feature cache (and, with store, a ResultsStore so an interrupted run
+    resumes). Each fold then picks the parameter set with the best objective
+    on its train window and takes that run's returns over the test window;
+    the test windows' returns are chained into one out-of-sample equity
+    curve starting at the initial cash. When test windows overlap (a step
+    shorter than the test window), each one is cut where the next begins.
+    Raises ValueError when no parameter set has a score on a train window.
+
+    folds_spec is a dict of walk_forward_folds arguments (train_years,
+    test_years, step_years, anchored).
+    """
+    fixed_params = fixed_params or {}
+    cells = {}
+    for cell in run_sweep(panel, grid, fixed_params, workers=workers, cache_dir=cache_dir, store=store):
+        cells[cell["index"]] = cell
+    if store is not None:
+        for index, params in enumerate(grid):
+            if index not in cells:
+                cells[index] = store.load(dict(fixed_params, **params))
+
+    # Every cell records values on the same dates
+    dates = cells[0]["dates"]
+    curves = np.array([cells[index]["portfolio_values"] for index in range(len(grid))], dtype=float)
+    folds = walk_forward_folds(dates, **folds_spec)
+
+    results, returns, oos_dates = [], [], []
+    for k, (train_start, train_end, test_start, test_end) in enumerate(folds):
+        scores = window_scores(curves, train_start, train_end, objective)
+        best = _best(scores, f"the train window {dates[train_start]} to {dates[train_end - 1]}", objective)
+        # Returns from the last train bar, so consecutive test windows chain without gaps
+        test = curves[best, test_start - 1:test_end]
+        stitched_end = min(test_end, folds[k + 1][2]) if k + 1 < len(folds) else test_end
+        returns.append(test[1:stitched_end - test_start + 1] / test[:stitched_end - test_start])
+        oos_dates.extend(dates[test_start:stitched_end])
+        results.append({
+            "train_start": dates[train_start],
+            "train_end": dates[train_end - 1],
+            "test_start": dates[test_start],
+            "test_end": dates[test_end - 1],
+            "params": grid[best],
+            "train_score": float(scores[best]),
+            "test_max_drawdown": float(max_drawdown(test)),
+            "test_return": float(test[-1] / test[0] - 1),
+        })
+
+    initial_cash = fixed_params.get("initial_cash", 1000000)
+    portfolio_values = initial_cash * np.cumprod(np.concatenate(returns)) if returns else np.array([])
+    in_sample = cells[_best(window_scores(curves, 0, len(dates), objective), "the whole history", objective)]
+    return WalkForwardResult(results, oos_dates, portfolio_values, in_sample)
+
+
+def _best(scores, window, objective):
+    # Index of the best score, which NaN scores can never be
+    if np.isnan(scores).all():
+        raise ValueError(f"No parameter set has a {objective} score over {window}")
+    return int(np.nanargmax(scores))